@@ -5,11 +5,27 @@ Standalone app for deployment (e.g., Hugging Face Spaces)
 
 import os
 import json
-from datetime import datetime
-from pathlib import Path
+import time
+import asyncio
+import argparse
+from contextlib import aclosing
+from types import SimpleNamespace
 import gradio as gr
-from openai import OpenAI
-from PyPDF2 import PdfReader
+from openai import OpenAI, AsyncOpenAI
+
+from react_agent.agent.snapshot import load_snapshot, on_snapshot_change
+from react_agent.agent.retrieval import build_business_index, parse_top_k
+from react_agent.agent.metrics import METRICS
+from react_agent.agent.tracing import TRACER, serve_metrics
+from react_agent.agent.profiling import PROFILER, PROFILE_MODES
+from react_agent.agent.cassette import CASSETTE, CASSETTE_MODES
+from react_agent.agent.prompt_layout import RETRIEVED_CONTEXT_NOTE, layout_messages
+from react_agent.agent.tokens import TokenAccountant, TokenBudgetExceeded, max_tokens_kwargs
+from react_agent.agent.response_cache import ResponseCache
+from react_agent.agent.sessions import SessionStore
+from react_agent.agent.compaction import Compactor
+from react_agent.agent.feedback import FeedbackDetector
+from react_agent.agent.tools import LOGS_DIR, REGISTRY
 
 # Load environment variables (fallback to direct file read if dotenv fails)
 try:
@@ -33,43 +49,60 @@ if not api_key or not api_key.startswith('sk-'):
 if not api_key:
     raise ValueError("OPENAI_API_KEY not found. Please create a .env file with your API key.")
 
-# Initialize OpenAI client
-client = OpenAI(api_key=api_key)
-
-# Ensure logs directory exists
-logs_dir = Path("logs")
-logs_dir.mkdir(exist_ok=True)
-
-
-def load_business_context():
-    """Load business information from PDF and text files."""
+# Initialize OpenAI clients (one shared, connection-pooled instance each); with
+# FLEUR_CASSETTE=record|replay completions are recorded to / replayed from
+# FLEUR_CASSETTE_PATH (react_agent/agent/cassette.py)
+client = CASSETTE.wrap(OpenAI(api_key=api_key))
+async_client = CASSETTE.wrap(AsyncOpenAI(api_key=api_key))
+
+MODEL = "gpt-4o"
+
+# Per-request budget for the async handler (seconds)
+REQUEST_TIMEOUT = float(os.getenv("FLEUR_REQUEST_TIMEOUT", "60"))
+# Stream tokens into the chat UI as they are generated (FLEUR_STREAMING=0 to disable)
+STREAMING = os.getenv("FLEUR_STREAMING", "1") != "0"
+# Reply from the tools' confirmation templates instead of a second completion
+# when that fully answers the turn (FLEUR_LOCAL_CONFIRMATIONS=0 to disable)
+LOCAL_CONFIRMATIONS = os.getenv("FLEUR_LOCAL_CONFIRMATIONS", "1") != "0"
+# Per-stage spans of every turn go to logs/traces.jsonl with FLEUR_TRACING=1;
+# METRICS are served in the Prometheus text format on FLEUR_METRICS_PORT if set
+METRICS_PORT = int(os.getenv("FLEUR_METRICS_PORT", "0"))
+
+TIMEOUT_REPLY = "Sorry, that took longer than expected on our side. Could you please send your message again?"
+BUDGET_REPLY = ("Sorry, this conversation has grown too long for me to continue. "
+                "Please start a new chat and I'll be happy to help.")
+
+# Every request is counted before it is sent and checked against FLEUR_MAX_PROMPT_TOKENS
+# and the session's FLEUR_SESSION_TOKEN_QUOTA; each call's tokens go to logs/llm_calls.jsonl
+TOKENS = TokenAccountant(log_path=LOGS_DIR / "llm_calls.jsonl")
+
+def load_business_context(snapshot=None):
+    """Load business information from PDF and text files (via the cached snapshot)."""
+    snapshot = snapshot or load_snapshot()
     context = ""
 
-    # Load PDF
-    pdf_path = Path("me/about_business.pdf")
-    if pdf_path.exists():
-        reader = PdfReader(str(pdf_path))
-        pdf_text = ""
-        for page in reader.pages:
-            pdf_text += page.extract_text() + "\n"
+    # PDF profile
+    if "about_business.pdf" in snapshot.documents:
+        pdf_text = snapshot.document("about_business.pdf")
         context += "=== Business Profile (from about_business.pdf) ===\n" + pdf_text + "\n\n"
 
-    # Load text summary
-    txt_path = Path("me/business_summary.txt")
-    if txt_path.exists():
-        with open(txt_path, 'r', encoding='utf-8') as f:
-            txt_content = f.read()
+    # Text summary
+    if "business_summary.txt" in snapshot.documents:
+        txt_content = snapshot.document("business_summary.txt")
         context += "=== Business Summary (from business_summary.txt) ===\n" + txt_content + "\n"
 
     return context
 
 
-# Load the business context
-BUSINESS_CONTEXT = load_business_context()
+# Load the business context (one snapshot read unless the documents changed)
+# Cold starts parse the PDF here; with FLEUR_PROFILE set it shows up in the first report
+with PROFILER.request("load_snapshot"):
+    BUSINESS_SNAPSHOT = load_snapshot()
+BUSINESS_CONTEXT = load_business_context(BUSINESS_SNAPSHOT)
 
 
-# System prompt
-SYSTEM_PROMPT = f"""You are Fleur de Pain's chat assistant.
+# System prompt template ({business_context} is filled from the snapshot)
+SYSTEM_PROMPT_TEMPLATE = """You are Fleur de Pain's chat assistant.
 
 🚨 CRITICAL RULE - FEEDBACK LOGGING:
 You MUST call record_feedback() IMMEDIATELY whenever a customer makes ANY statement about:
@@ -79,10 +112,10 @@ You MUST call record_feedback() IMMEDIATELY whenever a customer makes ANY statem
 - Questions you cannot answer from the business documents
 
 EXAMPLES that MUST trigger record_feedback():
-✓ "The croissants were amazing! Best I've ever had" → CALL record_feedback(feedback="The croissants were amazing! Best I've ever had")
-✓ "Your coffee is too weak" → CALL record_feedback(feedback="Your coffee is too weak")
-✓ "Loved it!" → CALL record_feedback(feedback="Loved it!")
-✓ "Do you deliver to Canada?" → CALL record_feedback(feedback="Do you deliver to Canada?")
+✓ "The croissants were amazing! Best I've ever had" → CALL record_feedback(question="The croissants were amazing! Best I've ever had")
+✓ "Your coffee is too weak" → CALL record_feedback(question="Your coffee is too weak")
+✓ "Loved it!" → CALL record_feedback(question="Loved it!")
+✓ "Do you deliver to Canada?" → CALL record_feedback(question="Do you deliver to Canada?")
 
 GOALS:
 1) Answer questions strictly using the business_summary.txt and about_business.pdf.
@@ -106,12 +139,12 @@ STEP 1: IMMEDIATELY call record_feedback() with their exact statement
 STEP 2: THEN respond warmly thanking them
 Example:
 User: "The croissants were amazing! Best I've ever had"
-→ You MUST: Call record_feedback(feedback="The croissants were amazing! Best I've ever had")
+→ You MUST: Call record_feedback(question="The croissants were amazing! Best I've ever had")
 → Then respond: "Thank you so much! We're thrilled you loved our croissants!"
 
 TOOLS:
 - record_customer_interest(email, name, message) - General lead capture
-- record_feedback(feedback) - MANDATORY for ALL customer opinions, experiences, or unanswered questions
+- record_feedback(question) - MANDATORY for ALL customer opinions, experiences, or unanswered questions
 - schedule_pickup(customer_name, items, pickup_date, pickup_time) - Schedule item pickups
 - create_cake_order(name, email, cake_size, flavor, pickup_date, custom_message) - Custom cake orders
 
@@ -119,309 +152,266 @@ When collecting leads, use record_customer_interest. For scheduling pickups of b
 use schedule_pickup. For custom CAKES specifically, use create_cake_order (remember 24h notice!).
 
 === BUSINESS CONTEXT ===
-{BUSINESS_CONTEXT}
+{business_context}
 """
 
+SYSTEM_PROMPT = BUSINESS_SNAPSHOT.prompt(
+    "app_system_prompt", SYSTEM_PROMPT_TEMPLATE, business_context=BUSINESS_CONTEXT
+)
+BUSINESS_SNAPSHOT.flush()
+
+# Retrieval: inject only the top-k relevant passages per message
+# (FLEUR_RETRIEVAL_K=0 falls back to the full business context)
+RETRIEVAL_K = parse_top_k(os.getenv("FLEUR_RETRIEVAL_K"))
+BUSINESS_INDEX = build_business_index(BUSINESS_SNAPSHOT.documents)
+
+# Static, byte-identical prefix of every request so the provider's prefix cache
+# can reuse it. With retrieval on, the passages go in a separate message after the
+# history (see react_agent/agent/prompt_layout.py) instead of inside this prompt.
+if RETRIEVAL_K <= 0:
+    SYSTEM_PREFIX = SYSTEM_PROMPT
+else:
+    SYSTEM_PREFIX = BUSINESS_SNAPSHOT.prompt(
+        "app_system_prefix", SYSTEM_PROMPT_TEMPLATE, business_context=RETRIEVED_CONTEXT_NOTE
+    )
+    BUSINESS_SNAPSHOT.flush()
+
 
-def record_customer_interest(email: str, name: str, message: str) -> dict:
+def retrieve_contexts(message, history=None):
     """
-    Record customer lead information to JSONL file.
+    Passages for every turn of the conversation, or (None, None) when retrieval is disabled.
 
-    Args:
-        email: Customer email or WhatsApp contact
-        name: Customer name
-        message: Order intent or inquiry details
+    Past turns are re-retrieved deterministically so their passages are re-sent
+    byte-identical (keeping the cached prefix valid); each turn only adds the
+    passages the conversation has not shown yet.
 
     Returns:
-        Confirmation dictionary
+        (contexts for the history turns, context for the current message)
     """
-    lead_data = {
-        "ts": datetime.utcnow().isoformat() + "Z",
-        "email": email,
-        "name": name,
-        "message": message
-    }
+    if RETRIEVAL_K <= 0:
+        return None, None
 
-    # Append to JSONL file
-    leads_file = Path("logs/leads.jsonl")
-    with open(leads_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(lead_data) + "\n")
+    shown = set()
+    contexts = []
+    previous = None
+    for human, _ in list(history or []) + [(message, None)]:
+        # Include the previous user turn so short follow-ups ("what about Saturday?") still match
+        query = human if previous is None else f"{previous} {human}"
+        contexts.append(BUSINESS_INDEX.context_for(query, RETRIEVAL_K, shown))
+        previous = human
 
-    return {
-        "status": "success",
-        "message": f"Lead recorded for {name}. Our team will reach out via {email} soon!"
-    }
+    return contexts[:-1], contexts[-1]
 
 
-def record_feedback(feedback: str) -> dict:
-    """
-    Record customer feedback, suggestions, compliments, or unknown questions to JSONL file.
+# Answers to repeated opening questions, valid until the end of the current bake
+# cycle (FLEUR_RESPONSE_CACHE=0 disables). Answers that needed a tool are never cached.
+RESPONSE_CACHE = ResponseCache()
+RESPONSE_CACHE_NAMESPACE = f"app:{MODEL}"
+on_snapshot_change(lambda key: RESPONSE_CACHE.clear())
 
-    Args:
-        feedback: The customer's feedback, compliment, suggestion, or question
 
-    Returns:
-        Confirmation dictionary
-    """
-    feedback_data = {
-        "ts": datetime.utcnow().isoformat() + "Z",
-        "feedback": feedback
-    }
+def cached_reply(message, history):
+    """Cached answer when the message opens a conversation, else None."""
+    if history:
+        return None
+    return RESPONSE_CACHE.get(message, RESPONSE_CACHE_NAMESPACE)
 
-    # Append to JSONL file
-    feedback_file = Path("logs/feedback.jsonl")
-    with open(feedback_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(feedback_data) + "\n")
 
-    return {
-        "status": "success",
-        "message": "Thank you for your feedback! We truly appreciate it and our team will review it."
-    }
+def remember_reply(message, history, reply, used_tools):
+    """Offer a fresh answer to the cache (opening messages only)."""
+    if not history:
+        RESPONSE_CACHE.remember(message, reply, used_tools, RESPONSE_CACHE_NAMESPACE)
 
 
-def schedule_pickup(customer_name: str, items: str, pickup_date: str, pickup_time: str) -> dict:
-    """
-    Schedule a pickup appointment for customer orders.
+# Tools and their function-calling schema come from the shared registry
+# (react_agent/agent/tools.py), the same declarations the ReAct agent uses
+tools = REGISTRY.openai_tools
 
-    Args:
-        customer_name: Customer's full name
-        items: Description of items to pick up (e.g., "2 sourdough loaves, 1 baguette")
-        pickup_date: Date for pickup (e.g., "2025-10-20" or "Saturday")
-        pickup_time: Preferred time (e.g., "3:00 PM" or "afternoon")
 
-    Returns:
-        Confirmation dictionary
+# Whole-word keyword regex by default; FLEUR_FEEDBACK_DETECTOR=classifier scores
+# messages with the hashed n-gram classifier (react_agent/agent/feedback.py)
+FEEDBACK_DETECTOR = FeedbackDetector()
+
+
+def detect_feedback(message):
     """
-    pickup_data = {
-        "ts": datetime.utcnow().isoformat() + "Z",
-        "customer_name": customer_name,
-        "items": items,
-        "pickup_date": pickup_date,
-        "pickup_time": pickup_time
-    }
+    Detect if message contains feedback/opinion keywords.
+    Returns True if feedback detected, False otherwise.
+    """
+    return FEEDBACK_DETECTOR.detect(message)
 
-    # Append to JSONL file
-    pickup_file = Path("logs/scheduled_pickups.jsonl")
-    with open(pickup_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(pickup_data) + "\n")
 
-    return {
-        "status": "success",
-        "message": f"Pickup scheduled for {customer_name} on {pickup_date} at {pickup_time}. We'll have {items} ready!"
-    }
+def build_messages(message, history):
+    """Build the chat messages for one turn: static prefix, history, passages, message."""
+    history_contexts, context = retrieve_contexts(message, history)
+    return layout_messages(SYSTEM_PREFIX, message, history, context, history_contexts)
+
 
+# Long prompts are compacted before sending, with or without a session: turns older
+# than the last few are summarized once the prompt passes FLEUR_COMPACT_TOKENS
+COMPACTOR = Compactor()
 
-def create_cake_order(name: str, email: str, cake_size: str, flavor: str, pickup_date: str, custom_message: str = "") -> dict:
+
+# Server-side conversation state per browser session: recent turns verbatim, older
+# ones summarized past FLEUR_SESSION_TOKENS, LRU beyond FLEUR_MAX_SESSIONS sessions
+SESSIONS = SessionStore()
+
+
+def session_for(history, request):
+    """The server-side session behind a Gradio request, or None (scripts only pass history)."""
+    session_id = getattr(request, "session_hash", None)
+    if not session_id:
+        return None
+    if not history:
+        # A new chat keeps Gradio's session hash: its token quota starts over
+        TOKENS.reset(session_id)
+    return SESSIONS.sync(session_id, history)
+
+
+def build_turn_messages(message, history, session=None):
     """
-    Create a structured custom cake order with all required details.
+    Chat messages for one turn, from the session when there is one.
 
-    Args:
-        name: Customer's full name
-        email: Customer's email or WhatsApp
-        cake_size: Size of cake (e.g., "8 inch", "serves 15", "small/medium/large")
-        flavor: Cake flavor (e.g., "chocolate", "vanilla", "red velvet")
-        pickup_date: Date for pickup (must be at least 24 hours in advance)
-        custom_message: Optional message/text for the cake
+    Returns:
+        (messages, context, chunks): the passages sent with this message and
+        their chunk keys, to be stored with the turn
+    """
+    if session is None:
+        return COMPACTOR.compact(build_messages(message, history)), None, ()
+
+    context, chunks = None, ()
+    if RETRIEVAL_K > 0:
+        # Same query and dedupe as retrieve_contexts, against the session's passages
+        previous = session.last_user_message
+        query = message if previous is None else f"{previous} {message}"
+        shown = session.shown()
+        already = set(shown)
+        context = BUSINESS_INDEX.context_for(query, RETRIEVAL_K, shown)
+        chunks = shown - already
+    # The session's budget covers its stored turns; the compactor caps the whole prompt
+    return COMPACTOR.compact(session.messages(SYSTEM_PREFIX, message, context)), context, chunks
+
+
+def token_budget(messages, session, with_tools=True):
+    """
+    Count a request and check it against the budgets before sending it.
 
     Returns:
-        Confirmation dictionary
+        (prompt_tokens, max_tokens)
+
+    Raises:
+        TokenBudgetExceeded: The request or the session is over budget
     """
-    cake_order_data = {
-        "ts": datetime.utcnow().isoformat() + "Z",
-        "name": name,
-        "email": email,
-        "cake_size": cake_size,
-        "flavor": flavor,
-        "pickup_date": pickup_date,
-        "custom_message": custom_message
-    }
+    return TOKENS.prepare(messages, tools if with_tools else None,
+                          session_id=session.session_id if session is not None else None)
 
-    # Append to JSONL file
-    cake_orders_file = Path("logs/cake_orders.jsonl")
-    with open(cake_orders_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(cake_order_data) + "\n")
 
-    return {
-        "status": "success",
-        "message": f"Custom cake order received for {name}! {flavor.capitalize()} cake ({cake_size}) scheduled for {pickup_date}. Our team will reach out via {email} to confirm details and pricing."
-    }
+def record_call(usage, prompt_tokens, session, handler):
+    """Record one completion's tokens (METRICS, session quota, logs/llm_calls.jsonl)."""
+    TOKENS.record(usage, prompt_tokens, session_id=session.session_id if session is not None else None,
+                  model=MODEL, handler=handler)
 
 
-# Tool definitions for OpenAI function calling
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "record_customer_interest",
-            "description": "Record customer lead information when they express interest in ordering or want a quote. Call this when you have collected their contact details and order intent.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "email": {
-                        "type": "string",
-                        "description": "Customer's email address or WhatsApp number"
-                    },
-                    "name": {
-                        "type": "string",
-                        "description": "Customer's full name"
-                    },
-                    "message": {
-                        "type": "string",
-                        "description": "Details about their order intent, items wanted, quantities, dates, etc."
-                    }
-                },
-                "required": ["email", "name", "message"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "record_feedback",
-            "description": "MANDATORY: Call this function for EVERY customer statement about products, experiences, or opinions. This includes: (1) ANY positive comments like 'The croissants were amazing!', 'Best bread ever', 'Loved it', 'Delicious', 'Great service' (2) ANY negative comments like 'Too expensive', 'Stale bread', 'Bad experience' (3) ANY suggestions like 'Add more options', 'Open earlier' (4) ANY questions you cannot answer from docs. DO NOT just respond - you MUST call this function to log their feedback.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "feedback": {
-                        "type": "string",
-                        "description": "The exact customer feedback, compliment, criticism, suggestion, or question to log"
-                    }
-                },
-                "required": ["feedback"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "schedule_pickup",
-            "description": "Schedule a pickup appointment when customer wants to pick up specific items at a specific time. Use this for same-day or future pickups of bread, pastries, or ready orders.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "customer_name": {
-                        "type": "string",
-                        "description": "Customer's full name"
-                    },
-                    "items": {
-                        "type": "string",
-                        "description": "Description of items to pick up (e.g., '2 sourdough loaves, 1 baguette')"
-                    },
-                    "pickup_date": {
-                        "type": "string",
-                        "description": "Date for pickup (e.g., '2025-10-20', 'tomorrow', 'Saturday')"
-                    },
-                    "pickup_time": {
-                        "type": "string",
-                        "description": "Preferred pickup time (e.g., '3:00 PM', 'afternoon', 'morning')"
-                    }
-                },
-                "required": ["customer_name", "items", "pickup_date", "pickup_time"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "create_cake_order",
-            "description": "Create a custom cake order with all required details. Use this specifically for custom celebration cakes (not general lead capture). Remember: custom cakes require 24-hour notice.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {
-                        "type": "string",
-                        "description": "Customer's full name"
-                    },
-                    "email": {
-                        "type": "string",
-                        "description": "Customer's email or WhatsApp number"
-                    },
-                    "cake_size": {
-                        "type": "string",
-                        "description": "Size of cake (e.g., '8 inch', 'serves 15 people', 'small/medium/large')"
-                    },
-                    "flavor": {
-                        "type": "string",
-                        "description": "Cake flavor (e.g., 'chocolate', 'vanilla', 'red velvet', 'strawberry')"
-                    },
-                    "pickup_date": {
-                        "type": "string",
-                        "description": "Date for pickup (must be at least 24 hours in advance)"
-                    },
-                    "custom_message": {
-                        "type": "string",
-                        "description": "Optional message or text to be written on the cake"
-                    }
-                },
-                "required": ["name", "email", "cake_size", "flavor", "pickup_date"]
-            }
-        }
-    }
-]
+def record_turn(session, message, reply, context=None, chunks=()):
+    """Store a finished turn in its session (no-op without one)."""
+    if session is not None:
+        SESSIONS.append(session, message, reply, context, chunks)
 
 
-def detect_feedback(message):
+def execute_tool(function_name, function_args, session=None):
     """
-    Detect if message contains feedback/opinion keywords.
-    Returns True if feedback detected, False otherwise.
+    Execute one tool call requested by the model and return its result dict.
+    A repeat of a recent call in the same session (retry, regenerated reply)
+    returns the first result without running the tool again.
     """
-    message_lower = message.lower()
+    return REGISTRY.dispatch(function_name, function_args,
+                             session_id=session.session_id if session is not None else None)
 
-    # Positive feedback keywords
-    positive_keywords = [
-        'amazing', 'love', 'loved', 'best', 'great', 'excellent', 'delicious',
-        'wonderful', 'fantastic', 'awesome', 'perfect', 'incredible', 'outstanding',
-        'tasty', 'yummy', 'fresh', 'good', 'nice', 'enjoyed', 'favorite', 'favourite'
-    ]
 
-    # Negative feedback keywords
-    negative_keywords = [
-        'bad', 'terrible', 'awful', 'horrible', 'disappointing', 'disappointed',
-        'too expensive', 'too sweet', 'too salty', 'stale', 'cold', 'dry', 'burnt',
-        'undercooked', 'overcooked', 'worst', 'disgusting', 'gross'
-    ]
-
-    # Suggestion keywords
-    suggestion_keywords = [
-        'should', 'could', 'suggest', 'recommend', 'add', 'wish', 'hope',
-        'would be nice', 'would be better', 'improve', 'change'
-    ]
+def log_feedback(message, session=None):
+    """detect_feedback fallback: record the message as feedback (once per session)."""
+    return execute_tool("record_feedback", {"question": message}, session)
 
-    # Check for feedback patterns
-    for keyword in positive_keywords + negative_keywords + suggestion_keywords:
-        if keyword in message_lower:
-            return True
 
-    # Check for exclamation marks (often indicates strong opinion/feedback)
-    if '!' in message and len(message.split()) < 20:  # Short excited statements
-        return True
+def tool_message(tool_call, function_response):
+    """Wrap a tool result as the message sent back to the model."""
+    return {
+        "tool_call_id": tool_call.id,
+        "role": "tool",
+        "name": tool_call.function.name,
+        "content": json.dumps(function_response)
+    }
 
-    return False
 
+def local_confirmation(message, tool_calls, tool_messages, content=None):
+    """
+    The reply after tool calls, rendered from the tools' confirmation templates,
+    or None when the model has to write it.
 
-def chat_with_agent(message, history):
+    The second completion is skipped only when every call's tool declares a
+    confirmation, every call succeeded, and the customer did not also ask
+    something (a question still needs an answer from the model). Text the model
+    wrote alongside its tool calls is kept in front.
+    """
+    if not LOCAL_CONFIRMATIONS or "?" in message:
+        return None
+    confirmations = []
+    for call, result in zip(tool_calls, tool_messages):
+        try:
+            args = json.loads(call.function.arguments)
+        except json.JSONDecodeError:
+            return None
+        confirmation = REGISTRY.confirmation(call.function.name, args, json.loads(result["content"]))
+        if confirmation is None:
+            return None
+        if confirmation not in confirmations:
+            confirmations.append(confirmation)
+    if not confirmations:
+        return None
+    METRICS.increment("chat.llm_calls_avoided")
+    return "\n\n".join(([content] if content else []) + confirmations)
+
+
+def chat_with_agent(message, history, request: gr.Request = None):
     """
     Process user message and return bot response.
     Handles function calling for lead capture and feedback.
     """
-    # Build messages from history
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-
-    # Add conversation history
-    for human, assistant in history:
-        messages.append({"role": "user", "content": human})
-        messages.append({"role": "assistant", "content": assistant})
-
-    # Add current message
-    messages.append({"role": "user", "content": message})
+    with TRACER.span("chat.turn", handler="chat"), PROFILER.request("chat_with_agent"):
+        try:
+            return _chat_with_agent(message, history, request)
+        except TokenBudgetExceeded:
+            return BUDGET_REPLY
+
+
+def _chat_with_agent(message, history, request=None):
+    started = time.perf_counter()
+    with TRACER.span("history"):
+        session = session_for(history, request)
+    cached = cached_reply(message, history)
+    if cached is not None:
+        TRACER.current().set(cached=True)
+        with TRACER.span("feedback_fallback"):
+            if detect_feedback(message):
+                log_feedback(message, session)
+        record_turn(session, message, cached)
+        METRICS.observe("response_cache.hit_seconds", time.perf_counter() - started)
+        return cached
+
+    with TRACER.span("history"):
+        messages, context, chunks = build_turn_messages(message, history, session)
 
     # Call OpenAI API with function calling
-    response = client.chat.completions.create(
-        model="gpt-4o",  # Using GPT-4o for best performance
-        messages=messages,
-        tools=tools,
-        tool_choice="auto"
-    )
+    with TRACER.span("first_completion"):
+        prompt_tokens, max_tokens = token_budget(messages, session)
+        response = client.chat.completions.create(
+            model=MODEL,  # Using GPT-4o for best performance
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+            **max_tokens_kwargs(max_tokens)
+        )
+        record_call(response.usage, prompt_tokens, session, "chat")
 
     response_message = response.choices[0].message
 
@@ -430,79 +420,330 @@ def chat_with_agent(message, history):
         # Process each tool call
         messages.append(response_message)
 
+        tool_messages = []
         for tool_call in response_message.tool_calls:
-            function_name = tool_call.function.name
             function_args = json.loads(tool_call.function.arguments)
-
-            # Execute the appropriate function
-            if function_name == "record_customer_interest":
-                function_response = record_customer_interest(
-                    email=function_args.get("email"),
-                    name=function_args.get("name"),
-                    message=function_args.get("message")
-                )
-            elif function_name == "record_feedback":
-                function_response = record_feedback(
-                    feedback=function_args.get("feedback")
-                )
-            elif function_name == "schedule_pickup":
-                function_response = schedule_pickup(
-                    customer_name=function_args.get("customer_name"),
-                    items=function_args.get("items"),
-                    pickup_date=function_args.get("pickup_date"),
-                    pickup_time=function_args.get("pickup_time")
-                )
-            elif function_name == "create_cake_order":
-                function_response = create_cake_order(
-                    name=function_args.get("name"),
-                    email=function_args.get("email"),
-                    cake_size=function_args.get("cake_size"),
-                    flavor=function_args.get("flavor"),
-                    pickup_date=function_args.get("pickup_date"),
-                    custom_message=function_args.get("custom_message", "")
-                )
-            else:
-                function_response = {"error": "Unknown function"}
+            function_response = execute_tool(tool_call.function.name, function_args, session)
 
             # Add function response to messages
-            messages.append({
-                "tool_call_id": tool_call.id,
-                "role": "tool",
-                "name": function_name,
-                "content": json.dumps(function_response)
-            })
-
-        # Get final response after function execution
-        second_response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages
-        )
+            tool_messages.append(tool_message(tool_call, function_response))
+        messages.extend(tool_messages)
+
+        final_response = local_confirmation(message, response_message.tool_calls, tool_messages,
+                                            response_message.content)
+        if final_response is None:
+            # Get final response after function execution
+            with TRACER.span("second_completion"):
+                prompt_tokens, max_tokens = token_budget(messages, session, with_tools=False)
+                second_response = client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    **max_tokens_kwargs(max_tokens)
+                )
+                record_call(second_response.usage, prompt_tokens, session, "chat")
 
-        final_response = second_response.choices[0].message.content
+            final_response = second_response.choices[0].message.content
 
         # Fallback: If feedback was detected but not logged by any function call
         feedback_logged = any(
             tool_call.function.name == "record_feedback"
             for tool_call in response_message.tool_calls
         )
-        if not feedback_logged and detect_feedback(message):
-            record_feedback(feedback=message)
+        with TRACER.span("feedback_fallback"):
+            if not feedback_logged and detect_feedback(message):
+                log_feedback(message, session)
 
+        remember_reply(message, history, final_response, used_tools=True)
+        record_turn(session, message, final_response, context, chunks)
+        METRICS.observe("response_cache.miss_seconds", time.perf_counter() - started)
         return final_response
 
     # No function call needed, return direct response
     final_response = response_message.content
 
     # Fallback: Check if message contains feedback and log it
-    if detect_feedback(message):
-        record_feedback(feedback=message)
+    with TRACER.span("feedback_fallback"):
+        if detect_feedback(message):
+            log_feedback(message, session)
+
+    remember_reply(message, history, final_response, used_tools=False)
+    record_turn(session, message, final_response, context, chunks)
+    METRICS.observe("response_cache.miss_seconds", time.perf_counter() - started)
+    return final_response
+
+
+async def _execute_tool_call_async(tool_call, session=None):
+    """Run a tool in a worker thread so file I/O never blocks the event loop."""
+    function_args = json.loads(tool_call.function.arguments)
+    function_response = await asyncio.to_thread(execute_tool, tool_call.function.name, function_args, session)
+    return tool_message(tool_call, function_response)
+
+
+async def _chat_with_agent_async(message, history, request=None):
+    started = time.perf_counter()
+    with TRACER.span("history"):
+        session = session_for(history, request)
+    cached = cached_reply(message, history)
+    if cached is not None:
+        TRACER.current().set(cached=True)
+        with TRACER.span("feedback_fallback"):
+            if detect_feedback(message):
+                await asyncio.to_thread(log_feedback, message, session)
+        record_turn(session, message, cached)
+        METRICS.observe("response_cache.hit_seconds", time.perf_counter() - started)
+        return cached
+
+    with TRACER.span("history"):
+        messages, context, chunks = build_turn_messages(message, history, session)
+
+    with TRACER.span("first_completion"):
+        prompt_tokens, max_tokens = token_budget(messages, session)
+        response = await async_client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+            **max_tokens_kwargs(max_tokens)
+        )
+        record_call(response.usage, prompt_tokens, session, "chat_async")
+
+    response_message = response.choices[0].message
+
+    if response_message.tool_calls:
+        messages.append(response_message)
+
+        # Independent tool calls run concurrently; results keep the model's order
+        tool_messages = await asyncio.gather(*(
+            _execute_tool_call_async(tool_call, session) for tool_call in response_message.tool_calls
+        ))
+        messages.extend(tool_messages)
+
+        final_response = local_confirmation(message, response_message.tool_calls, tool_messages,
+                                            response_message.content)
+        if final_response is None:
+            with TRACER.span("second_completion"):
+                prompt_tokens, max_tokens = token_budget(messages, session, with_tools=False)
+                second_response = await async_client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    **max_tokens_kwargs(max_tokens)
+                )
+                record_call(second_response.usage, prompt_tokens, session, "chat_async")
+
+            final_response = second_response.choices[0].message.content
+
+        feedback_logged = any(
+            tool_call.function.name == "record_feedback"
+            for tool_call in response_message.tool_calls
+        )
+        with TRACER.span("feedback_fallback"):
+            if not feedback_logged and detect_feedback(message):
+                await asyncio.to_thread(log_feedback, message, session)
+
+        remember_reply(message, history, final_response, used_tools=True)
+        record_turn(session, message, final_response, context, chunks)
+        METRICS.observe("response_cache.miss_seconds", time.perf_counter() - started)
+        return final_response
+
+    final_response = response_message.content
+
+    with TRACER.span("feedback_fallback"):
+        if detect_feedback(message):
+            await asyncio.to_thread(log_feedback, message, session)
 
+    remember_reply(message, history, final_response, used_tools=False)
+    record_turn(session, message, final_response, context, chunks)
+    METRICS.observe("response_cache.miss_seconds", time.perf_counter() - started)
     return final_response
 
 
+async def chat_with_agent_async(message, history, request: gr.Request = None):
+    """
+    Async version of chat_with_agent used by the Gradio interface.
+
+    Uses the shared AsyncOpenAI client, runs tool calls concurrently and gives up
+    after FLEUR_REQUEST_TIMEOUT seconds so a stalled request frees its session.
+    """
+    with TRACER.span("chat.turn", handler="chat_async") as turn, PROFILER.request("chat_with_agent_async"):
+        try:
+            # The task copies this context, so its spans belong to this turn
+            return await asyncio.wait_for(_chat_with_agent_async(message, history, request), REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            turn.set(timeout=True)
+            return TIMEOUT_REPLY
+        except TokenBudgetExceeded:
+            return BUDGET_REPLY
+
+
+async def _with_deadline(stream, deadline):
+    """Iterate an async stream, raising asyncio.TimeoutError once `deadline` passes."""
+    loop = asyncio.get_running_loop()
+    iterator = stream.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(iterator.__anext__(), deadline - loop.time())
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def _stream_completion(messages, deadline, with_tools, session=None):
+    """
+    Stream one completion.
+
+    Yields ("text", token) for every content delta, then a final ("tool_calls", [...])
+    with the tool calls reassembled from their streamed fragments (possibly empty).
+    """
+    kwargs = {"tools": tools, "tool_choice": "auto"} if with_tools else {}
+    prompt_tokens, max_tokens = token_budget(messages, session, with_tools)
+    stream = await async_client.chat.completions.create(
+        model=MODEL,
+        messages=messages,
+        **max_tokens_kwargs(max_tokens),
+        stream=True,
+        # The final chunk carries the usage (including cached prompt tokens)
+        stream_options={"include_usage": True},
+        **kwargs
+    )
+
+    # Tool calls arrive as fragments keyed by index: id/name first, arguments in pieces
+    partial_calls = {}
+    try:
+        async for chunk in _with_deadline(stream, deadline):
+            if chunk.usage:
+                record_call(chunk.usage, prompt_tokens, session, "chat_stream")
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+
+            if delta.content:
+                yield "text", delta.content
+
+            for fragment in delta.tool_calls or []:
+                call = partial_calls.setdefault(fragment.index, {"id": "", "name": "", "arguments": ""})
+                if fragment.id:
+                    call["id"] = fragment.id
+                if fragment.function and fragment.function.name:
+                    call["name"] += fragment.function.name
+                if fragment.function and fragment.function.arguments:
+                    call["arguments"] += fragment.function.arguments
+    finally:
+        # Timeout or client gone: close the HTTP response so generation (and billing) stops
+        await stream.close()
+
+    yield "tool_calls", [
+        SimpleNamespace(id=call["id"], function=SimpleNamespace(name=call["name"], arguments=call["arguments"]))
+        for _, call in sorted(partial_calls.items())
+    ]
+
+
+async def chat_with_agent_stream(message, history, request: gr.Request = None):
+    """
+    Streaming version of chat_with_agent_async for the Gradio interface.
+
+    Yields the reply so far as tokens arrive, from the first completion and, after
+    any tool calls, from the second one. Time-to-first-token is recorded in
+    METRICS as "chat.ttft_seconds".
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + REQUEST_TIMEOUT
+    partial = ""
+
+    def on_token(token):
+        nonlocal partial
+        if not partial:
+            METRICS.observe("chat.ttft_seconds", loop.time() - started)
+            turn.set(ttft_ms=round((loop.time() - started) * 1000, 3))
+        partial += token
+        return partial
+
+    with TRACER.span("chat.turn", handler="chat_stream") as turn, PROFILER.request("chat_with_agent_stream"):
+        try:
+            with TRACER.span("history"):
+                session = session_for(history, request)
+            cached = cached_reply(message, history)
+            if cached is not None:
+                turn.set(cached=True)
+                yield on_token(cached)
+                with TRACER.span("feedback_fallback"):
+                    if detect_feedback(message):
+                        await asyncio.to_thread(log_feedback, message, session)
+                record_turn(session, message, cached)
+                METRICS.observe("response_cache.hit_seconds", loop.time() - started)
+                return
+
+            with TRACER.span("history"):
+                messages, context, chunks = build_turn_messages(message, history, session)
+            tool_calls = []
+
+            with TRACER.span("first_completion"):
+                # aclosing: a disconnect closing this generator closes the API stream too
+                async with aclosing(_stream_completion(messages, deadline, with_tools=True,
+                                                       session=session)) as completion:
+                    async for kind, value in completion:
+                        if kind == "text":
+                            yield on_token(value)
+                        else:
+                            tool_calls = value
+
+            if tool_calls:
+                messages.append({
+                    "role": "assistant",
+                    "content": partial or None,
+                    "tool_calls": [
+                        {
+                            "id": call.id,
+                            "type": "function",
+                            "function": {"name": call.function.name, "arguments": call.function.arguments}
+                        }
+                        for call in tool_calls
+                    ]
+                })
+                tool_messages = await asyncio.gather(*(
+                    _execute_tool_call_async(call, session) for call in tool_calls
+                ))
+                messages.extend(tool_messages)
+
+                confirmation = local_confirmation(message, tool_calls, tool_messages)
+                if partial:
+                    yield on_token("\n\n")
+                if confirmation is not None:
+                    yield on_token(confirmation)
+                else:
+                    with TRACER.span("second_completion"):
+                        async with aclosing(_stream_completion(messages, deadline, with_tools=False,
+                                                               session=session)) as completion:
+                            async for kind, value in completion:
+                                if kind == "text":
+                                    yield on_token(value)
+
+            feedback_logged = any(call.function.name == "record_feedback" for call in tool_calls)
+            with TRACER.span("feedback_fallback"):
+                if not feedback_logged and detect_feedback(message):
+                    await asyncio.to_thread(log_feedback, message, session)
+
+            remember_reply(message, history, partial, used_tools=bool(tool_calls))
+            record_turn(session, message, partial, context, chunks)
+            METRICS.observe("chat.stream_seconds", loop.time() - started)
+            METRICS.observe("response_cache.miss_seconds", loop.time() - started)
+
+        except asyncio.TimeoutError:
+            METRICS.increment("chat.timeouts")
+            turn.set(timeout=True)
+            yield (partial + "\n\n" if partial else "") + TIMEOUT_REPLY
+        except TokenBudgetExceeded:
+            yield (partial + "\n\n" if partial else "") + BUDGET_REPLY
+
+
 # Create Gradio chat interface
 demo = gr.ChatInterface(
-    fn=chat_with_agent,
+    fn=chat_with_agent_stream if STREAMING else chat_with_agent_async,
     title="Fleur de Pain — Business Assistant",
     description="Ask me about our fresh-baked goods, menu, ordering, custom cakes, and more!",
     examples=[
@@ -513,9 +754,28 @@ demo = gr.ChatInterface(
         "Tell me about your viennoiserie",
         "Do you have gluten-free options?"
     ],
-    theme=gr.themes.Soft()
+    theme=gr.themes.Soft(),
+    # The async handler does not hold a worker thread while waiting on the API
+    concurrency_limit=None
 )
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fleur de Pain business assistant (Gradio).")
+    parser.add_argument("--profile", type=int, metavar="N", default=None,
+                        help="Profile the chat handlers, writing a report every N requests "
+                             "to logs/profiles (default: FLEUR_PROFILE)")
+    parser.add_argument("--profile-mode", choices=PROFILE_MODES, default=None,
+                        help="Stack sampling or cProfile (default: FLEUR_PROFILE_MODE)")
+    parser.add_argument("--cassette", choices=CASSETTE_MODES, default=None,
+                        help="Record completions to / replay them from the cassette (default: FLEUR_CASSETTE)")
+    parser.add_argument("--cassette-path", default=None,
+                        help="Cassette database (default: FLEUR_CASSETTE_PATH)")
+    args = parser.parse_args()
+    PROFILER.configure(window=args.profile, mode=args.profile_mode)
+    CASSETTE.configure(mode=args.cassette, path=args.cassette_path)
+
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+        print(f"Prometheus metrics: http://127.0.0.1:{METRICS_PORT}/metrics")
     demo.launch()
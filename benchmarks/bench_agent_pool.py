@@ -0,0 +1,92 @@
+"""
+Agent pool benchmark: agent construction and first-call latency
+
+Compares, for the experiment grid's configurations (EXPERIMENTS) and for a
+stream of per-session agents:
+  - compile per agent: the graph is compiled for every new agent (what every
+    LangGraphReActAgent used to do; reproduced by clearing the graph cache)
+  - shared graph: new LangGraphReActAgent objects on the cached compiled graph
+  - pooled: AGENT_POOL.get(), persona and llm_call passed to run()
+
+The LLM is an in-process stub that answers immediately, so the timings are the
+framework's own overhead (an API call adds the same latency to every variant).
+
+Usage:
+    python benchmarks/bench_agent_pool.py [--sessions 200]
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from react_agent.agent.framework_impl import AGENT_POOL, LangGraphReActAgent, clear_graph_cache
+from react_agent.run_detailed_experiments import EXPERIMENTS, TEST_SCENARIOS, load_business_context
+
+
+def stub_llm_call(messages):
+    return "Thought: I can answer from the business documents.\nAnswer: Fresh batches every 3 hours."
+
+
+def new_agent(variant: str, persona: str):
+    if variant == "compile per agent":
+        clear_graph_cache()
+        return LangGraphReActAgent(stub_llm_call, persona=persona)
+    if variant == "shared graph":
+        return LangGraphReActAgent(stub_llm_call, persona=persona)
+    return AGENT_POOL.get()
+
+
+def measure(variant: str, personas: list, message: str, business_context: str) -> dict:
+    construct, first_call = [], []
+    for persona in personas:
+        start = time.perf_counter()
+        agent = new_agent(variant, persona)
+        built = time.perf_counter()
+        agent.run(message, business_context, persona=persona, llm_call=stub_llm_call)
+        construct.append(built - start)
+        first_call.append(time.perf_counter() - built)
+    return {"construct": construct, "first_call": first_call}
+
+
+def report(label: str, variant: str, row: dict) -> None:
+    construct_us = [t * 1e6 for t in row["construct"]]
+    first_us = [t * 1e6 for t in row["first_call"]]
+    print(f"{label:<22} {variant:<18} construct p50 {statistics.median(construct_us):8.0f} us  "
+          f"first call p50 {statistics.median(first_us):8.0f} us  "
+          f"total {(sum(construct_us) + sum(first_us)) / 1000:8.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200, help="Per-session agents to create")
+    args = parser.parse_args()
+
+    business_context = load_business_context()
+    message = TEST_SCENARIOS["freshness"]
+    workloads = {
+        f"grid ({len(EXPERIMENTS)} configs)": [exp["persona"] for exp in EXPERIMENTS],
+        f"{args.sessions} sessions": ["friendly_advisor", "strict_expert"] * (args.sessions // 2),
+    }
+
+    # Warm the persona prompt cache and imports so only graph/agent setup differs
+    LangGraphReActAgent(stub_llm_call).run(message, business_context)
+
+    print("=" * 100)
+    print("AGENT CONSTRUCTION AND FIRST-CALL LATENCY (stub LLM)")
+    print("=" * 100)
+    for label, personas in workloads.items():
+        for variant in ("compile per agent", "shared graph", "pooled"):
+            AGENT_POOL.clear()
+            report(label, variant, measure(variant, personas, message, business_context))
+        print()
+    print(f"pooled agents: {len(AGENT_POOL)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Cassette benchmark: record once, replay instantly and identically
+
+  1. The EXPERIMENTS x TEST_SCENARIOS grid of run_detailed_experiments.py
+     (react and react_stream backends) against the fake OpenAI server:
+     passthrough, record, then replay-only with the server stopped. Checks
+     that the replayed records match the recorded run.
+  2. app.py turns (chat_with_agent and chat_with_agent_async) recorded, then
+     replayed with the server stopped: the same replies.
+  3. Every stored response re-serialized after a replay equals the stored
+     bytes; cassette size and lookup cost.
+
+Usage:
+    python benchmarks/bench_cassette.py [--latency 0.2] [--concurrency 4]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import sqlite3
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from openai import OpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from load_test_chat import import_app
+from react_agent.agent.cassette import CASSETTE, CassetteMiss, normalize_request, request_key
+from react_agent.agent.metrics import METRICS
+from react_agent.run_detailed_experiments import (
+    EXPERIMENTS, LLM_FACTORIES, TEST_SCENARIOS, load_business_context, run_grid,
+)
+
+APP_MESSAGES = [
+    "What breads are fresh now? When is the next batch?",
+    f"{TOOL_TRIGGER} The croissants were great today",
+    "How do I pre-order and get delivery?",
+    f"{TOOL_TRIGGER} Do you have gluten-free sourdough daily?",
+]
+
+
+def grid(workdir: Path, base_url: str, mode: str, concurrency: int) -> tuple:
+    """(seconds, records by cell) of one grid run."""
+    client = OpenAI(base_url=base_url, api_key="sk-fake", max_retries=0)
+
+    def factory(**config):
+        return LLM_FACTORIES[mode](client=client, **config)
+
+    workdir.mkdir(parents=True, exist_ok=True)
+    sys.stdout = open(os.devnull, "w")
+    try:
+        started = time.perf_counter()
+        run_grid(load_business_context(), workdir / "detailed_results.jsonl", workdir / "runs.csv",
+                 concurrency=concurrency, llm_factory=factory, mode=mode)
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+    with open(workdir / "detailed_results.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    return elapsed, {(json.dumps(r["experiment"], sort_keys=True), r["scenario"]["key"]): r for r in records}
+
+
+def comparable(record: dict) -> dict:
+    """What a replay must reproduce: the responses and billed tokens (not timestamps or timings)."""
+    tokens = dict(record["tokens"])
+    tokens["calls"] = [{k: v for k, v in call.items() if k != "ts"} for call in tokens.get("calls", [])]
+    return {"response": record["response"], "tokens": tokens}
+
+
+def app_turns(app) -> tuple:
+    started = time.perf_counter()
+    replies = [app.chat_with_agent(message, []) for message in APP_MESSAGES]
+
+    async def run_async():
+        return [await app.chat_with_agent_async(message, []) for message in APP_MESSAGES]
+
+    replies += asyncio.run(run_async())
+    return time.perf_counter() - started, replies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake server latency per completion")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="fleur-cassette-"))
+    os.chdir(root)  # tool logs from the agents land here
+    cells = len(EXPERIMENTS) * len(TEST_SCENARIOS)
+
+    print("=" * 84)
+    print(f"EXPERIMENT GRID ({cells} cells, {args.latency * 1000:.0f} ms per completion, "
+          f"concurrency {args.concurrency})")
+    print("=" * 84)
+    for mode in ("react", "react_stream"):
+        CASSETTE.configure(mode="passthrough", path=root / f"{mode}.db")
+        server = FakeOpenAIServer(latency=args.latency, token_latency=0.002).start()
+        passthrough, _ = grid(root / mode / "passthrough", server.base_url, mode, args.concurrency)
+        CASSETTE.configure(mode="record")
+        METRICS.reset()
+        recorded_time, recorded = grid(root / mode / "record", server.base_url, mode, args.concurrency)
+        served = server.requests_served
+        server.stop()
+
+        CASSETTE.configure(mode="replay")
+        METRICS.reset()
+        replay_time, replayed = grid(root / mode / "replay", server.base_url, mode, args.concurrency)
+        same = sum(comparable(replayed[cell]) == comparable(recorded[cell]) for cell in recorded)
+        print(f"{mode:<13} passthrough {passthrough:6.2f}s   record {recorded_time:6.2f}s ({served} calls)   "
+              f"replay {replay_time:6.3f}s ({METRICS.counter('cassette.hits'):.0f} hits, server stopped)   "
+              f"{same}/{len(recorded)} records identical")
+
+    print("\n" + "=" * 84)
+    print(f"APP TURNS ({len(APP_MESSAGES)} sync + {len(APP_MESSAGES)} async, local confirmations off)")
+    print("=" * 84)
+    CASSETTE.configure(mode="record", path=root / "app.db")
+    server = FakeOpenAIServer(latency=args.latency).start()
+    app = import_app(server.base_url)
+    app.RESPONSE_CACHE.maxsize = 0
+    app.LOCAL_CONFIRMATIONS = False
+    recorded_time, recorded_replies = app_turns(app)
+    server.stop()
+    CASSETTE.configure(mode="replay")
+    replay_time, replayed_replies = app_turns(app)
+    print(f"record {recorded_time:6.2f}s   replay {replay_time:6.3f}s (server stopped)   "
+          f"{sum(a == b for a, b in zip(recorded_replies, replayed_replies))}/{len(recorded_replies)} replies identical")
+    try:
+        app.chat_with_agent("A message that was never recorded", [])
+    except CassetteMiss as e:
+        print(f"unrecorded request in replay mode -> CassetteMiss: {str(e)[:70]}...")
+
+    print("\n" + "=" * 84)
+    print("STORED RESPONSES")
+    print("=" * 84)
+    for db in sorted(root.glob("*.db")):
+        conn = sqlite3.connect(str(db))
+        rows = conn.execute("SELECT stream, response FROM calls").fetchall()
+        identical = 0
+        for stream, raw in rows:
+            if stream:
+                lines = raw.split("\n") if raw else []
+                identical += all(ChatCompletionChunk.model_validate_json(line).model_dump_json() == line for line in lines)
+            else:
+                identical += ChatCompletion.model_validate_json(raw).model_dump_json() == raw
+        conn.close()
+        print(f"{db.name:<18} {len(rows):4d} calls   {db.stat().st_size / 1024:7.1f} KiB   "
+              f"{identical}/{len(rows)} byte-identical after a replay round trip")
+
+    request = normalize_request({"model": "gpt-4o", "messages": [{"role": "user", "content": APP_MESSAGES[0]}] * 20,
+                                 "temperature": 0.7, "top_p": 1.0})
+    n = 2000
+    started = time.perf_counter()
+    for _ in range(n):
+        CASSETTE.get(request_key(request))
+    print(f"\nkey + lookup (20-message request): {(time.perf_counter() - started) / n * 1e6:.0f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+History compaction benchmark: prompt-token growth over 50-turn conversations
+
+Two conversations are carried for --turns turns against the fake OpenAI server,
+with compaction off and on, and the prompt tokens of every request (from the
+server's usage) are reported along the way:
+  - app: app.chat_with_agent with the whole client history every turn
+  - react: one ReActController conversation carried across customer messages,
+    every third one needing record_feedback, so Observations pile up
+
+For the ReAct run it also checks that every committed tool result is still in
+the compacted conversation.
+
+Usage:
+    python benchmarks/bench_compaction.py [--turns 50] [--threshold 3000]
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from openai import OpenAI
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from load_test_chat import import_app
+from bench_sessions import QUESTIONS
+
+CHECKPOINTS = (1, 5, 10, 20, 30, 40, 50)
+
+
+def message_for(turn: int) -> str:
+    question = QUESTIONS[turn % len(QUESTIONS)]
+    return f"{TOOL_TRIGGER} {question} (turn {turn + 1})" if turn % 3 == 2 else f"{question} (turn {turn + 1})"
+
+
+def app_curve(app, turns: int) -> list:
+    from react_agent.agent.metrics import METRICS
+
+    METRICS.reset()
+    history, curve = [], []
+    for turn in range(turns):
+        before = METRICS.counter("llm.prompt_tokens")
+        message = message_for(turn)
+        reply = app.chat_with_agent(message, history)
+        history.append((message, reply))
+        curve.append(METRICS.counter("llm.prompt_tokens") - before)
+    return curve
+
+
+def react_curve(llm_call, system_prompt: str, turns: int, compactor) -> tuple:
+    from react_agent.agent.metrics import METRICS
+    from react_agent.agent.react_loop import ReActController
+    from react_agent.agent.compaction import COMMITTED_PREFIX
+
+    METRICS.reset()
+    controller = ReActController(llm_call, max_turns=10, compactor=compactor)
+    conversation = [{"role": "system", "content": system_prompt}]
+    curve, committed = [], 0
+    for turn in range(turns):
+        before = METRICS.counter("llm.prompt_tokens")
+        _, conversation, metadata = controller.run(conversation + [{"role": "user", "content": message_for(turn)}])
+        committed += sum(1 for action in metadata["actions_taken"] if action["result"]["status"] == "success")
+        curve.append(METRICS.counter("llm.prompt_tokens") - before)
+
+    # Committed results: one-line summary entries plus the Observations still verbatim
+    in_summary = sum(m["content"].count(COMMITTED_PREFIX) for m in conversation if m["role"] == "system")
+    verbatim = sum(1 for m in conversation if m["role"] == "user" and m["content"].startswith("Observation:")
+                   and '"success"' in m["content"])
+    return curve, committed, in_summary + verbatim
+
+
+def print_curve(label: str, curve: list) -> None:
+    points = "  ".join(f"{curve[t - 1]:6.0f}" for t in CHECKPOINTS if t <= len(curve))
+    print(f"{label:<22} {points}   total {sum(curve) / 1000:7.1f}k")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--threshold", type=int, default=3000, help="Compaction threshold (estimated tokens)")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer() as server:
+        app = import_app(server.base_url)
+        from react_agent.agent.compaction import Compactor
+        from react_agent.agent.metrics import METRICS
+        from react_agent.agent.personas import get_persona_prompt
+        from react_agent.run_detailed_experiments import create_llm_call
+
+        app.RESPONSE_CACHE.maxsize = 0
+        header = "  ".join(f"t={t:<4}" for t in CHECKPOINTS if t <= args.turns)
+        print("=" * 100)
+        print(f"PROMPT TOKENS PER TURN OVER {args.turns} TURNS (compaction threshold {args.threshold})")
+        print("=" * 100)
+
+        print(f"{'app.chat_with_agent':<22} {header}")
+        for label, threshold in (("  no compaction", 0), ("  compaction", args.threshold)):
+            app.COMPACTOR = Compactor(threshold=threshold)
+            print_curve(label, app_curve(app, args.turns))
+        print(f"{'':<22} {METRICS.counter('compaction.runs'):.0f} compactions, "
+              f"{METRICS.counter('compaction.tokens_saved') / 1000:.1f}k tokens saved")
+
+        llm_call = create_llm_call(temperature=0.2, client=OpenAI(base_url=server.base_url, api_key="sk-fake"))
+        system_prompt = get_persona_prompt("friendly_advisor", app.BUSINESS_CONTEXT)
+        print(f"\n{'ReActController':<22} {header}")
+        for label, compactor in (("  no compaction", None), ("  compaction", Compactor(threshold=args.threshold))):
+            curve, committed, kept = react_curve(llm_call, system_prompt, args.turns, compactor)
+            print_curve(label, curve)
+            print(f"{'':<22} committed tool results: {committed} recorded, {kept} still in the conversation"
+                  + (f", {METRICS.counter('compaction.observations_dropped'):.0f} stale observations dropped"
+                     if compactor else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
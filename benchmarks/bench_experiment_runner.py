@@ -0,0 +1,97 @@
+"""
+Experiment runner benchmark: wall-clock time of the grid against a fake LLM
+
+Runs the EXPERIMENTS x TEST_SCENARIOS grid of run_detailed_experiments.py
+against the fake OpenAI server at several concurrency levels (1 = the former
+sequential behaviour), with every Nth request rate-limited (HTTP 429 +
+Retry-After) so the backoff path is exercised. Then it drops the last records
+of the results file, as an interrupted run would, and times --resume.
+
+Usage:
+    python benchmarks/bench_experiment_runner.py [--latency 0.2] [--concurrency 1 4 8]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from openai import OpenAI
+
+from fake_openai_server import FakeOpenAIServer
+from react_agent.agent.metrics import METRICS
+from react_agent.run_detailed_experiments import (
+    EXPERIMENTS, TEST_SCENARIOS, create_llm_call, load_business_context, run_grid,
+)
+
+
+def timed_grid(workdir: Path, server: FakeOpenAIServer, concurrency: int, resume: bool = False) -> float:
+    client = OpenAI(base_url=server.base_url, api_key="sk-fake", max_retries=0)
+
+    def factory(**config):
+        return create_llm_call(client=client, **config)
+
+    METRICS.reset()
+    start = time.perf_counter()
+    run_grid(load_business_context(), workdir / "detailed_results.jsonl", workdir / "runs.csv",
+             concurrency=concurrency, resume=resume, llm_factory=factory)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake server latency per completion")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rate-limit-every", type=int, default=7)
+    args = parser.parse_args()
+
+    cells = len(EXPERIMENTS) * len(TEST_SCENARIOS)
+    root = Path(tempfile.mkdtemp(prefix="fleur-grid-"))
+    os.chdir(root)  # tool logs from the agents land here
+    results = []
+
+    with FakeOpenAIServer(latency=args.latency, rate_limit_every=args.rate_limit_every) as server:
+        for concurrency in args.concurrency:
+            workdir = root / f"c{concurrency}"
+            sys.stdout = open(os.devnull, "w")
+            try:
+                elapsed = timed_grid(workdir, server, concurrency)
+            finally:
+                sys.stdout.close()
+                sys.stdout = sys.__stdout__
+            results.append((concurrency, elapsed, METRICS.counter("experiments.retries")))
+
+        # Simulate an interrupted run: lose the last third of the records, then resume
+        workdir = root / f"c{args.concurrency[-1]}"
+        detailed = workdir / "detailed_results.jsonl"
+        lines = detailed.read_text(encoding="utf-8").splitlines(keepends=True)
+        kept = len(lines) * 2 // 3
+        detailed.write_text("".join(lines[:kept]) + lines[kept][: len(lines[kept]) // 2], encoding="utf-8")
+        sys.stdout = open(os.devnull, "w")
+        try:
+            resumed = timed_grid(workdir, server, args.concurrency[-1], resume=True)
+        finally:
+            sys.stdout.close()
+            sys.stdout = sys.__stdout__
+        recovered = len(detailed.read_text(encoding="utf-8").splitlines())
+
+    print("=" * 72)
+    print(f"EXPERIMENT GRID ({cells} cells, {args.latency * 1000:.0f} ms per completion, "
+          f"every {args.rate_limit_every}th request rate-limited)")
+    print("=" * 72)
+    baseline = results[0][1]
+    for concurrency, elapsed, retries in results:
+        print(f"concurrency {concurrency:<3} {elapsed:7.2f}s   {baseline / elapsed:5.1f}x   {retries:3.0f} retries")
+    print(f"\nresume after losing {len(lines) - kept} records (one cut mid-line): "
+          f"{resumed:.2f}s, {recovered} records in the file")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
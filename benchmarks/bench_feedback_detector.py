@@ -0,0 +1,114 @@
+"""
+Feedback detector benchmark: accuracy on the labeled set and messages/sec
+
+Compares, on the held-out "test" split of react_agent/agent/feedback_examples.jsonl:
+  - legacy: app.py's former detect_feedback (lowercase + ~50 substring scans)
+  - keywords: FeedbackDetector("keywords"), one whole-word alternation regex
+  - classifier: FeedbackDetector("classifier"), hashed n-gram logistic
+    regression trained on the "train" split
+Reports precision/recall/F1 and the misclassified messages, then throughput in
+messages/sec over the whole labeled set repeated (classifier one by one and
+batched with detect_many).
+
+Usage:
+    python benchmarks/bench_feedback_detector.py [--messages 100000]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.feedback import FeedbackDetector, load_examples
+
+
+def legacy_detect_feedback(message):
+    """The former app.py detect_feedback."""
+    message_lower = message.lower()
+    positive_keywords = [
+        'amazing', 'love', 'loved', 'best', 'great', 'excellent', 'delicious',
+        'wonderful', 'fantastic', 'awesome', 'perfect', 'incredible', 'outstanding',
+        'tasty', 'yummy', 'fresh', 'good', 'nice', 'enjoyed', 'favorite', 'favourite'
+    ]
+    negative_keywords = [
+        'bad', 'terrible', 'awful', 'horrible', 'disappointing', 'disappointed',
+        'too expensive', 'too sweet', 'too salty', 'stale', 'cold', 'dry', 'burnt',
+        'undercooked', 'overcooked', 'worst', 'disgusting', 'gross'
+    ]
+    suggestion_keywords = [
+        'should', 'could', 'suggest', 'recommend', 'add', 'wish', 'hope',
+        'would be nice', 'would be better', 'improve', 'change'
+    ]
+    for keyword in positive_keywords + negative_keywords + suggestion_keywords:
+        if keyword in message_lower:
+            return True
+    if '!' in message and len(message.split()) < 20:
+        return True
+    return False
+
+
+def evaluate(label: str, detect, examples: list) -> list:
+    predictions = [detect(text) for text, _ in examples]
+    tp = sum(1 for p, (_, y) in zip(predictions, examples) if p and y)
+    fp = sum(1 for p, (_, y) in zip(predictions, examples) if p and not y)
+    fn = sum(1 for p, (_, y) in zip(predictions, examples) if not p and y)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    accuracy = sum(1 for p, (_, y) in zip(predictions, examples) if p == bool(y)) / len(examples)
+    print(f"{label:<12} precision {precision:5.2f}   recall {recall:5.2f}   F1 {f1:5.2f}   "
+          f"accuracy {accuracy:5.2f}   ({fp} false positives, {fn} missed)")
+    return [(text, y) for p, (text, y) in zip(predictions, examples) if p != bool(y)]
+
+
+def throughput(fn, messages: list) -> float:
+    start = time.perf_counter()
+    fn(messages)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+
+    test = load_examples(split="test")
+    keywords = FeedbackDetector("keywords")
+    start = time.perf_counter()
+    classifier = FeedbackDetector("classifier")
+    classifier.classifier
+    trained = time.perf_counter() - start
+
+    print("=" * 96)
+    print(f"ACCURACY ({len(test)} held-out messages, {sum(y for _, y in test)} feedback; "
+          f"classifier trained in {trained * 1000:.0f} ms)")
+    print("=" * 96)
+    for label, detect in (("legacy", legacy_detect_feedback), ("keywords", keywords.detect),
+                          ("classifier", classifier.detect)):
+        wrong = evaluate(label, detect, test)
+        for text, y in wrong:
+            print(f"{'':<12} {'missed' if y else 'false +'}: {text}")
+
+    everything = [text for text, _ in load_examples()]
+    messages = (everything * (args.messages // len(everything) + 1))[:args.messages]
+    print("\n" + "=" * 96)
+    print(f"THROUGHPUT ({len(messages)} messages)")
+    print("=" * 96)
+    runs = [
+        ("legacy", lambda batch: [legacy_detect_feedback(m) for m in batch]),
+        ("keywords", lambda batch: [keywords.detect(m) for m in batch]),
+        ("classifier", lambda batch: [classifier.detect(m) for m in batch]),
+        ("classifier batched", classifier.detect_many),
+    ]
+    baseline = None
+    for label, fn in runs:
+        rate = throughput(fn, messages)
+        baseline = baseline or rate
+        print(f"{label:<20} {rate:12,.0f} msgs/s   {rate / baseline:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
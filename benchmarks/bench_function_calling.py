@@ -0,0 +1,98 @@
+"""
+Controller backend benchmark: text ReAct parsing vs native function calling
+
+Runs each TEST_SCENARIOS message (the unknown question needs record_feedback,
+plus a message that needs two tool calls) through the LangGraph agent in both
+modes against the fake OpenAI server, and reports per scenario the model turns,
+LLM calls, prompt/completion tokens and wall-clock latency.
+
+Usage:
+    python benchmarks/bench_function_calling.py [--latency 0.2] [--repeats 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from openai import OpenAI
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from react_agent.agent import create_langgraph_agent
+from react_agent.agent.metrics import METRICS
+from react_agent.run_detailed_experiments import (
+    LLM_FACTORIES, TEST_SCENARIOS, load_business_context,
+)
+
+SCENARIOS = dict(TEST_SCENARIOS)
+SCENARIOS["unknown_question"] = f"{TOOL_TRIGGER} {TEST_SCENARIOS['unknown_question']}"
+SCENARIOS["two_feedbacks"] = (f"{TOOL_TRIGGER} The croissants were amazing! "
+                              f"{TOOL_TRIGGER} Please add a gluten-free loaf.")
+
+
+def measure(agent, message: str, business_context: str, repeats: int) -> dict:
+    METRICS.reset()
+    latencies, turns = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = agent.run(message, business_context)
+        latencies.append(time.perf_counter() - start)
+        turns.append(result["metadata"]["turns"])
+    return {
+        "turns": statistics.mean(turns),
+        "calls": METRICS.counter("llm.calls") / repeats,
+        "prompt": METRICS.counter("llm.prompt_tokens") / repeats,
+        "completion": METRICS.counter("llm.completion_tokens") / repeats,
+        "latency": statistics.median(latencies),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake server latency per completion")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--persona", default="friendly_advisor")
+    args = parser.parse_args()
+
+    business_context = load_business_context()
+    os.chdir(tempfile.mkdtemp(prefix="fleur-fc-"))  # tool logs land here
+
+    print("=" * 92)
+    print(f"REACT TEXT vs FUNCTION CALLING ({args.persona}, {args.latency * 1000:.0f} ms per completion, "
+          f"mean of {args.repeats})")
+    print("=" * 92)
+    print(f"{'scenario':<18} {'mode':<17} {'turns':>5} {'calls':>5} {'prompt tok':>10} "
+          f"{'compl tok':>9} {'latency':>9}")
+
+    totals = {}
+    with FakeOpenAIServer(latency=args.latency) as server:
+        client = OpenAI(base_url=server.base_url, api_key="sk-fake", max_retries=0)
+        agents = {
+            mode: create_langgraph_agent(factory(temperature=0.2, client=client), persona=args.persona, mode=mode)
+            for mode, factory in LLM_FACTORIES.items()
+        }
+        for key, message in SCENARIOS.items():
+            for mode, agent in agents.items():
+                row = measure(agent, message, business_context, args.repeats)
+                for name, value in row.items():
+                    totals.setdefault(mode, {}).setdefault(name, 0)
+                    totals[mode][name] += value
+                print(f"{key:<18} {mode:<17} {row['turns']:5.1f} {row['calls']:5.1f} {row['prompt']:10.0f} "
+                      f"{row['completion']:9.0f} {row['latency'] * 1000:7.0f}ms")
+
+    print("-" * 92)
+    for mode, row in totals.items():
+        print(f"{'total':<18} {mode:<17} {row['turns']:5.1f} {row['calls']:5.1f} {row['prompt']:10.0f} "
+              f"{row['completion']:9.0f} {row['latency'] * 1000:7.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Idempotent tool execution benchmark: duplicate side effects and lookup cost
+
+Replays every recorded tool call (react_agent/logs/*.jsonl) through
+REGISTRY.dispatch in timestamp order, as one session, with the index clock
+following the recorded timestamps, and counts the log lines written:
+  - off: no idempotency index (every call writes)
+  - on: an IdempotencyIndex with a --window second window
+Then it restarts the index from its log and replays again (everything should
+be recognized), and times a duplicate check against an index of --keys keys.
+
+Usage:
+    python benchmarks/bench_idempotency.py [--window 3600] [--keys 100000]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from react_agent.agent.idempotency import IdempotencyIndex, idempotency_key
+from react_agent.agent.logwriter import flush_all
+from react_agent.agent.tools import REGISTRY
+
+RECORDED_LOGS = REPO_ROOT / "react_agent" / "logs"
+TOOL_LOGS = {
+    "feedback.jsonl": "record_feedback",
+    "leads.jsonl": "record_customer_interest",
+    "scheduled_pickups.jsonl": "schedule_pickup",
+    "cake_orders.jsonl": "create_cake_order",
+}
+
+
+def recorded_calls() -> list:
+    """(timestamp, tool, args) for every recorded log line, oldest first."""
+    calls = []
+    for filename, tool in TOOL_LOGS.items():
+        with open(RECORDED_LOGS / filename, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    at = datetime.fromisoformat(record.pop("ts").rstrip("Z")).timestamp()
+                    calls.append((at, tool, record))
+    return sorted(calls, key=lambda call: call[0])
+
+
+def replay(calls: list, index) -> dict:
+    """Dispatch every call; returns tool -> log lines written."""
+    clock = {"now": 0.0}
+    if index is not None:
+        index.clock = lambda: clock["now"]
+    REGISTRY.idempotency = index
+    written = dict.fromkeys(TOOL_LOGS.values(), 0)
+    for at, tool, args in calls:
+        clock["now"] = at
+        if not REGISTRY.dispatch(tool, args, session_id="recorded").get("duplicate"):
+            written[tool] += 1
+    flush_all()
+    return written
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--window", type=float, default=3600.0)
+    parser.add_argument("--keys", type=int, default=100000)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="fleur-idem-"))  # tool logs land here
+    calls = recorded_calls()
+    index_log = Path("idempotency_index.jsonl")
+
+    print("=" * 80)
+    print(f"RECORDED TOOL CALLS REPLAYED ({len(calls)} calls, window {args.window:.0f}s)")
+    print("=" * 80)
+    off = replay(calls, None)
+    on = replay(calls, IdempotencyIndex(window=args.window, log_path=index_log))
+    restarted = replay(calls, IdempotencyIndex(window=float("inf"), log_path=index_log))
+    print(f"{'tool':<26} {'calls':>6} {'off':>6} {'on':>6} {'after restart':>14}")
+    for tool in TOOL_LOGS.values():
+        total = sum(1 for _, name, _ in calls if name == tool)
+        print(f"{tool:<26} {total:6d} {off[tool]:6d} {on[tool]:6d} {restarted[tool]:14d}")
+    print(f"{'total':<26} {len(calls):6d} {sum(off.values()):6d} {sum(on.values()):6d} "
+          f"{sum(restarted.values()):14d}")
+
+    index = IdempotencyIndex(window=float("inf"))
+    keys = [idempotency_key("record_feedback", {"question": f"question number {i}"}, f"session-{i % 97}")
+            for i in range(args.keys)]
+    for key in keys:
+        index.claim(key)
+    sample = keys[::max(1, len(keys) // 10000)]
+    start = time.perf_counter()
+    for i, key in enumerate(sample):
+        idempotency_key("record_feedback", {"question": f"question number {i}"}, "session-1")
+        index.claim(key)
+    per_check = (time.perf_counter() - start) / len(sample)
+    print(f"\nkey + duplicate check against {len(index)} keys: {per_check * 1e6:.1f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Local tool confirmation benchmark: completions and latency on tool turns
+
+Sends tool-triggering messages (the fake server answers them with a
+record_feedback call) through app.chat_with_agent and app.chat_with_agent_async,
+with the confirmation fast path off and on:
+  - off: every tool turn makes a second completion for the reply
+  - on: the reply is rendered from the tool's confirmation template, except for
+    messages that also ask a question (every fourth one here)
+Reports completions per turn (llm.calls), LLM calls avoided
+(chat.llm_calls_avoided) and the p50/p95 latency of a tool turn.
+
+Usage:
+    python benchmarks/bench_local_confirmations.py [--turns 40] [--latency 0.2]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from load_test_chat import import_app
+
+
+def message_for(i: int) -> str:
+    if i % 4 == 3:
+        return f"{TOOL_TRIGGER} The rye was great, do you bake it on Sundays? (customer {i})"
+    return f"{TOOL_TRIGGER} The croissants were amazing today (customer {i})"
+
+
+async def async_latencies(app, turns: int) -> list:
+    latencies = []
+    for i in range(turns):
+        started = time.perf_counter()
+        await app.chat_with_agent_async(message_for(i), [])
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run(app, turns: int, use_async: bool, loop) -> dict:
+    from react_agent.agent.metrics import METRICS
+
+    METRICS.reset()
+    if use_async:
+        # One loop for all runs: the shared AsyncOpenAI client's connections belong to it
+        latencies = loop.run_until_complete(async_latencies(app, turns))
+    else:
+        latencies = []
+        for i in range(turns):
+            started = time.perf_counter()
+            app.chat_with_agent(message_for(i), [])
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "calls": METRICS.counter("llm.calls"),
+        "avoided": METRICS.counter("chat.llm_calls_avoided"),
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake server latency per completion")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        app = import_app(server.base_url)
+        app.RESPONSE_CACHE.maxsize = 0
+        loop = asyncio.new_event_loop()
+
+        print("=" * 92)
+        print(f"TOOL TURNS ({args.turns} per run, {args.latency * 1000:.0f} ms per completion, "
+              f"every 4th message also asks a question)")
+        print("=" * 92)
+        for handler, use_async in (("chat_with_agent", False), ("chat_with_agent_async", True)):
+            for enabled in (False, True):
+                app.LOCAL_CONFIRMATIONS = enabled
+                row = run(app, args.turns, use_async, loop)
+                label = f"{handler} ({'local' if enabled else 'model'})"
+                print(f"{label:<36} {row['calls'] / args.turns:4.2f} completions/turn   "
+                      f"{row['avoided']:3.0f} avoided   p50 {row['p50'] * 1000:5.0f} ms   "
+                      f"p95 {row['p95'] * 1000:5.0f} ms")
+        loop.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
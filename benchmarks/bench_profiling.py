@@ -0,0 +1,85 @@
+"""
+Profiling benchmark: what the profiler reports and what it costs
+
+Runs --turns chat turns (half of them tool turns) through app.chat_with_agent
+against the fake OpenAI server, plus one cold rebuild of the business snapshot
+(PDF extraction), with the profiler:
+  - off
+  - sample: stack sampling every 5 ms -> .collapsed + .txt
+  - cprofile: deterministic cProfile -> .pstats + .txt
+Prints the p50 turn latency of each run (the profiler's overhead) and the head
+of each hotspot report (network wait is excluded from it).
+
+Usage:
+    python benchmarks/bench_profiling.py [--turns 40] [--latency 0.05]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from load_test_chat import import_app
+from react_agent.agent.profiling import PROFILER
+from react_agent.agent.snapshot import DEFAULT_DOCS_DIR, load_snapshot
+
+
+def run(app, turns: int, label: str) -> list:
+    with PROFILER.request("load_snapshot"):
+        load_snapshot(DEFAULT_DOCS_DIR, Path(tempfile.mkdtemp()) / "snapshot.json", rebuild=True)
+    latencies = []
+    for i in range(turns):
+        message = (f"{TOOL_TRIGGER} The croissants were great today ({label} {i})" if i % 2
+                   else f"What breads are fresh now? ({label} {i})")
+        started = time.perf_counter()
+        app.chat_with_agent(message, [])
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server latency per completion")
+    parser.add_argument("--lines", type=int, default=22, help="Report lines shown per mode")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        app = import_app(server.base_url)
+        app.RESPONSE_CACHE.maxsize = 0
+        output_dir = Path("profiles")
+
+        print("=" * 96)
+        print(f"CHAT TURNS ({args.turns} per run, {args.latency * 1000:.0f} ms per completion)")
+        print("=" * 96)
+        reports = {}
+        for mode in ("off", "sample", "cprofile"):
+            if mode == "off":
+                PROFILER.configure(window=0)
+            else:
+                # One window covering the whole run (the snapshot rebuild + every turn)
+                PROFILER.configure(window=args.turns + 1, mode=mode, output_dir=output_dir / mode)
+            latencies = run(app, args.turns, mode)
+            print(f"{mode:<9} p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+                  f"mean {statistics.mean(latencies) * 1000:7.1f} ms")
+            if mode != "off":
+                reports[mode] = PROFILER.reports[-1]
+        PROFILER.configure(window=0)
+
+    for mode, report in reports.items():
+        print("\n" + "=" * 96)
+        print(f"{mode.upper()} REPORT ({', '.join(sorted(p.name for p in report.parent.iterdir()))})")
+        print("=" * 96)
+        print("\n".join(report.read_text(encoding="utf-8").splitlines()[:args.lines]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
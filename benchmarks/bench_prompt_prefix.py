@@ -0,0 +1,161 @@
+"""
+Prompt prefix benchmark: determinism across processes and cached-token share
+
+1. Determinism: renders the static prefixes (app.py's system prefix with its tools
+   schema, every persona prompt in full-context and retrieval mode) in two fresh
+   interpreters with different PYTHONHASHSEED values and checks that their
+   SHA-256 fingerprints match. Exits non-zero if any prefix differs.
+2. Cache reuse: replays multi-turn conversations through app.chat_with_agent
+   against the fake OpenAI server (which simulates the provider's prefix cache)
+   with the former layout (retrieved passages inside the system prompt) and the
+   prefix-aware layout, and reports prompt tokens served from cache and the
+   uncached remainder. Assistant turns in the history are the recorded replies
+   from react_agent/experiments/detailed_results.jsonl, so history has a
+   realistic size.
+
+Usage:
+    python benchmarks/bench_prompt_prefix.py [--conversations 4] [--turns 8]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer
+from load_test_chat import import_app
+
+RECORDED_RESULTS = REPO_ROOT / "react_agent" / "experiments" / "detailed_results.jsonl"
+
+CONVERSATION = [
+    "What breads are fresh now? When is the next batch?",
+    "Do you make custom cakes?",
+    "I need one for tomorrow at 3 pm.",
+    "Do you have gluten-free sourdough daily?",
+    "How do I pre-order and get delivery?",
+    "What are your opening hours?",
+    "Tell me about your viennoiserie",
+    "Do you cater events?",
+    "What flavors of cake do you have?",
+    "Can I order on WhatsApp?",
+]
+
+
+def recorded_replies() -> list:
+    with open(RECORDED_RESULTS, encoding="utf-8") as f:
+        return [json.loads(line)["response"]["final_answer"] for line in f if line.strip()]
+
+
+def prefix_fingerprints() -> dict:
+    """Fingerprint every static prefix this process would send."""
+    app = import_app("http://127.0.0.1:9/v1")
+    from react_agent.agent.personas import get_persona_prompt, list_personas
+    from react_agent.agent.prompt_layout import RETRIEVED_CONTEXT_NOTE, prefix_fingerprint
+
+    system = [{"role": "system", "content": app.SYSTEM_PREFIX}]
+    fingerprints = {
+        "app.tools": prefix_fingerprint([], app.tools),
+        "app.system_prefix": prefix_fingerprint(system, app.tools),
+    }
+    for persona in list_personas():
+        for mode, context in (("full", app.BUSINESS_CONTEXT), ("retrieval", RETRIEVED_CONTEXT_NOTE)):
+            prompt = get_persona_prompt(persona, context)
+            fingerprints[f"{persona}.{mode}"] = prefix_fingerprint([{"role": "system", "content": prompt}])
+    return fingerprints
+
+
+def check_determinism() -> bool:
+    runs = []
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        out = subprocess.run([sys.executable, __file__, "--fingerprints"], env=env,
+                             capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+
+    ok = True
+    print(f"{'prefix':<28} {'seed 1':<18} {'seed 2':<18}")
+    for name in runs[0]:
+        a, b = runs[0][name], runs[1].get(name)
+        ok &= a == b
+        print(f"{name:<28} {a[:16]:<18} {(b or '-')[:16]:<18} {'ok' if a == b else 'MISMATCH'}")
+    return ok
+
+
+def legacy_build_messages(app):
+    """The former layout: retrieved passages rendered into the system prompt."""
+    def build_messages(message, history):
+        query = f"{history[-1][0]} {message}" if history else message
+        context = app.BUSINESS_INDEX.context_for(query, app.RETRIEVAL_K) if app.RETRIEVAL_K > 0 else None
+        system = app.SYSTEM_PROMPT_TEMPLATE.format(business_context=context) if context else app.SYSTEM_PROMPT
+        messages = [{"role": "system", "content": system}]
+        for human, assistant in history:
+            messages.append({"role": "user", "content": human})
+            messages.append({"role": "assistant", "content": assistant})
+        messages.append({"role": "user", "content": message})
+        return messages
+    return build_messages
+
+
+def replay(app, label: str, conversations: int, turns: int) -> None:
+    from react_agent.agent.metrics import METRICS
+    from react_agent.agent.prompt_layout import cached_token_ratio
+
+    replies = recorded_replies()
+    with FakeOpenAIServer() as server:
+        app.client.base_url = server.base_url
+        METRICS.reset()
+        for c in range(conversations):
+            history = []
+            for t in range(turns):
+                message = CONVERSATION[(c + t) % len(CONVERSATION)]
+                app.chat_with_agent(message, history)
+                history.append((message, replies[(c * turns + t) % len(replies)]))
+
+    print(f"{label:<34} {METRICS.counter('llm.calls'):4.0f} calls "
+          f"{METRICS.counter('llm.prompt_tokens'):8.0f} prompt tokens "
+          f"{METRICS.counter('llm.cached_tokens'):8.0f} cached ({cached_token_ratio():5.1%})   "
+          f"{METRICS.counter('llm.prompt_tokens') - METRICS.counter('llm.cached_tokens'):7.0f} uncached")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--fingerprints", action="store_true",
+                        help="Print this process's prefix fingerprints as JSON and exit")
+    args = parser.parse_args()
+
+    if args.fingerprints:
+        print(json.dumps(prefix_fingerprints()))
+        return 0
+
+    print("=" * 86)
+    print("PREFIX DETERMINISM (two interpreters, different PYTHONHASHSEED)")
+    print("=" * 86)
+    deterministic = check_determinism()
+
+    print("\n" + "=" * 86)
+    print(f"CACHED PROMPT TOKENS ({args.conversations} conversations x {args.turns} turns, "
+          f"simulated provider prefix cache)")
+    print("=" * 86)
+    app = import_app("http://127.0.0.1:9/v1")
+    prefix_aware = app.build_messages
+    app.build_messages = legacy_build_messages(app)
+    replay(app, "passages in system prompt (before)", args.conversations, args.turns)
+    app.build_messages = prefix_aware
+    replay(app, "static prefix layout (after)", args.conversations, args.turns)
+
+    if not deterministic:
+        print("\nFAIL: static prefixes differ between processes")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Record store benchmark: indexed SQLite queries vs. a JSONL scan
+
+Generates --records pickups and a quarter as many cake orders as JSONL logs,
+imports them with the one-shot importer, then answers the same questions both
+ways:
+  - scan: read every line of the JSONL file, json.loads it, compare fields
+  - sqlite: RecordStore.find / count (indexed, case-insensitive)
+and checks that both return the same records. Also measures tool-style writes
+(RecordStore.insert) batched vs. one transaction per record.
+
+Usage:
+    python benchmarks/bench_record_store.py [--records 1000000] [--writes 20000]
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.store import TABLES, RecordStore
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday", "tomorrow"]
+ITEMS = ["2 sourdough loaves", "1 baguette", "6 croissants", "1 rye loaf", "4 pains au chocolat"]
+FLAVORS = ["chocolate", "vanilla", "red velvet", "lemon", "carrot"]
+
+
+def generate(logs_dir: Path, records: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    customers = [f"Customer {i}" for i in range(20000)]
+    dates = DAYS + [f"2025-{month:02d}-{day:02d}" for month in range(1, 13) for day in range(1, 29)]
+
+    def ts(i: int) -> str:
+        return f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00.{i:06d}Z"
+
+    with open(logs_dir / TABLES["pickups"]["file"], "w", encoding="utf-8") as f:
+        for i in range(records):
+            f.write(json.dumps({"ts": ts(i), "customer_name": rng.choice(customers), "items": rng.choice(ITEMS),
+                                "pickup_date": rng.choice(dates), "pickup_time": f"{rng.randint(8, 18)}:00"}) + "\n")
+    with open(logs_dir / TABLES["cake_orders"]["file"], "w", encoding="utf-8") as f:
+        for i in range(records // 4):
+            name = "Maria" if i % 5000 == 0 else rng.choice(customers)
+            email = "maria@test.com" if name == "Maria" else f"{name.replace(' ', '.').lower()}@example.com"
+            f.write(json.dumps({"ts": ts(i), "name": name, "email": email, "cake_size": "serves 20",
+                                "flavor": rng.choice(FLAVORS), "pickup_date": rng.choice(dates),
+                                "custom_message": ""}) + "\n")
+
+
+def scan(path: Path, **where) -> list:
+    """Matching records the way the JSONL logs are queried today."""
+    wanted = {name: value.lower() for name, value in where.items()}
+    matches = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if all(str(record.get(name, "")).lower() == value for name, value in wanted.items()):
+                matches.append(record)
+    return matches
+
+
+def timed(fn, repeat: int = 1):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--writes", type=int, default=20000)
+    args = parser.parse_args()
+
+    logs_dir = Path(tempfile.mkdtemp(prefix="fleur-store-"))
+    generate(logs_dir, args.records)
+    store = RecordStore(logs_dir / "records.db")
+    elapsed, added = timed(lambda: store.import_jsonl(logs_dir, ["pickups", "cake_orders"]))
+    rows = sum(added.values())
+    size = sum(p.stat().st_size for p in logs_dir.glob("records.db*")) / 1e6
+
+    print("=" * 88)
+    print(f"IMPORT ({rows} records in {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s, {size:.0f} MB database)")
+    print("=" * 88)
+    _, again = timed(lambda: store.import_jsonl(logs_dir, ["pickups", "cake_orders"]))
+    print(f"re-import adds {sum(again.values())} rows")
+
+    queries = [
+        ("pickups for Saturday", "pickups", {"pickup_date": "saturday"}),
+        ("pickups for 2025-06-14", "pickups", {"pickup_date": "2025-06-14"}),
+        ("pickups by Customer 42", "pickups", {"customer_name": "Customer 42"}),
+        ("orders for maria@test.com", "cake_orders", {"email": "maria@test.com"}),
+    ]
+    print("\n" + "=" * 88)
+    print("QUERIES")
+    print("=" * 88)
+    print(f"{'query':<28} {'rows':>7} {'scan':>10} {'sqlite':>10} {'speedup':>9}")
+    for label, table, where in queries:
+        scan_time, scanned = timed(lambda: scan(logs_dir / TABLES[table]["file"], **where))
+        store_time, found = timed(lambda: store.find(table, **where), repeat=5)
+        assert sorted(r["ts"] for r in scanned) == sorted(r["ts"] for r in found), label
+        print(f"{label:<28} {len(found):7d} {scan_time * 1000:8.0f}ms {store_time * 1000:8.2f}ms "
+              f"{scan_time / store_time:8.0f}x")
+    count_time, total = timed(lambda: store.count("pickups", since="2025-03-01", until="2025-04-01"), repeat=5)
+    print(f"{'pickups logged in March':<28} {total:7d} {'':>10} {count_time * 1000:8.2f}ms")
+    store.close()
+
+    print("\n" + "=" * 88)
+    print(f"TOOL WRITES ({args.writes} inserts)")
+    print("=" * 88)
+    for max_batch in (1, 64):
+        writer = RecordStore(logs_dir / f"writes-{max_batch}.db", max_batch=max_batch)
+        records = [{"ts": f"2025-10-25T12:00:00.{i:06d}Z", "question": f"question {i}"} for i in range(args.writes)]
+
+        def write():
+            for record in records:
+                writer.insert("feedback", record)
+            writer.flush()
+
+        elapsed, _ = timed(write)
+        assert writer.count("feedback") == args.writes
+        print(f"max_batch={max_batch:<3} {args.writes / elapsed:12,.0f} inserts/s")
+        writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Response cache replay benchmark
+
+Builds a workload from what the bakery has actually been asked - the tool logs
+(react_agent/logs/*.jsonl) and the experiment scenarios
+(react_agent/experiments/detailed_results.jsonl) - in timestamp order, and
+replays it through app.chat_with_agent against the fake OpenAI server with the
+response cache off and on. The cache clock follows the recorded timestamps, so
+bake-cycle expiry behaves as it would have on the day.
+
+Whether a question needs a tool is taken from the recordings: the majority
+outcome of its experiment runs if it has any, otherwise yes (every log line was
+written by a tool). Tool questions are sent with the fake server's tool trigger.
+
+Usage:
+    python benchmarks/bench_response_cache.py [--latency 0.1]
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from load_test_chat import import_app
+
+LOGS_DIR = REPO_ROOT / "react_agent" / "logs"
+RECORDED_RESULTS = REPO_ROOT / "react_agent" / "experiments" / "detailed_results.jsonl"
+
+
+def _read_jsonl(path: Path) -> list:
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.rstrip("Z")).timestamp()
+
+
+def _log_text(record: dict) -> str:
+    """The customer request behind one tool log line."""
+    if "question" in record:
+        return record["question"]
+    if "message" in record:
+        return record["message"]
+    if "items" in record:
+        return f"Pickup for {record['customer_name']}: {record['items']} {record['pickup_date']} at {record['pickup_time']}"
+    return f"Cake order for {record.get('name')}: {record.get('cake_size')} {record.get('flavor')} for {record.get('pickup_date')}"
+
+
+def build_workload() -> list:
+    """[(timestamp, message)] in replay order, tool questions carrying the tool trigger."""
+    from react_agent.agent.response_cache import normalize_question
+
+    requests = []
+    outcomes = {}
+    for result in _read_jsonl(RECORDED_RESULTS):
+        message = result["scenario"]["user_message"]
+        used_tools = bool(result["response"]["actions_taken"])
+        requests.append((_timestamp(result["timestamp"]), message))
+        outcomes.setdefault(normalize_question(message), []).append(used_tools)
+
+    for path in sorted(LOGS_DIR.glob("*.jsonl")):
+        for record in _read_jsonl(path):
+            requests.append((_timestamp(record["ts"]), _log_text(record)))
+
+    workload = []
+    for ts, message in sorted(requests, key=lambda r: r[0]):
+        recorded = outcomes.get(normalize_question(message))
+        needs_tool = sum(recorded) * 2 > len(recorded) if recorded else True
+        workload.append((ts, f"{TOOL_TRIGGER} {message}" if needs_tool else message))
+    return workload
+
+
+def replay(app, workload: list, cache_size: int, latency: float) -> None:
+    from react_agent.agent.metrics import METRICS
+    from react_agent.agent.response_cache import ResponseCache
+
+    now = [0.0]
+    app.RESPONSE_CACHE = ResponseCache(maxsize=cache_size, clock=lambda: now[0])
+
+    with FakeOpenAIServer(latency=latency) as server:
+        app.client.base_url = server.base_url
+        METRICS.reset()
+        latencies = []
+        for ts, message in workload:
+            now[0] = ts
+            start = time.perf_counter()
+            app.chat_with_agent(message, [])
+            latencies.append(time.perf_counter() - start)
+        calls = server.requests_served
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    label = f"cache {'on (' + str(cache_size) + ')' if cache_size else 'off'}"
+    print(f"{label:<14} {len(workload):4d} requests  {calls:4d} LLM calls  "
+          f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms  "
+          f"total {sum(latencies):6.2f}s")
+    if cache_size:
+        info = app.RESPONSE_CACHE.info()
+        hit = METRICS.summary("response_cache.hit_seconds")
+        miss = METRICS.summary("response_cache.miss_seconds")
+        print(f"{'':<14} hit rate {info['hit_rate']:.1%} ({info['hits']:.0f}/{info['lookups']:.0f}), "
+              f"{METRICS.counter('response_cache.bypassed'):.0f} tool-bound bypasses, {info['entries']} entries")
+        if hit and miss:
+            print(f"{'':<14} hit latency p50 {hit['p50'] * 1e6:.0f} us   miss latency p50 {miss['p50'] * 1000:.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="Fake server latency per completion")
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+
+    workload = build_workload()
+    app = import_app("http://127.0.0.1:9/v1")
+    tool_requests = sum(TOOL_TRIGGER in message for _, message in workload)
+
+    print("=" * 96)
+    print(f"RESPONSE CACHE REPLAY ({len(workload)} recorded requests, {tool_requests} needing a tool, "
+          f"{args.latency * 1000:.0f} ms per completion)")
+    print("=" * 96)
+    replay(app, workload, 0, args.latency)
+    replay(app, workload, args.cache_size, args.latency)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Results analytics benchmark: load-everything vs. one streaming pass vs. the column cache
+
+Generates --records experiment records (the recorded ones with varied
+personas, timestamps and answer lengths) as a detailed_results.jsonl file and
+answers the same questions three ways:
+  - legacy: the old view_detailed_results.py approach, every record in a list,
+    then one pass per statistic
+  - stream: aggregate(iter_rows(...)), one pass, filters applied per line
+  - cache: ColumnarCache.query on memory-mapped NumPy columns
+Reports time and tracemalloc peak, checks that stream and cache agree (and
+match the legacy means), then appends --append records and times the
+incremental cache refresh.
+
+Usage:
+    python benchmarks/bench_results_analytics.py [--records 200000] [--append 2000]
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from datetime import datetime, timedelta
+from collections import defaultdict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.analytics import ColumnarCache, aggregate, iter_rows
+
+RECORDINGS = Path(__file__).resolve().parent.parent / "react_agent" / "experiments" / "detailed_results.jsonl"
+PERSONAS = ["friendly_advisor", "strict_expert", "playful_baker", "concise_clerk"]
+QUERIES = [
+    ("all, by persona", {}, ("persona",)),
+    ("by persona, scenario", {}, ("persona", "scenario")),
+    ("one persona, by date", {"persona": "strict_expert"}, ("date",)),
+    ("one scenario, one week", {"scenario": "freshness", "since": "2025-03-01", "until": "2025-03-07"}, ("persona",)),
+]
+
+
+def generate(path: Path, records: int, start: int = 0, seed: int = 7) -> None:
+    with open(RECORDINGS, encoding="utf-8") as f:
+        recorded = [json.loads(line) for line in f if line.strip()]
+    rng = random.Random(seed + start)
+    epoch = datetime(2025, 1, 1)
+    with open(path, "a", encoding="utf-8") as f:
+        for i in range(start, start + records):
+            record = json.loads(json.dumps(rng.choice(recorded)))
+            record["timestamp"] = (epoch + timedelta(seconds=60 * i)).isoformat()
+            record["experiment"]["persona"] = rng.choice(PERSONAS)
+            record["experiment"]["temperature"] = rng.choice([0.2, 0.5, 0.7, 0.9])
+            answer = record["response"]["final_answer"]
+            record["response"]["final_answer"] = answer[:rng.randint(len(answer) // 2, len(answer))]
+            record["response"]["turns"] = len(record["response"]["actions_taken"]) + 1 + (rng.random() < 0.05)
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def legacy(path: Path) -> dict:
+    """The pre-streaming view: every record in memory, one pass per statistic."""
+    results = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                results.append(json.loads(line))
+    lengths, tools, turns = defaultdict(list), defaultdict(list), defaultdict(list)
+    for r in results:
+        lengths[r["experiment"]["persona"]].append(len(r["response"]["final_answer"]))
+    for r in results:
+        tools[r["experiment"]["persona"]].append(len(r["response"]["actions_taken"]))
+    for r in results:
+        turns[r["experiment"]["persona"]].append(r["response"]["turns"])
+    return {persona: {"response_chars": sum(values) / len(values),
+                      "tool_calls": sum(tools[persona]) / len(tools[persona]),
+                      "turns": sum(turns[persona]) / len(turns[persona])}
+            for persona, values in lengths.items()}
+
+
+def measure(fn):
+    """(seconds, peak MiB, result) of fn()."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--append", type=int, default=2000)
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="fleur-analytics-"))
+    path = root / "detailed_results.jsonl"
+    generate(path, args.records)
+    print(f"{args.records} records, {path.stat().st_size / 1e6:.1f} MB\n")
+
+    legacy_time, legacy_peak, legacy_means = measure(lambda: legacy(path))
+    stream_time, stream_peak, streamed = measure(lambda: aggregate(iter_rows(path), by=("persona",)))
+    agree = all(abs(streamed[(persona,)][name]["mean"] - means[name]) < 1e-6
+                for persona, means in legacy_means.items() for name in means)
+    print(f"{'mean per persona':<26} {'seconds':>9} {'peak MiB':>9}")
+    print(f"{'legacy (load all)':<26} {legacy_time:9.2f} {legacy_peak:9.1f}")
+    print(f"{'stream (one pass)':<26} {stream_time:9.2f} {stream_peak:9.1f}   "
+          f"same means: {agree}, plus p50/p90/p99/max")
+
+    cache = ColumnarCache(path)
+    build_time, build_peak, built = measure(cache.refresh)
+    noop_time, _, unchanged = measure(ColumnarCache(path).refresh)
+    print(f"\ncache build {build_time:.2f}s ({built} rows, peak {build_peak:.1f} MiB)   "
+          f"refresh when current {noop_time * 1000:.1f} ms ({unchanged} rows read)")
+
+    print(f"\n{'query':<26} {'stream s':>9} {'cache ms':>9} {'groups':>7}  equal")
+    for name, filters, by in QUERIES:
+        stream_time, _, streamed = measure(lambda: aggregate(iter_rows(path, **filters), by=by))
+        cache_time, _, cached = measure(lambda: ColumnarCache(path).query(by=by, **filters))
+        print(f"{name:<26} {stream_time:9.2f} {cache_time * 1000:9.1f} {len(cached):7d}  {cached == streamed}")
+
+    generate(path, args.append, start=args.records)
+    refresh_time, _, appended = measure(ColumnarCache(path).refresh)
+    equal = ColumnarCache(path).query(by=("persona",)) == aggregate(iter_rows(path), by=("persona",))
+    print(f"\nappended {args.append} records: incremental refresh {refresh_time * 1000:.0f} ms "
+          f"({appended} rows read), cache equal to stream: {equal}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Retrieval benchmark: prompt size and grounding quality vs. top-k
+
+For every TEST_SCENARIOS message, builds the persona prompt with the full
+business context and with the top-k retrieved passages, and reports:
+  - prompt tokens (estimated at ~4 characters per token)
+  - fact recall: share of the scenario's expected facts present in the prompt
+
+With --live (needs OPENAI_API_KEY) each configuration is also run through the
+agent and the fact recall of the final answer is reported.
+
+Usage:
+    python benchmarks/bench_retrieval.py [--k 1 2 3 4 6] [--persona friendly_advisor] [--live]
+"""
+
+import re
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.personas import get_persona_prompt
+from react_agent.agent.retrieval import build_business_index
+from react_agent.run_detailed_experiments import TEST_SCENARIOS, load_business_context
+from react_agent.agent.snapshot import load_snapshot
+
+# Facts a grounded answer to each scenario should be able to cite
+EXPECTED_FACTS = {
+    "freshness": ["every 3 hours", "bake times"],
+    "custom_cake": ["24-hour notice", "cake builder"],
+    "unknown_question": ["sourdough"],
+    "preorder": ["whatsapp", "2-hour windows"],
+}
+
+
+def _normalize(text: str) -> str:
+    # PDF extraction splits words ("24 -hour notic e"), so compare alphanumerics only
+    return re.sub(r"[^0-9a-z]", "", text.lower())
+
+
+def fact_recall(text: str, facts: list) -> float:
+    haystack = _normalize(text)
+    return sum(_normalize(fact) in haystack for fact in facts) / len(facts)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 2, 3, 4, 6])
+    parser.add_argument("--persona", default="friendly_advisor")
+    parser.add_argument("--live", action="store_true", help="Also run the agent (needs OPENAI_API_KEY)")
+    args = parser.parse_args()
+
+    full_context = load_business_context()
+    index = build_business_index(load_snapshot().documents)
+
+    configs = [("full", None)] + [(f"k={k}", k) for k in args.k]
+
+    agents = {}
+    if args.live:
+        from react_agent.agent import create_langgraph_agent
+        from react_agent.run_detailed_experiments import create_llm_call
+        llm_call = create_llm_call(temperature=0.2)
+        for label, k in configs:
+            agents[label] = create_langgraph_agent(
+                llm_call, persona=args.persona, retriever=index if k else None, top_k=k or 0
+            )
+
+    print("=" * 78)
+    print(f"RETRIEVAL BENCHMARK ({len(index)} chunks, persona: {args.persona})")
+    print("=" * 78)
+    header = f"{'config':<8} {'avg prompt tok':>15} {'vs full':>8} {'prompt recall':>14}"
+    if args.live:
+        header += f" {'answer recall':>14}"
+    print(header)
+
+    full_tokens = None
+    for label, k in configs:
+        tokens, prompt_recall, answer_recall = [], [], []
+        for key, message in TEST_SCENARIOS.items():
+            context = index.context_for(message, k) if k else full_context
+            prompt = get_persona_prompt(args.persona, context)
+            tokens.append(estimate_tokens(prompt) + estimate_tokens(message))
+            prompt_recall.append(fact_recall(context, EXPECTED_FACTS[key]))
+
+            if args.live:
+                result = agents[label].run(message, full_context)
+                answer_recall.append(fact_recall(result["final_answer"], EXPECTED_FACTS[key]))
+
+        avg_tokens = sum(tokens) / len(tokens)
+        full_tokens = full_tokens or avg_tokens
+        line = (f"{label:<8} {avg_tokens:>15.0f} {avg_tokens / full_tokens:>7.0%} "
+                f"{sum(prompt_recall) / len(prompt_recall):>14.0%}")
+        if args.live:
+            line += f" {sum(answer_recall) / len(answer_recall):>14.0%}"
+        print(line)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
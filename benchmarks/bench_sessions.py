@@ -0,0 +1,105 @@
+"""
+Session store benchmark: prompt size and memory for long multi-session chats
+
+Interleaves N concurrent conversations of T turns each through app.chat_with_agent
+against the fake OpenAI server, the way the Gradio UI calls it (the client's
+history is passed every time):
+  - history: no session id, so every turn is rebuilt and resent from the history
+  - sessions: a session id per conversation (request.session_hash), so the prompt
+    comes from the SessionStore (older turns summarized past the token budget)
+A third run caps the store below N sessions to show LRU eviction and resync.
+
+Reports the prompt tokens of the last turn and in total (from the server's
+usage), and the bytes/tokens held per session.
+
+Usage:
+    python benchmarks/bench_sessions.py [--sessions 10] [--turns 60] [--budget 2000]
+"""
+
+import sys
+import argparse
+from types import SimpleNamespace
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer
+from load_test_chat import import_app
+
+QUESTIONS = [
+    "What breads are fresh now? When is the next batch?",
+    "I need a custom cake for tomorrow at 3 pm.",
+    "How do I pre-order and get delivery?",
+    "Do you have gluten-free sourdough daily?",
+    "What pastries do you have in the morning?",
+    "Can I get a dessert table for a birthday party?",
+    "What coffee drinks do you serve?",
+    "Where are you located and when do you open?",
+]
+
+
+def run(app, sessions: int, turns: int, use_sessions: bool) -> dict:
+    from react_agent.agent.metrics import METRICS
+
+    METRICS.reset()
+    histories = [[] for _ in range(sessions)]
+    last_turn_tokens = 0
+    for turn in range(turns):
+        before = METRICS.counter("llm.prompt_tokens")
+        for i, history in enumerate(histories):
+            message = f"{QUESTIONS[(turn + i) % len(QUESTIONS)]} (turn {turn + 1})"
+            request = SimpleNamespace(session_hash=f"session-{i}") if use_sessions else None
+            reply = app.chat_with_agent(message, history, request)
+            history.append((message, reply))
+        last_turn_tokens = (METRICS.counter("llm.prompt_tokens") - before) / sessions
+    return {
+        "last": last_turn_tokens,
+        "total": METRICS.counter("llm.prompt_tokens"),
+        "compactions": METRICS.counter("sessions.compactions"),
+        "evictions": METRICS.counter("sessions.evictions"),
+        "resynced": METRICS.counter("sessions.resynced"),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--budget", type=int, default=2000, help="Session token budget")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer() as server:
+        app = import_app(server.base_url)
+        from react_agent.agent.sessions import SessionStore
+        # Every turn is unique, but keep the FAQ cache out of the comparison
+        app.RESPONSE_CACHE.maxsize = 0
+        # Measure prompt sizes, not the per-session token quota cutting chats off
+        app.TOKENS.session_quota = 0
+
+        print("=" * 96)
+        print(f"SESSION STORE ({args.sessions} interleaved chats x {args.turns} turns, "
+              f"budget {args.budget} tokens/session, retrieval k={app.RETRIEVAL_K})")
+        print("=" * 96)
+        variants = [
+            ("history", False, None),
+            ("sessions", True, args.sessions),
+            (f"sessions (LRU {args.sessions // 2})", True, args.sessions // 2),
+        ]
+        for label, use_sessions, max_sessions in variants:
+            if use_sessions:
+                app.SESSIONS = SessionStore(max_sessions=max_sessions, token_budget=args.budget)
+            row = run(app, args.sessions, args.turns, use_sessions)
+            print(f"{label:<20} last-turn prompt {row['last']:7.0f} tok   total {row['total'] / 1000:8.1f}k tok   "
+                  f"compactions {row['compactions']:4.0f}  evictions {row['evictions']:4.0f}  "
+                  f"resyncs {row['resynced']:4.0f}")
+            if use_sessions:
+                info = app.SESSIONS.info()
+                print(f"{'':<20} held: {info['sessions']} sessions, {info['bytes'] / 1024:.1f} KiB, "
+                      f"{info['tokens']} tok (max {info['max_tokens']} tok / {info['max_bytes']} B per session)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Startup-time benchmark: cold PDF parse vs. warm snapshot load
+
+Measures what app.py and run_detailed_experiments.py pay at import time to get
+the business context, with and without a current snapshot on disk.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 20]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.snapshot import (
+    DEFAULT_DOCS_DIR,
+    DEFAULT_SOURCES,
+    extract_document_text,
+    load_snapshot,
+)
+
+
+def cold_parse(docs_dir: Path) -> dict:
+    """What every process start did before the snapshot existed."""
+    documents = {}
+    for name in DEFAULT_SOURCES:
+        path = docs_dir / name
+        if path.exists():
+            documents[name] = extract_document_text(path)
+    return documents
+
+
+def time_calls(fn, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    print(f"{label:<28} median {statistics.median(timings):8.2f} ms   "
+          f"min {min(timings):8.2f} ms   max {max(timings):8.2f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="Iterations per measurement")
+    parser.add_argument("--docs-dir", type=Path, default=DEFAULT_DOCS_DIR)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = Path(tmp) / "business_snapshot.json"
+
+        cold = time_calls(lambda: cold_parse(args.docs_dir), args.repeat)
+        build = time_calls(lambda: load_snapshot(args.docs_dir, snapshot_path, rebuild=True), 1)
+        warm = time_calls(lambda: load_snapshot(args.docs_dir, snapshot_path), args.repeat)
+
+        snapshot = load_snapshot(args.docs_dir, snapshot_path)
+        assert snapshot.documents == cold_parse(args.docs_dir), "snapshot text differs from a fresh parse"
+
+    print("=" * 70)
+    print(f"STARTUP BENCHMARK ({args.repeat} iterations, docs: {args.docs_dir})")
+    print("=" * 70)
+    report("Cold parse (PyPDF2)", cold)
+    report("Snapshot build", build)
+    report("Warm snapshot load", warm)
+    print(f"\nSpeedup: {statistics.median(cold) / statistics.median(warm):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Streaming benchmark: time-to-first-token vs. full reply time
+
+Drives app.chat_with_agent_stream against the fake streaming server and checks
+that the streamed reply matches the non-streaming handler's, including the
+tool-call path (tool calls reassembled from streamed fragments). "tool call"
+is answered by a local confirmation; "tool call + reply" asks a question, so
+the second completion is streamed too.
+
+Usage:
+    python benchmarks/bench_streaming.py [--runs 10] [--latency 0.3] [--token-latency 0.02]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from load_test_chat import import_app
+
+SCENARIOS = {
+    "direct answer": "What breads are fresh now?",
+    "tool call": f"{TOOL_TRIGGER} The croissants were amazing!",
+    "tool call + reply": f"{TOOL_TRIGGER} The croissants were amazing! Do you bake them daily?",
+}
+
+
+async def stream_once(app, message: str):
+    start = time.perf_counter()
+    first = None
+    reply = ""
+    async for reply in app.chat_with_agent_stream(message, []):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, reply
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake API latency before the first chunk (s)")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Fake delay between tokens (s)")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency, token_latency=args.token_latency) as server:
+        app = import_app(server.base_url)
+        app.RESPONSE_CACHE.maxsize = 0  # every run streams from the server
+
+        print("=" * 78)
+        print(f"STREAMING BENCHMARK ({args.runs} runs, {args.latency * 1000:.0f} ms to first chunk, "
+              f"{args.token_latency * 1000:.0f} ms/token)")
+        print("=" * 78)
+
+        # One event loop for everything: the shared AsyncOpenAI client pools connections on it
+        async def run_all():
+            for label, message in SCENARIOS.items():
+                blocking = await app.chat_with_agent_async(message, [])
+                results = [await stream_once(app, message) for _ in range(args.runs)]
+                ttft = [r[0] for r in results]
+                total = [r[1] for r in results]
+                assert all(r[2] == blocking for r in results), f"{label}: streamed reply differs"
+
+                print(f"{label:<18} TTFT p50 {statistics.median(ttft) * 1000:7.0f} ms   "
+                      f"full reply p50 {statistics.median(total) * 1000:7.0f} ms   (replies match)")
+
+        asyncio.run(run_all())
+
+        ttft_metric = app.METRICS.summary("chat.ttft_seconds")
+        print(f"\nMETRICS chat.ttft_seconds: count={ttft_metric['count']} "
+              f"p50={ttft_metric['p50'] * 1000:.0f} ms p95={ttft_metric['p95'] * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Streaming ReAct parser benchmark
+
+Runs each TEST_SCENARIOS message (the unknown question needs record_feedback,
+plus a message that needs two tool calls) through the LangGraph agent in
+blocking "react" mode and in "react_stream" mode against the fake OpenAI server
+with ramble=True: like a real model without a stop sequence, every Action is
+followed by a made-up Observation and Answer, and every Answer by a follow-up
+paragraph. Reports per scenario the turns, tools actually run, output tokens
+read after the turn was decided (react.wasted_output_tokens) and latency.
+
+Usage:
+    python benchmarks/bench_streaming_react.py [--latency 0.1] [--token-latency 0.01] [--repeats 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from openai import OpenAI
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from react_agent.agent import create_langgraph_agent
+from react_agent.agent.metrics import METRICS
+from react_agent.run_detailed_experiments import (
+    LLM_FACTORIES, TEST_SCENARIOS, load_business_context,
+)
+
+MODES = ["react", "react_stream"]
+
+SCENARIOS = dict(TEST_SCENARIOS)
+SCENARIOS["unknown_question"] = f"{TOOL_TRIGGER} {TEST_SCENARIOS['unknown_question']}"
+SCENARIOS["two_feedbacks"] = (f"{TOOL_TRIGGER} The croissants were amazing! "
+                              f"{TOOL_TRIGGER} Please add a gluten-free loaf.")
+
+
+def measure(agent, message: str, business_context: str, repeats: int) -> dict:
+    METRICS.reset()
+    latencies, turns, tools = [], [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = agent.run(message, business_context)
+        latencies.append(time.perf_counter() - start)
+        turns.append(result["metadata"]["turns"])
+        tools.append(len(result["metadata"]["actions_taken"]))
+    wasted = METRICS.summary("react.wasted_output_tokens") or {"count": 0, "mean": 0.0}
+    return {
+        "turns": statistics.mean(turns),
+        "tools": statistics.mean(tools),
+        "wasted": wasted["mean"] * wasted["count"] / repeats,
+        "latency": statistics.median(latencies),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="Fake server latency per completion")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Seconds between streamed words")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--persona", default="friendly_advisor")
+    args = parser.parse_args()
+
+    business_context = load_business_context()
+    os.chdir(tempfile.mkdtemp(prefix="fleur-stream-"))  # tool logs land here
+
+    print("=" * 84)
+    print(f"BLOCKING vs STREAMING REACT ({args.persona}, {args.latency * 1000:.0f} ms + "
+          f"{args.token_latency * 1000:.0f} ms/word, mean of {args.repeats})")
+    print("=" * 84)
+    print(f"{'scenario':<18} {'mode':<13} {'turns':>5} {'tools run':>9} {'wasted tok/msg':>14} {'latency':>9}")
+
+    totals = {}
+    with FakeOpenAIServer(latency=args.latency, token_latency=args.token_latency, ramble=True) as server:
+        client = OpenAI(base_url=server.base_url, api_key="sk-fake", max_retries=0)
+        agents = {
+            mode: create_langgraph_agent(LLM_FACTORIES[mode](temperature=0.2, client=client),
+                                         persona=args.persona, mode=mode)
+            for mode in MODES
+        }
+        for key, message in SCENARIOS.items():
+            for mode, agent in agents.items():
+                row = measure(agent, message, business_context, args.repeats)
+                for name, value in row.items():
+                    totals.setdefault(mode, {}).setdefault(name, 0)
+                    totals[mode][name] += value
+                print(f"{key:<18} {mode:<13} {row['turns']:5.1f} {row['tools']:9.1f} {row['wasted']:14.1f} "
+                      f"{row['latency'] * 1000:7.0f}ms")
+
+    print("-" * 84)
+    for mode, row in totals.items():
+        print(f"{'total':<18} {mode:<13} {row['turns']:5.1f} {row['tools']:9.1f} {row['wasted']:14.1f} "
+              f"{row['latency'] * 1000:7.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
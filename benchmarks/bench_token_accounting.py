@@ -0,0 +1,133 @@
+"""
+Token accounting benchmark: counting cost, budget enforcement and per-call records
+
+Against the fake OpenAI server:
+  - counting: time of tokens.count_messages on app requests with growing
+    history, with the long-string cache cold (cleared every call) and warm, and
+    the local count next to the prompt tokens the server reports
+  - session quota: one Gradio-style session chats until its quota is spent;
+    reports the turn it was stopped at and the lines in logs/llm_calls.jsonl
+  - experiment grid: one persona over TEST_SCENARIOS, with the per-call rows
+    of llm_calls.csv summed against the cells' totals in runs.csv
+
+Usage:
+    python benchmarks/bench_token_accounting.py [--quota 60000] [--repeat 200]
+"""
+
+import sys
+import time
+import argparse
+from types import SimpleNamespace
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+import pandas as pd
+from openai import OpenAI
+
+from fake_openai_server import FakeOpenAIServer
+from load_test_chat import import_app
+from bench_sessions import QUESTIONS
+
+HISTORY_TURNS = (0, 5, 20, 50)
+
+
+def history_of(turns: int) -> list:
+    return [(QUESTIONS[i % len(QUESTIONS)], "We bake fresh batches every 3 hours. " * 6) for i in range(turns)]
+
+
+def time_count(messages: list, tools: list, repeat: int, cold: bool) -> float:
+    from react_agent.agent.tokens import clear_prefix_cache, count_messages
+
+    count_messages(messages, tools)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if cold:
+            clear_prefix_cache()
+        count_messages(messages, tools)
+    return (time.perf_counter() - start) / repeat
+
+
+def counting(app, repeat: int) -> None:
+    from react_agent.agent.tokens import count_messages, prefix_cache_info, tokenizer_name
+
+    print(f"{'history':<10} {'local count':>12} {'server usage':>13} {'cold µs':>9} {'warm µs':>9}")
+    for turns in HISTORY_TURNS:
+        message = f"{QUESTIONS[turns % len(QUESTIONS)]} (turn {turns + 1})"
+        messages = app.build_messages(message, history_of(turns))
+        local = count_messages(messages, app.tools)
+        billed = app.client.chat.completions.create(model=app.MODEL, messages=messages,
+                                                    tools=app.tools).usage.prompt_tokens
+        cold = time_count(messages, app.tools, repeat, cold=True)
+        warm = time_count(messages, app.tools, repeat, cold=False)
+        print(f"{turns:>3} turns  {local:>12} {billed:>13} "
+              f"{cold * 1e6:9.1f} {warm * 1e6:9.1f}")
+    info = prefix_cache_info()
+    print(f"tokenizer: {tokenizer_name()}   long-string cache: {info.hits} hits, {info.misses} misses, "
+          f"{info.currsize} entries")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quota", type=int, default=60000, help="Session token quota")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed repetitions per count")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer() as server:
+        app = import_app(server.base_url)
+        from react_agent.agent.logwriter import flush_all
+        from react_agent.agent.tokens import TokenAccountant
+        from react_agent.agent.metrics import METRICS
+        from react_agent.run_detailed_experiments import (
+            EXPERIMENTS, create_llm_call, load_business_context, run_grid,
+        )
+
+        app.RESPONSE_CACHE.maxsize = 0
+        print("=" * 72)
+        print("TOKEN COUNTING (app requests, static prefix + history + message)")
+        print("=" * 72)
+        counting(app, args.repeat)
+
+        print("\n" + "=" * 72)
+        print(f"SESSION QUOTA ({args.quota} tokens)")
+        print("=" * 72)
+        app.TOKENS = TokenAccountant(session_quota=args.quota, log_path=app.TOKENS.log_path)
+        request = SimpleNamespace(session_hash="quota-session")
+        history, stopped = [], None
+        for turn in range(200):
+            message = f"{QUESTIONS[turn % len(QUESTIONS)]} (turn {turn + 1})"
+            reply = app.chat_with_agent(message, history, request)
+            if reply == app.BUDGET_REPLY:
+                stopped = turn + 1
+                break
+            history.append((message, reply))
+        flush_all()
+        lines = app.TOKENS.log_path.read_text(encoding="utf-8").splitlines()
+        print(f"stopped at turn {stopped} with {app.TOKENS.spent('quota-session')} tokens spent; "
+              f"{len(lines)} calls in {app.TOKENS.log_path}, "
+              f"{METRICS.counter('tokens.rejected_sessions'):.0f} rejected")
+
+        print("\n" + "=" * 72)
+        print("EXPERIMENT GRID (per-call token records)")
+        print("=" * 72)
+        client = OpenAI(base_url=server.base_url, api_key="sk-fake", max_retries=0)
+        workdir = Path("experiments")
+        run_grid(load_business_context(), workdir / "detailed_results.jsonl", workdir / "runs.csv",
+                 experiments=EXPERIMENTS[:1], concurrency=4,
+                 llm_factory=lambda **config: create_llm_call(client=client, **config),
+                 calls_csv=workdir / "llm_calls.csv")
+        runs = pd.read_csv(workdir / "runs.csv")
+        calls = pd.read_csv(workdir / "llm_calls.csv")
+        print(runs[["scenario", "llm_calls", "prompt_tokens", "completion_tokens"]].to_string(index=False))
+        print(f"llm_calls.csv: {len(calls)} rows, {calls['prompt_tokens'].sum()} prompt / "
+              f"{calls['completion_tokens'].sum()} completion tokens "
+              f"(runs.csv: {runs['prompt_tokens'].sum()} / {runs['completion_tokens'].sum()}); "
+              f"local count off by {(calls['prompt_tokens'] - calls['local_prompt_tokens']).abs().mean():.1f} "
+              f"tokens per call on average")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
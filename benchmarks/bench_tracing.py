@@ -0,0 +1,138 @@
+"""
+Tracing benchmark: span overhead and a per-stage breakdown of chat turns
+
+  1. Cost of one instrumented stage (`with TRACER.span(...)`) with tracing off
+     (the shared no-op) and on (timed, observed in METRICS, kept in the trace).
+  2. Tool turns through app.chat_with_agent against the fake OpenAI server with
+     tracing off and on: p50 turn latency, then where the time went per stage
+     (from the span.<stage>.seconds observations) and one trace as logged.
+  3. The Prometheus text served by serve_metrics (first lines).
+
+Usage:
+    python benchmarks/bench_tracing.py [--spans 200000] [--turns 30] [--latency 0.05]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import urllib.request
+from contextlib import nullcontext
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+from load_test_chat import import_app
+from react_agent.agent.logwriter import flush_all
+from react_agent.agent.metrics import METRICS
+from react_agent.agent.tracing import TRACER, serve_metrics
+
+STAGES = ("history", "first_completion", "tool", "second_completion", "feedback_fallback")
+
+
+def span_cost(n: int) -> float:
+    """Seconds per (root + one nested) span pair."""
+    start = time.perf_counter()
+    for _ in range(n):
+        with TRACER.span("bench.root"):
+            with TRACER.span("stage"):
+                pass
+    return (time.perf_counter() - start) / n
+
+
+def nullcontext_cost(n: int) -> float:
+    """The same two nested with-blocks around contextlib.nullcontext (the floor)."""
+    null = nullcontext()
+    start = time.perf_counter()
+    for _ in range(n):
+        with null:
+            with null:
+                pass
+    return (time.perf_counter() - start) / n
+
+
+def turns(app, n: int, label: str) -> list:
+    latencies = []
+    for i in range(n):
+        message = f"{TOOL_TRIGGER} The rye was great, do you bake it on Sundays? (customer {label}-{i})"
+        started = time.perf_counter()
+        app.chat_with_agent(message, [])
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server latency per completion")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="fleur-trace-"))  # tool logs and traces land here
+    TRACER.configure(log_path=Path("traces.jsonl"))
+
+    print("=" * 80)
+    print(f"SPAN OVERHEAD ({args.spans} root + nested span pairs)")
+    print("=" * 80)
+    TRACER.configure(enabled=False)
+    off = span_cost(args.spans)
+    TRACER.configure(enabled=True, log_path=Path("bench_spans.jsonl"))
+    on = span_cost(args.spans // 10)
+    flush_all()
+    print(f"nullcontext  {nullcontext_cost(args.spans) * 1e9:8.0f} ns per pair")
+    print(f"tracing off  {off * 1e9:8.0f} ns per pair")
+    print(f"tracing on   {on * 1e9:8.0f} ns per pair (includes the JSONL line per trace)")
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        app = import_app(server.base_url)
+        app.RESPONSE_CACHE.maxsize = 0
+        app.LOCAL_CONFIRMATIONS = False
+        TRACER.configure(log_path=Path("traces.jsonl"))
+
+        print("\n" + "=" * 80)
+        print(f"TOOL TURNS ({args.turns} per run, {args.latency * 1000:.0f} ms per completion)")
+        print("=" * 80)
+        for enabled in (False, True):
+            TRACER.configure(enabled=enabled)
+            METRICS.reset()
+            latencies = turns(app, args.turns, "on" if enabled else "off")
+            print(f"tracing {'on ' if enabled else 'off'}   p50 {statistics.median(latencies) * 1000:7.1f} ms")
+
+        print(f"\n{'stage':<20} {'mean ms':>9} {'p95 ms':>9} {'count':>6}")
+        for stage in ("chat.turn",) + STAGES:
+            summary = METRICS.summary(f"span.{stage}.seconds")
+            if summary:
+                print(f"{stage:<20} {summary['mean'] * 1000:9.2f} {summary['p95'] * 1000:9.2f} "
+                      f"{summary['count']:6d}")
+
+        flush_all()
+        with open("traces.jsonl", encoding="utf-8") as f:
+            trace = json.loads(f.readlines()[-1])
+        print("\nLast trace (logs/traces.jsonl line):")
+        for span in trace["spans"]:
+            attrs = ", ".join(f"{k}={v}" for k, v in span["attrs"].items())
+            print(f"  +{span['start_ms']:7.1f} ms {span['name']:<18} {span['ms']:7.2f} ms  {attrs}")
+        print(f"  total {trace['ms']:.1f} ms")
+
+    server = serve_metrics(0)
+    port = server.server_address[1]
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        body = response.read().decode("utf-8")
+    server.shutdown()
+    print("\n" + "=" * 80)
+    print(f"PROMETHEUS /metrics ({len(body.splitlines())} lines, first turn-latency summary)")
+    print("=" * 80)
+    lines = body.splitlines()
+    first = next(i for i, line in enumerate(lines) if "span_chat_turn_seconds" in line)
+    print("\n".join(lines[first:first + 5]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""
+Fake OpenAI-compatible server for offline load tests
+
+Serves POST /v1/chat/completions from a thread-per-request HTTP server with a
+configurable artificial latency, so the app's own overhead and concurrency can
+be measured without a real API key. Requests with "stream": true get
+server-sent-event chunks: the first after `latency`, then one word every
+`token_latency` seconds; tool calls are streamed as id/name and argument fragments.
+Blocking replies wait for the same per-word generation time before they are sent.
+
+Scripted behaviour:
+  - if the request offers tools and the last user message contains "[tool]",
+    the reply is a record_feedback tool call for that message (one call per
+    "[tool]" when there are several, all in the same turn)
+  - a request whose last message is a tool result gets a short confirmation
+  - anything else gets a canned bakery answer
+  - requests from the ReAct agent (persona prompt with "ReAct Format", no tools)
+    get the same behaviour in text form: one "Thought: ...\nAction: record_feedback(...)"
+    turn per trigger, then "Answer: ..." (or straight away without a trigger)
+  - with ramble=True, ReAct replies keep going the way models do without a stop
+    sequence: a made-up Observation and Answer after the Action, and a follow-up
+    paragraph after the Answer. A request's "stop" sequences cut the reply as the
+    real API does
+  - with rate_limit_every=N, every Nth request is rejected with HTTP 429 and a
+    Retry-After header
+  - with replay=ReplayLLM(...) (benchmarks/replay_llm.py), replies are the
+    recorded experiment responses instead: the recorded tool calls (as tool
+    calls, or ReAct Actions), then the recorded final answer
+  - with latency_model=LatencyModel(...), each reply waits a sample of that
+    distribution instead of the fixed latency
+
+Usage reports ~4 characters per token. Like the real API's automatic prompt
+caching, prompts of 1024+ tokens are cached in 128-token blocks and a request
+that repeats a previously seen prefix reports those tokens in
+usage.prompt_tokens_details.cached_tokens. Streaming requests with
+stream_options.include_usage get a final usage chunk.
+
+Usage (standalone):
+    python benchmarks/fake_openai_server.py --port 8808 --latency 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8808/v1 OPENAI_API_KEY=sk-fake python app.py
+
+    # Recorded answers from experiments/detailed_results.jsonl, lognormal latency
+    python benchmarks/fake_openai_server.py --replay --latency-model lognormal:0.8,0.4
+"""
+
+import sys
+import json
+import time
+import hashlib
+import uuid
+import argparse
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOOL_TRIGGER = "[tool]"
+CANNED_ANSWER = ("Our breads come out in fresh batches every 3 hours - check the Bake Times "
+                 "board in store or message us on WhatsApp to pre-order.")
+TOOL_CONFIRMATION = "Thank you! I've passed that along to our team."
+REACT_MARKER = "ReAct Format"
+RAMBLE_AFTER_ACTION = ('\nObservation: {"status": "success", "message": "Feedback recorded"}\n'
+                       f"Thought: The feedback is logged.\nAnswer: {TOOL_CONFIRMATION}")
+RAMBLE_AFTER_ANSWER = ("\n\nIs there anything else I can help you with today? If you would like "
+                       "to pre-order for the weekend, just send us a message on WhatsApp and "
+                       "we will set your loaves aside.")
+
+CHARS_PER_TOKEN = 4
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+
+
+class PrefixCache:
+    """Simulated provider prefix cache: remembers hashes of every prompt prefix block."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = set()
+
+    @staticmethod
+    def serialize(request: dict) -> str:
+        """The prompt as the provider sees it: tools first, then the messages in order."""
+        parts = [json.dumps(request.get("tools") or [], sort_keys=True)]
+        parts.extend(json.dumps(m, sort_keys=True) for m in request.get("messages", []))
+        return "".join(parts)
+
+    def lookup_and_store(self, request: dict) -> int:
+        """Cached prompt tokens for `request`; caches its own prefix blocks."""
+        prompt = self.serialize(request)
+        block = CACHE_BLOCK_TOKENS * CHARS_PER_TOKEN
+        if len(prompt) < CACHE_MIN_TOKENS * CHARS_PER_TOKEN:
+            return 0
+
+        digest = hashlib.sha256()
+        cached, hit = 0, True
+        with self._lock:
+            for end in range(block, len(prompt) + 1, block):
+                digest.update(prompt[end - block:end].encode("utf-8"))
+                key = digest.hexdigest()
+                if hit and key in self._blocks:
+                    cached = end
+                else:
+                    hit = False
+                    self._blocks.add(key)
+
+        cached_tokens = cached // CHARS_PER_TOKEN
+        return cached_tokens if cached_tokens >= CACHE_MIN_TOKENS else 0
+
+
+def _last_message(messages: list, role: str = None) -> dict:
+    for message in reversed(messages):
+        if role is None or message.get("role") == role:
+            return message
+    return {}
+
+
+def _feedback_items(user_text: str) -> list:
+    """One item per tool trigger: the whole message for one trigger, else the text after each."""
+    count = user_text.count(TOOL_TRIGGER)
+    if count <= 1:
+        return [user_text] if count else []
+    return [part.strip() for part in user_text.split(TOOL_TRIGGER)[1:]]
+
+
+def _apply_stop(content: str, stop) -> str:
+    if isinstance(stop, str):
+        stop = [stop]
+    cut = min((i for i in (content.find(s) for s in stop or []) if i >= 0), default=-1)
+    return content if cut < 0 else content[:cut]
+
+
+def _replay_message(request: dict, replay) -> tuple:
+    """(message, finish_reason) replayed from recorded responses."""
+    messages = request.get("messages", [])
+    config = {"model": request.get("model"), "temperature": request.get("temperature"),
+              "top_p": request.get("top_p")}
+    if request.get("tools") or _last_message(messages).get("role") == "tool":
+        message = replay.tool_reply(messages, config)
+    else:
+        content = _apply_stop(replay.react_reply(messages, config), request.get("stop"))
+        message = {"role": "assistant", "content": content}
+    return message, "tool_calls" if message.get("tool_calls") else "stop"
+
+
+def fake_completion(request: dict, cache: PrefixCache = None, ramble: bool = False, replay=None) -> dict:
+    """Build the (non-streaming) chat completion for a request body."""
+    messages = request.get("messages", [])
+    last = _last_message(messages)
+
+    # The customer's message (ReAct observations are sent back as user messages too)
+    customer_index = max((i for i, m in enumerate(messages) if m.get("role") == "user"
+                          and not (m.get("content") or "").startswith("Observation:")), default=-1)
+    user_text = messages[customer_index].get("content") or "" if customer_index >= 0 else ""
+    feedback_items = _feedback_items(user_text)
+
+    message = {"role": "assistant", "content": None}
+    finish_reason = "stop"
+    react = not request.get("tools") and REACT_MARKER in (messages[0].get("content") or "" if messages else "")
+
+    if replay is not None:
+        message, finish_reason = _replay_message(request, replay)
+    elif react:
+        # One Action per turn until every feedback item has been observed
+        observed = sum(1 for m in messages[customer_index + 1:]
+                       if (m.get("content") or "").startswith("Observation:"))
+        if observed < len(feedback_items):
+            message["content"] = ("Thought: The customer shared feedback, I should log it.\n"
+                                  f"Action: record_feedback({json.dumps({'question': feedback_items[observed]})})"
+                                  + (RAMBLE_AFTER_ACTION if ramble else ""))
+        elif observed:
+            message["content"] = f"Answer: {TOOL_CONFIRMATION}" + (RAMBLE_AFTER_ANSWER if ramble else "")
+        else:
+            message["content"] = (f"Thought: I can answer from the business documents.\nAnswer: {CANNED_ANSWER}"
+                                  + (RAMBLE_AFTER_ANSWER if ramble else ""))
+        message["content"] = _apply_stop(message["content"], request.get("stop"))
+    elif last.get("role") == "tool":
+        message["content"] = TOOL_CONFIRMATION
+    elif request.get("tools") and feedback_items:
+        # Every feedback item in one turn (parallel tool calls)
+        message["tool_calls"] = [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {
+                "name": "record_feedback",
+                "arguments": json.dumps({"feedback": item}),
+            },
+        } for item in feedback_items]
+        finish_reason = "tool_calls"
+    else:
+        message["content"] = CANNED_ANSWER
+
+    prompt_tokens = len(PrefixCache.serialize(request)) // CHARS_PER_TOKEN
+    completion_tokens = len(message["content"] or "") // CHARS_PER_TOKEN
+    cached_tokens = cache.lookup_and_store(request) if cache is not None else 0
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        },
+    }
+
+
+def _chunk(completion: dict, delta: dict, finish_reason=None) -> dict:
+    return {
+        "id": completion["id"],
+        "object": "chat.completion.chunk",
+        "created": completion["created"],
+        "model": completion["model"],
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def fake_stream_chunks(request: dict, cache: PrefixCache = None, ramble: bool = False, replay=None) -> list:
+    """Split the completion for `request` into streaming chunk payloads."""
+    completion = fake_completion(request, cache, ramble, replay)
+    choice = completion["choices"][0]
+    message = choice["message"]
+
+    chunks = [_chunk(completion, {"role": "assistant", "content": ""})]
+    if message["content"]:
+        words = message["content"].split(" ")
+        for i, word in enumerate(words):
+            chunks.append(_chunk(completion, {"content": word if i == 0 else " " + word}))
+
+    for index, call in enumerate(message.get("tool_calls") or []):
+        chunks.append(_chunk(completion, {"tool_calls": [{
+            "index": index, "id": call["id"], "type": "function",
+            "function": {"name": call["function"]["name"], "arguments": ""},
+        }]}))
+        arguments = call["function"]["arguments"]
+        middle = len(arguments) // 2
+        for piece in (arguments[:middle], arguments[middle:]):
+            chunks.append(_chunk(completion, {"tool_calls": [{"index": index, "function": {"arguments": piece}}]}))
+
+    chunks.append(_chunk(completion, {}, choice["finish_reason"]))
+    if (request.get("stream_options") or {}).get("include_usage"):
+        usage_chunk = _chunk(completion, {})
+        usage_chunk["choices"] = []
+        usage_chunk["usage"] = completion["usage"]
+        chunks.append(usage_chunk)
+    return chunks
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, the body waits
+    # for the client's delayed ACK (~40 ms) on every keep-alive reply
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        with self.server.stats_lock:
+            self.server.requests_received += 1
+            limited = (self.server.rate_limit_every
+                       and self.server.requests_received % self.server.rate_limit_every == 0)
+            if not limited:
+                self.server.requests_served += 1
+
+        if limited:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests",
+                                            "code": "rate_limit_exceeded"}},
+                            {"Retry-After": str(self.server.retry_after)})
+            return
+
+        latency = self.server.latency_model.sample() if self.server.latency_model else self.server.latency
+        with self.server.stats_lock:
+            self.server.waited += latency
+        time.sleep(latency)
+        if request.get("stream"):
+            self._send_stream(fake_stream_chunks(request, self.server.prefix_cache, self.server.ramble,
+                                                 self.server.replay))
+        else:
+            completion = fake_completion(request, self.server.prefix_cache, self.server.ramble, self.server.replay)
+            # A blocking reply takes as long to generate as the streamed one
+            content = completion["choices"][0]["message"]["content"] or ""
+            time.sleep(self.server.token_latency * max(0, len(content.split(" ")) - 1))
+            self._send_json(200, completion)
+
+    def _send_stream(self, chunks: list) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for i, chunk in enumerate(chunks):
+                if i > 1 and self.server.token_latency:
+                    time.sleep(self.server.token_latency)
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client closed the stream (cancelled generation)
+
+    def _send_json(self, status: int, body: dict, headers: dict = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    # socketserver listens with a backlog of 5: a burst of concurrent connects
+    # overflows it and the dropped SYNs are retried after a second
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FakeOpenAIServer:
+    """
+    Background fake OpenAI server.
+
+    Usage:
+        with FakeOpenAIServer(latency=0.2) as server:
+            client = OpenAI(base_url=server.base_url, api_key="sk-fake")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 token_latency: float = 0.0, rate_limit_every: int = 0, retry_after: float = 0.05,
+                 ramble: bool = False, replay=None, latency_model=None):
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.latency = latency
+        self.httpd.token_latency = token_latency
+        self.httpd.rate_limit_every = rate_limit_every
+        self.httpd.retry_after = retry_after
+        self.httpd.ramble = ramble
+        self.httpd.replay = replay
+        self.httpd.latency_model = latency_model
+        self.httpd.waited = 0.0
+        self.httpd.requests_received = 0
+        self.httpd.requests_served = 0
+        self.httpd.stats_lock = threading.Lock()
+        self.httpd.prefix_cache = PrefixCache()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests_served(self) -> int:
+        return self.httpd.requests_served
+
+    @property
+    def waited(self) -> float:
+        """Total seconds of simulated latency across the requests served."""
+        return self.httpd.waited
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds to wait before each reply")
+    parser.add_argument("--token-latency", type=float, default=0.02,
+                        help="Seconds between streamed tokens")
+    parser.add_argument("--replay", nargs="?", const="", default=None, metavar="JSONL",
+                        help="Replay recorded responses (default file: experiments/detailed_results.jsonl)")
+    parser.add_argument("--latency-model", default=None, metavar="SPEC",
+                        help="Latency distribution instead of --latency, e.g. lognormal:0.8,0.4 or recorded")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency distribution")
+    args = parser.parse_args()
+
+    replay = latency_model = None
+    if args.replay is not None or args.latency_model:
+        from replay_llm import DEFAULT_RECORDINGS, LatencyModel, ReplayLLM, load_records
+        records = load_records(Path(args.replay) if args.replay else DEFAULT_RECORDINGS)
+        replay = ReplayLLM(records) if args.replay is not None else None
+        if args.latency_model:
+            latency_model = LatencyModel.parse(args.latency_model, args.seed, records)
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency, args.token_latency,
+                              replay=replay, latency_model=latency_model)
+    latency = latency_model.describe() if latency_model else f"{args.latency}s"
+    print(f"Fake OpenAI server on {server.base_url} (latency {latency}{', replaying' if replay else ''})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Concurrent-session load test for app.py against the fake OpenAI server
+
+Runs the same batch of chat sessions through:
+  - before: the synchronous chat_with_agent on a fixed pool of worker threads
+    (how a thread-per-request Gradio handler behaves)
+  - after: chat_with_agent_async on one event loop with the shared AsyncOpenAI client
+
+Half of the messages trigger a tool call, so each of those sessions makes two
+completions plus the tool execution.
+
+Usage:
+    python benchmarks/load_test_chat.py [--sessions 64] [--threads 8] [--latency 0.2]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer, TOOL_TRIGGER
+
+
+def import_app(base_url: str):
+    """Import app.py against the fake server, logging into a scratch directory."""
+    os.environ["OPENAI_API_KEY"] = "sk-fake"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.chdir(tempfile.mkdtemp(prefix="fleur-load-"))
+    import app
+    return app
+
+
+def session_messages(n: int) -> list:
+    return [
+        f"{TOOL_TRIGGER} The croissants were great today (session {i})" if i % 2
+        else f"What breads are fresh now? (session {i})"
+        for i in range(n)
+    ]
+
+
+def summarize(label: str, wall: float, latencies: list) -> dict:
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<26} {len(latencies) / wall:>9.1f} sess/s   wall {wall:6.2f}s   "
+          f"p50 {statistics.median(latencies) * 1000:7.0f} ms   p95 {p95 * 1000:7.0f} ms")
+    return {"throughput": len(latencies) / wall, "wall": wall}
+
+
+def run_sync(app, messages: list, threads: int) -> dict:
+    def one(message):
+        start = time.perf_counter()
+        app.chat_with_agent(message, [])
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(one, messages))
+    return summarize(f"sync ({threads} threads)", time.perf_counter() - start, latencies)
+
+
+def run_async(app, messages: list, concurrency: int) -> dict:
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(message):
+            async with semaphore:
+                start = time.perf_counter()
+                await app.chat_with_agent_async(message, [])
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(m) for m in messages))
+        return time.perf_counter() - start, latencies
+
+    wall, latencies = asyncio.run(main())
+    return summarize(f"async ({concurrency} in flight)", wall, latencies)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=64, help="Chat sessions to run")
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads for the sync handler")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Max in-flight sessions for the async handler (default: all)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake API latency per completion (s)")
+    args = parser.parse_args()
+
+    with FakeOpenAIServer(latency=args.latency) as server:
+        app = import_app(server.base_url)
+        app.RESPONSE_CACHE.maxsize = 0
+        messages = session_messages(args.sessions)
+
+        print("=" * 78)
+        print(f"CHAT LOAD TEST ({args.sessions} sessions, {args.latency * 1000:.0f} ms per completion)")
+        print("=" * 78)
+        before = run_sync(app, messages, args.threads)
+        after = run_async(app, messages, args.concurrency or args.sessions)
+        print(f"\nThroughput gain: {after['throughput'] / before['throughput']:.1f}x "
+              f"({server.requests_served} fake completions served)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Replay LLM: recorded agent answers with simulated latency, no API key
+
+Replays the responses recorded in experiments/detailed_results.jsonl (one
+record per experiment cell: the final answer and the tool calls the model made)
+as a deterministic fake model. For a customer message that was recorded it
+plays the same steps back:
+  - as a text llm_call (ReAct): one "Thought/Action: tool({...})" reply per
+    recorded action, then "Answer: <final answer>"
+  - as a function-calling llm_call: every recorded action as tool calls, then
+    the final answer once the tool results are in
+  - as chat completion bodies for FakeOpenAIServer(replay=...), so app.py is
+    replayed over HTTP the same way
+
+When several cells recorded the same message, the one with the requested
+model/temperature/top_p is used, and among those a stable hash of the system
+prompt picks one, so a run always gets the same answers. Unrecorded messages get
+a recorded answer picked by the same hash.
+
+Each call waits a LatencyModel sample first:
+    fixed:0.2              always 200 ms
+    uniform:0.1,0.5        uniform between 100 and 500 ms
+    lognormal:0.8,0.4      median 800 ms, sigma 0.4 (long right tail)
+    recorded[:0.05]        the per-call latencies of the recorded run, estimated
+                           from the gaps between its records (optionally scaled)
+Samples come from a seeded generator, so a run's latencies are reproducible.
+
+Usage:
+    replay = ReplayLLM.from_file(latency="lognormal:0.05,0.5", seed=7)
+    agent.run(message, context, persona="friendly_advisor", llm_call=replay.factory(model="gpt-4o"))
+"""
+
+import json
+import math
+import time
+import uuid
+import random
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_RECORDINGS = REPO_ROOT / "react_agent" / "experiments" / "detailed_results.jsonl"
+LATENCY_KINDS = ("fixed", "uniform", "lognormal", "recorded")
+
+# Recorded gaps longer than this are pauses between runs, not model calls
+MAX_RECORDED_GAP = 60.0
+
+
+def load_records(path: Path = DEFAULT_RECORDINGS) -> List[Dict]:
+    """The records of a detailed_results.jsonl file, in file order."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def recorded_latencies(records: List[Dict]) -> List[float]:
+    """
+    Per-call latencies of a sequential recorded run: the gap between a record
+    and the previous one, divided by the number of model calls (turns) it took.
+    """
+    latencies = []
+    previous = None
+    for record in records:
+        finished = datetime.fromisoformat(record["timestamp"])
+        if previous is not None:
+            gap = (finished - previous).total_seconds()
+            if 0 < gap <= MAX_RECORDED_GAP:
+                latencies.append(gap / max(1, record["response"].get("turns", 1)))
+        previous = finished
+    return latencies
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution for simulated model calls.
+
+    Args:
+        kind: One of LATENCY_KINDS
+        params: fixed (seconds), uniform (low, high), lognormal (median, sigma),
+            recorded (scale)
+        seed: Seed of the generator
+        recorded: Latencies the "recorded" kind samples from
+    """
+
+    def __init__(self, kind: str = "fixed", params=(0.0,), seed: int = 0, recorded: Optional[List[float]] = None):
+        if kind not in LATENCY_KINDS:
+            raise ValueError(f"Unknown latency kind {kind!r} (expected one of {', '.join(LATENCY_KINDS)})")
+        if kind == "recorded" and not recorded:
+            raise ValueError("The recorded latency kind needs recorded latencies")
+        self.kind = kind
+        self.params = tuple(float(p) for p in params)
+        self.recorded = recorded or []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 0, records: Optional[List[Dict]] = None) -> "LatencyModel":
+        """A model from a "kind:param,param" spec (see the module docstring)."""
+        kind, _, params = spec.partition(":")
+        values = [float(p) for p in params.split(",") if p.strip()]
+        defaults = {"fixed": [0.0], "uniform": [0.0, 0.0], "lognormal": [0.0, 0.0], "recorded": [1.0]}
+        if kind not in defaults:
+            raise ValueError(f"Unknown latency kind {kind!r} (expected one of {', '.join(LATENCY_KINDS)})")
+        values = values or defaults[kind]
+        if len(values) != len(defaults[kind]):
+            raise ValueError(f"{kind} latency takes {len(defaults[kind])} parameter(s), got {spec!r}")
+        recorded = recorded_latencies(records if records is not None else load_records()) if kind == "recorded" else None
+        return cls(kind, values, seed, recorded)
+
+    def sample(self) -> float:
+        """Seconds the next call waits."""
+        with self._lock:
+            if self.kind == "fixed":
+                return self.params[0]
+            if self.kind == "uniform":
+                return self._random.uniform(*self.params)
+            if self.kind == "lognormal":
+                median, sigma = self.params
+                return self._random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+            return self._random.choice(self.recorded) * self.params[0]
+
+    def describe(self) -> str:
+        return f"{self.kind}:{','.join(f'{p:g}' for p in self.params)}"
+
+
+def _stable_index(text: str, n: int) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) % n
+
+
+class ReplayLLM:
+    """
+    Deterministic fake model replaying recorded experiment responses.
+
+    Args:
+        records: Records as in detailed_results.jsonl
+        latency: LatencyModel (or spec string) sampled before every reply
+        seed: Seed for a latency given as a spec string
+    """
+
+    def __init__(self, records: List[Dict], latency="fixed:0", seed: int = 0):
+        if not records:
+            raise ValueError("ReplayLLM needs at least one recorded response")
+        self.records = records
+        self.latency = latency if isinstance(latency, LatencyModel) else LatencyModel.parse(latency, seed, records)
+        self._by_message: Dict[str, List[Dict]] = {}
+        for record in records:
+            self._by_message.setdefault(record["scenario"]["user_message"].strip(), []).append(record)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.waited = 0.0
+
+    @classmethod
+    def from_file(cls, path: Path = DEFAULT_RECORDINGS, latency="fixed:0", seed: int = 0) -> "ReplayLLM":
+        return cls(load_records(path), latency, seed)
+
+    @property
+    def messages(self) -> List[str]:
+        """The recorded customer messages, in file order."""
+        return list(self._by_message)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.waited = 0.0
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def lookup(self, messages: List[Dict], config: Optional[Dict] = None) -> Dict:
+        """The recorded response for a conversation's customer message."""
+        message = _customer_message(messages)[1].strip()
+        system = messages[0].get("content") or "" if messages and messages[0].get("role") == "system" else ""
+        candidates = self._by_message.get(message)
+        if not candidates:
+            return self.records[_stable_index(system + message, len(self.records))]["response"]
+        if config:
+            matching = [r for r in candidates
+                        if all(r["experiment"].get(key) == value for key, value in config.items() if value is not None)]
+            candidates = matching or candidates
+        return candidates[_stable_index(system, len(candidates))]["response"]
+
+    def _wait(self) -> None:
+        seconds = self.latency.sample()
+        with self._lock:
+            self.calls += 1
+            self.waited += seconds
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # ------------------------------------------------------------------
+    # Replies
+    # ------------------------------------------------------------------
+
+    def react_reply(self, messages: List[Dict], config: Optional[Dict] = None) -> str:
+        """The next ReAct turn: the next recorded Action, or the Answer."""
+        response = self.lookup(messages, config)
+        index = _customer_message(messages)[0]
+        observed = sum(1 for m in messages[index + 1:] if (m.get("content") or "").startswith("Observation:"))
+        actions = response.get("actions_taken", [])
+        if observed < len(actions):
+            action = actions[observed]
+            return (f"Thought: I should use {action['tool']} for this.\n"
+                    f"Action: {action['tool']}({json.dumps(action['args'])})")
+        return f"Thought: I can answer the customer now.\nAnswer: {response['final_answer']}"
+
+    def tool_reply(self, messages: List[Dict], config: Optional[Dict] = None) -> Dict:
+        """The next function-calling turn: every recorded tool call, then the answer."""
+        response = self.lookup(messages, config)
+        index = _customer_message(messages)[0]
+        called = any(m.get("role") == "tool" for m in messages[index + 1:])
+        actions = response.get("actions_taken", [])
+        if actions and not called:
+            return {"role": "assistant", "content": None, "tool_calls": [
+                {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                 "function": {"name": action["tool"], "arguments": json.dumps(action["args"])}}
+                for action in actions
+            ]}
+        return {"role": "assistant", "content": response["final_answer"]}
+
+    def factory(self, model: str = None, temperature: float = None, top_p: float = None, tools: bool = False) -> Callable:
+        """
+        An llm_call with the signature of run_detailed_experiments' factories:
+        messages -> text (ReAct), or (messages, tools) -> assistant message dict
+        with tools=True. Replies prefer the cells recorded with this model,
+        temperature and top_p.
+        """
+        config = {"model": model, "temperature": temperature, "top_p": top_p}
+
+        if tools:
+            def llm_call(messages, tools=None):
+                self._wait()
+                return self.tool_reply(messages, config)
+        else:
+            def llm_call(messages):
+                self._wait()
+                return self.react_reply(messages, config)
+
+        return llm_call
+
+    def __call__(self, messages: List[Dict]) -> str:
+        self._wait()
+        return self.react_reply(messages)
+
+
+def _customer_message(messages: List[Dict]):
+    """(index, text) of the last user message that is not a ReAct Observation."""
+    for i in range(len(messages) - 1, -1, -1):
+        message = messages[i]
+        content = message.get("content") or ""
+        if message.get("role") == "user" and not content.startswith("Observation:"):
+            return i, content if isinstance(content, str) else json.dumps(content)
+    return -1, ""
@@ -0,0 +1,300 @@
+"""
+Offline benchmark suite: app.py and the ReAct agent against a replayed model
+
+Runs without an API key. The model is replay_llm.ReplayLLM, replaying
+experiments/detailed_results.jsonl: app.py reaches it through the fake
+OpenAI server (replay mode), the agent gets it as its llm_call. Every call waits
+a sample of --latency (a seeded distribution), so runs are reproducible.
+
+Scenarios (all customer messages are the recorded ones, histories start empty):
+  app.turn           sequential chat_with_agent turns: latency percentiles and
+                     overhead (turn time minus the simulated model wait)
+  app.concurrent     chat_with_agent_async, --concurrency turns in flight: throughput
+  agent.turn         sequential ReAct agent runs, one per recorded cell
+  agent.concurrent   agent runs on --concurrency threads: throughput
+  app.memory         tracemalloc peak / retained over turns with zero latency
+  agent.memory       the same for agent runs
+
+Results are written as JSON (--output) and compared against the stored
+baseline (benchmarks/baseline.json): a metric is a regression when it is worse
+than the baseline by more than --tolerance and by more than its noise floor.
+The exit status is 1 when anything regressed, so the suite can gate CI.
+--save-baseline replaces the baseline with this run.
+
+The response cache is off for the app: the recorded messages repeat, and every
+turn should reach the model.
+
+Usage:
+    python benchmarks/suite.py [--latency lognormal:0.05,0.5] [--rounds 6] [--concurrency 16]
+    python benchmarks/suite.py --quick --save-baseline
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tracemalloc
+import statistics
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fake_openai_server import FakeOpenAIServer
+from load_test_chat import import_app
+from replay_llm import DEFAULT_RECORDINGS, LatencyModel, ReplayLLM, load_records
+
+DEFAULT_BASELINE = REPO_ROOT / "benchmarks" / "baseline.json"
+DEFAULT_OUTPUT = REPO_ROOT / "benchmarks" / "results" / "latest.json"
+
+# Differences below these are noise whatever the relative change
+NOISE_FLOOR = {"ms": 1.0, "kib": 256.0, "per_s": 0.0}
+
+
+def percentiles(latencies: list) -> dict:
+    ordered = sorted(latencies)
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+
+    return {"p50_ms": statistics.median(ordered) * 1000, "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+
+def app_turn(app, server, messages: list) -> dict:
+    waited = server.waited
+    latencies = [timed(app.chat_with_agent, message, []) for message in messages]
+    overhead = (sum(latencies) - (server.waited - waited)) / len(latencies)
+    return dict(percentiles(latencies), overhead_ms=overhead * 1000, turns=len(latencies))
+
+
+def app_concurrent(app, messages: list, concurrency: int) -> dict:
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(message):
+            async with semaphore:
+                started = time.perf_counter()
+                await app.chat_with_agent_async(message, [])
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(one(m) for m in messages))
+        return time.perf_counter() - started, latencies
+
+    wall, latencies = asyncio.run(run())
+    return dict(percentiles(latencies), turns_per_s=len(latencies) / wall, turns=len(latencies))
+
+
+def agent_runner(agent, context: str, replay: ReplayLLM):
+    """run(record): one agent run of a recorded cell, with that cell's config."""
+    calls = {}
+
+    def run(record):
+        experiment = record["experiment"]
+        config = (experiment["model"], experiment["temperature"], experiment["top_p"])
+        if config not in calls:
+            calls[config] = replay.factory(*config)
+        agent.run(record["scenario"]["user_message"], context, persona=experiment["persona"],
+                  llm_call=calls[config])
+
+    return run
+
+
+def agent_turn(run, replay: ReplayLLM, records: list) -> dict:
+    waited = replay.waited
+    latencies = [timed(run, record) for record in records]
+    overhead = (sum(latencies) - (replay.waited - waited)) / len(latencies)
+    return dict(percentiles(latencies), overhead_ms=overhead * 1000, turns=len(latencies))
+
+
+def agent_concurrent(run, records: list, concurrency: int) -> dict:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda record: timed(run, record), records))
+    wall = time.perf_counter() - started
+    return dict(percentiles(latencies), turns_per_s=len(latencies) / wall, turns=len(latencies))
+
+
+def memory(fn, items: list) -> dict:
+    """tracemalloc peak over running fn on every item, and what is still held after."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for item in items:
+        fn(item)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_kib": (peak - before) / 1024, "retained_kib": (current - before) / 1024, "turns": len(items)}
+
+
+# ----------------------------------------------------------------------
+# Baseline comparison
+# ----------------------------------------------------------------------
+
+def _unit(metric: str) -> str:
+    return "per_s" if metric.endswith("_per_s") else metric.rsplit("_", 1)[-1]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    (scenario, metric, baseline, current, change, status) for every metric both
+    runs have; status is "ok", "better" or "REGRESSION".
+    """
+    rows = []
+    for scenario, metrics in results.items():
+        for metric, current in metrics.items():
+            unit = _unit(metric)
+            previous = baseline.get(scenario, {}).get(metric)
+            if unit not in NOISE_FLOOR or previous is None:
+                continue
+            change = (current - previous) / previous if previous else 0.0
+            worse = -change if unit == "per_s" else change
+            if worse > tolerance and abs(current - previous) > NOISE_FLOOR[unit]:
+                status = "REGRESSION"
+            elif -worse > tolerance and abs(current - previous) > NOISE_FLOOR[unit]:
+                status = "better"
+            else:
+                status = "ok"
+            rows.append((scenario, metric, previous, current, change, status))
+    return rows
+
+
+def print_results(results: dict, rows: list) -> None:
+    print(f"{'scenario':<18} {'metric':<14} {'baseline':>10} {'current':>10} {'change':>8}  status")
+    compared = {(scenario, metric): row for scenario, metric, *row in rows}
+    for scenario, metrics in results.items():
+        for metric, current in metrics.items():
+            if metric == "turns":
+                continue
+            row = compared.get((scenario, metric))
+            if row is None:
+                print(f"{scenario:<18} {metric:<14} {'-':>10} {current:10.2f} {'':>8}")
+            else:
+                previous, _, change, status = row
+                print(f"{scenario:<18} {metric:<14} {previous:10.2f} {current:10.2f} {change:+8.1%}  {status}")
+
+
+# ----------------------------------------------------------------------
+# Main
+# ----------------------------------------------------------------------
+
+def run_suite(args) -> dict:
+    records = load_records(args.recordings)
+    latency = LatencyModel.parse(args.latency, args.seed, records)
+    replay = ReplayLLM(records, latency)
+    messages = list(dict.fromkeys(r["scenario"]["user_message"] for r in records))
+    results = {}
+
+    with FakeOpenAIServer(replay=replay, latency_model=latency) as server:
+        app = import_app(server.base_url)
+        app.RESPONSE_CACHE.maxsize = 0
+        from react_agent.agent import AGENT_POOL
+        from react_agent.run_detailed_experiments import load_business_context
+
+        # Warm-up: first-call imports, compiled regexes, the agent graph
+        for message in messages:
+            app.chat_with_agent(message, [])
+        agent = AGENT_POOL.get(mode="react", max_turns=10)
+        context = load_business_context()
+        run = agent_runner(agent, context, replay)
+        for record in records[:len(messages)]:
+            run(record)
+
+        print(f"app.turn ({len(messages) * args.rounds} turns)...", file=sys.stderr)
+        results["app.turn"] = app_turn(app, server, messages * args.rounds)
+        print(f"app.concurrent ({len(messages) * args.rounds * 2} turns)...", file=sys.stderr)
+        results["app.concurrent"] = app_concurrent(app, messages * args.rounds * 2, args.concurrency)
+        cells = records * max(1, args.rounds // 2)
+        print(f"agent.turn ({len(cells)} runs)...", file=sys.stderr)
+        results["agent.turn"] = agent_turn(run, replay, cells)
+        print(f"agent.concurrent ({len(cells) * 2} runs)...", file=sys.stderr)
+        results["agent.concurrent"] = agent_concurrent(run, cells * 2, args.concurrency)
+
+        # Memory with zero latency: only our own allocations matter here
+        server.httpd.latency_model = replay.latency = LatencyModel("fixed", (0.0,))
+        print("memory...", file=sys.stderr)
+        results["app.memory"] = memory(lambda message: app.chat_with_agent(message, []), messages * args.rounds)
+        results["agent.memory"] = memory(run, records)
+
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", default="lognormal:0.05,0.5",
+                        help="Model latency distribution (fixed:S, uniform:LO,HI, lognormal:MEDIAN,SIGMA, recorded[:SCALE])")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=6, help="Times each recorded message is sent per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--quick", action="store_true", help="Two rounds (smoke run)")
+    parser.add_argument("--recordings", type=Path, default=DEFAULT_RECORDINGS)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative change that counts (default 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    args = parser.parse_args()
+    if args.quick:
+        args.rounds = 2
+    args.recordings, args.baseline, args.output = (p.resolve() for p in (args.recordings, args.baseline, args.output))
+
+    meta = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "latency": args.latency,
+        "seed": args.seed,
+        "rounds": args.rounds,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+    }
+    results = {scenario: {metric: round(value, 3) for metric, value in metrics.items()}
+               for scenario, metrics in run_suite(args).items()}
+    report = {"meta": meta, "results": results}
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    print("=" * 80)
+    print(f"OFFLINE SUITE (latency {args.latency}, seed {args.seed}, {args.rounds} rounds, "
+          f"concurrency {args.concurrency})")
+    if baseline:
+        print(f"baseline: {baseline['meta']['timestamp']} ({baseline['meta']['machine']})")
+        different = [key for key in ("latency", "seed", "rounds", "concurrency")
+                     if baseline["meta"].get(key) != meta[key]]
+        if different:
+            print(f"note: the baseline ran with a different {', '.join(different)}; changes are not like for like")
+    print("=" * 80)
+    rows = compare(results, baseline["results"], args.tolerance) if baseline else []
+    print_results(results, rows)
+    print(f"\nresults: {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline saved: {args.baseline}")
+        return 0
+    regressions = [row for row in rows if row[-1] == "REGRESSION"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
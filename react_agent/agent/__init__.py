@@ -8,11 +8,54 @@ from .tools import (
     schedule_pickup,
     create_cake_order,
     get_tool,
-    get_tool_descriptions
+    get_tool_descriptions,
+    REGISTRY,
+    RECORD_STORE,
+)
+from .registry import Param, ToolError, ToolRegistry, ToolSpec
+from .personas import (
+    get_persona_prompt,
+    list_personas,
+    clear_persona_prompt_cache,
+    persona_prompt_cache_info,
 )
-from .personas import get_persona_prompt, list_personas
 from .react_loop import ReActController, create_react_controller
-from .framework_impl import LangGraphReActAgent, create_langgraph_agent
+from .function_calling import FunctionCallingController, create_function_calling_controller
+from .streaming_react import StreamingReActController, StreamingReActParser, create_streaming_react_controller
+from .snapshot import BusinessSnapshot, load_snapshot, on_snapshot_change
+from .retrieval import BM25Index, build_business_index
+from .metrics import METRICS, MetricsRegistry
+from .prompt_layout import layout_messages, prefix_fingerprint, record_usage
+from .response_cache import ResponseCache, normalize_question
+from .sessions import Session, SessionStore, summarize_turns
+from .compaction import Compactor, create_llm_summarizer, summarize_messages
+from .feedback import FeedbackClassifier, FeedbackDetector
+from .idempotency import IdempotencyIndex, idempotency_key
+from .store import RecordStore
+from .tracing import TRACER, Tracer, serve_metrics
+from .profiling import PROFILER, Profiler
+from .cassette import CASSETTE, Cassette, CassetteMiss
+from .analytics import ColumnarCache, aggregate, iter_records, iter_rows
+from .tokens import (
+    TOKEN_ACCOUNTANT, TokenAccountant, TokenBudgetExceeded, count_messages, max_tokens_kwargs, tracked_calls,
+)
+
+# LangGraph is only needed by the ReAct agent; the standalone app.py imports
+# shared modules from this package without it installed.
+try:
+    from .framework_impl import (
+        LangGraphReActAgent,
+        create_langgraph_agent,
+        AgentPool,
+        AGENT_POOL,
+        get_compiled_graph,
+    )
+except ImportError:
+    LangGraphReActAgent = None
+    create_langgraph_agent = None
+    AgentPool = None
+    AGENT_POOL = None
+    get_compiled_graph = None
 
 __all__ = [
     "record_customer_interest",
@@ -21,10 +64,67 @@ __all__ = [
     "create_cake_order",
     "get_tool",
     "get_tool_descriptions",
+    "REGISTRY",
+    "RECORD_STORE",
+    "Param",
+    "ToolError",
+    "ToolRegistry",
+    "ToolSpec",
     "get_persona_prompt",
     "list_personas",
+    "clear_persona_prompt_cache",
+    "persona_prompt_cache_info",
     "ReActController",
     "create_react_controller",
+    "FunctionCallingController",
+    "create_function_calling_controller",
+    "StreamingReActController",
+    "StreamingReActParser",
+    "create_streaming_react_controller",
     "LangGraphReActAgent",
     "create_langgraph_agent",
+    "AgentPool",
+    "AGENT_POOL",
+    "get_compiled_graph",
+    "BusinessSnapshot",
+    "load_snapshot",
+    "on_snapshot_change",
+    "BM25Index",
+    "build_business_index",
+    "METRICS",
+    "MetricsRegistry",
+    "layout_messages",
+    "prefix_fingerprint",
+    "record_usage",
+    "ResponseCache",
+    "normalize_question",
+    "Session",
+    "SessionStore",
+    "summarize_turns",
+    "Compactor",
+    "create_llm_summarizer",
+    "summarize_messages",
+    "FeedbackClassifier",
+    "FeedbackDetector",
+    "IdempotencyIndex",
+    "idempotency_key",
+    "RecordStore",
+    "TRACER",
+    "Tracer",
+    "PROFILER",
+    "Profiler",
+    "CASSETTE",
+    "Cassette",
+    "CassetteMiss",
+    "ColumnarCache",
+    "aggregate",
+    "iter_records",
+    "iter_rows",
+    "serve_metrics",
+    "TOKEN_ACCOUNTANT",
+    "TokenAccountant",
+    "TokenBudgetExceeded",
+    "count_messages",
+    "max_tokens_kwargs",
+    "tracked_calls",
 ]
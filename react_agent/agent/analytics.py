@@ -0,0 +1,466 @@
+"""
+Experiment Results Analytics
+Streaming statistics over experiments/detailed_results.jsonl, in one pass and
+flat memory however many runs the file holds.
+
+    rows = iter_rows(path, persona="strict_expert", since="2025-10-01")
+    summary = aggregate(rows, by=("persona", "scenario"))
+    print(format_summary(summary))
+
+  - iter_rows() reads the file line by line and yields one small Row per
+    record. Lines that cannot match the persona/scenario/date filters are
+    skipped before they are parsed (a substring check, and the timestamp read
+    with a regex).
+  - aggregate() keeps, per group, a histogram (value -> count) of turns, tool
+    calls and response length. These are small integers, so the histograms stay
+    tiny and the percentiles they give are exact (the same rule as METRICS:
+    the value at index int(q * n) of the sorted values).
+  - ColumnarCache keeps the rows as NumPy arrays (one .npy per column, loaded
+    memory-mapped) next to the results file, so repeat queries are a few
+    vectorized masks instead of a re-read of the JSON. The cache follows the
+    file incrementally: appended records are read from where it stopped, and a
+    rewritten file is re-read from the start. NumPy is optional; without it
+    the streaming path is used.
+
+Dates filter on the record timestamp: since is inclusive, and until includes
+everything that starts with it ("2025-10-25" is the whole day).
+
+Command line:
+    python react_agent/analyze_results.py [--persona P] [--scenario S] [--since D] [--until D]
+        [--by persona,scenario] [--cache]
+"""
+
+import os
+import re
+import json
+import hashlib
+import argparse
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # the streaming path does not need it
+    np = None
+
+DEFAULT_RESULTS = Path("experiments/detailed_results.jsonl")
+METRIC_NAMES = ("turns", "tool_calls", "response_chars")
+GROUP_FIELDS = ("persona", "scenario", "mode", "temperature", "top_p", "date")
+DEFAULT_PERCENTILES = (0.50, 0.90, 0.99)
+
+_TIMESTAMP = re.compile(r'"timestamp"\s*:\s*"([^"]*)"')
+# Sorts after every character a timestamp can contain, for the inclusive "until"
+_UNTIL_SUFFIX = "\uffff"
+
+
+class Row(NamedTuple):
+    """The fields of one record the statistics need."""
+    timestamp: str
+    persona: str
+    scenario: str
+    mode: str
+    temperature: float
+    top_p: float
+    turns: int
+    tool_calls: int
+    response_chars: int
+    success: bool
+
+    @property
+    def date(self) -> str:
+        return self.timestamp[:10]
+
+
+def to_row(record: Dict) -> Row:
+    experiment = record["experiment"]
+    response = record["response"]
+    return Row(
+        timestamp=record.get("timestamp", ""),
+        persona=experiment["persona"],
+        scenario=record["scenario"]["key"],
+        mode=experiment.get("mode", "react"),
+        temperature=float(experiment["temperature"]),
+        top_p=float(experiment["top_p"]),
+        turns=int(response.get("turns", 0)),
+        tool_calls=len(response.get("actions_taken", [])),
+        response_chars=len(response.get("final_answer") or ""),
+        success=response.get("stopped_reason") == "answer_found",
+    )
+
+
+def _in_range(timestamp: str, since: Optional[str], until: Optional[str]) -> bool:
+    return (since is None or timestamp >= since) and (until is None or timestamp <= until + _UNTIL_SUFFIX)
+
+
+def _matches(row: Row, persona: Optional[str], scenario: Optional[str],
+             since: Optional[str], until: Optional[str]) -> bool:
+    return ((persona is None or row.persona == persona)
+            and (scenario is None or row.scenario == scenario)
+            and _in_range(row.timestamp, since, until))
+
+
+def iter_records(path: Path = DEFAULT_RESULTS, persona: Optional[str] = None, scenario: Optional[str] = None,
+                 since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict]:
+    """
+    The records of a detailed_results.jsonl file that pass the filters, in file
+    order. A trailing line without its newline (a run still writing, or one
+    that was interrupted) is not read.
+
+    Args:
+        path: The results file
+        persona, scenario: Keep only this persona / scenario key
+        since, until: Keep only timestamps >= since / starting at most with until
+    """
+    with open(path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                return
+            line = raw.decode("utf-8")
+            if not line.strip():
+                continue
+            if persona is not None and persona not in line:
+                continue
+            if scenario is not None and scenario not in line:
+                continue
+            if since is not None or until is not None:
+                match = _TIMESTAMP.search(line)
+                if match and not _in_range(match.group(1), since, until):
+                    continue
+            record = json.loads(line)
+            if _matches(to_row(record), persona, scenario, since, until):
+                yield record
+
+
+def iter_rows(path: Path = DEFAULT_RESULTS, persona: Optional[str] = None, scenario: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Row]:
+    """Rows of the records iter_records() yields."""
+    for record in iter_records(path, persona, scenario, since, until):
+        yield to_row(record)
+
+
+# ----------------------------------------------------------------------
+# One-pass aggregation
+# ----------------------------------------------------------------------
+
+class Histogram:
+    """Exact distribution of small integers: value -> count."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.total = 0
+
+    def add(self, value: int) -> None:
+        self.counts[value] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q: float) -> int:
+        """The value at index int(q * n) of the sorted values."""
+        if not self.count:
+            return 0
+        index = min(self.count - 1, int(q * self.count))
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen > index:
+                return value
+        return value
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        stats = {"mean": self.total / self.count if self.count else 0.0}
+        for q in percentiles:
+            stats[f"p{q * 100:g}"] = self.percentile(q)
+        stats["max"] = max(self.counts) if self.counts else 0
+        return stats
+
+
+class GroupStats:
+    """Histograms of every metric, and the success count, for one group."""
+
+    __slots__ = ("count", "successes", "histograms")
+
+    def __init__(self):
+        self.count = 0
+        self.successes = 0
+        self.histograms = {name: Histogram() for name in METRIC_NAMES}
+
+    def add(self, row: Row) -> None:
+        self.count += 1
+        self.successes += row.success
+        for name in METRIC_NAMES:
+            self.histograms[name].add(getattr(row, name))
+
+    def summary(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+        return {
+            "count": self.count,
+            "success_rate": self.successes / self.count if self.count else 0.0,
+            **{name: histogram.summary(percentiles) for name, histogram in self.histograms.items()},
+        }
+
+
+def _check_by(by: Sequence[str]) -> Tuple[str, ...]:
+    unknown = [field for field in by if field not in GROUP_FIELDS]
+    if unknown:
+        raise ValueError(f"Cannot group by {unknown}. Choose from: {list(GROUP_FIELDS)}")
+    return tuple(by)
+
+
+def aggregate(rows: Iterable[Row], by: Sequence[str] = ("persona",),
+              percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[Tuple, Dict]:
+    """
+    One pass over `rows`: the statistics of every group.
+
+    Returns:
+        group key (tuple of the `by` fields; () for everything) -> {"count",
+        "success_rate", and per metric {"mean", "p50", "p90", "p99", "max"}}
+    """
+    by = _check_by(by)
+    groups: Dict[Tuple, GroupStats] = {}
+    for row in rows:
+        key = tuple(getattr(row, field) for field in by)
+        stats = groups.get(key)
+        if stats is None:
+            stats = groups[key] = GroupStats()
+        stats.add(row)
+    return {key: groups[key].summary(percentiles) for key in sorted(groups)}
+
+
+def format_summary(summary: Dict[Tuple, Dict], by: Sequence[str] = ("persona",)) -> str:
+    """The statistics as a text table, one line per group."""
+    if not summary:
+        return "No matching results."
+    columns = list(next(iter(summary.values()))["turns"])
+    label = " / ".join(by) or "all"
+    keys = {key: " / ".join(str(part) for part in key) or "all" for key in summary}
+    width = max(len(label), *(len(text) for text in keys.values()))
+    block = 8 * len(columns)
+    lines = [f"{'':<{width}} {'':>7} {'':>8}" + "".join(f" |{name:^{block}}" for name in METRIC_NAMES),
+             f"{label:<{width}} {'runs':>7} {'success':>8}"
+             + "".join(" |" + "".join(f"{column:>8}" for column in columns) for _ in METRIC_NAMES)]
+    lines.append("-" * len(lines[1]))
+    for key, stats in summary.items():
+        line = f"{keys[key]:<{width}} {stats['count']:7d} {stats['success_rate']:8.1%}"
+        for name in METRIC_NAMES:
+            line += " |" + "".join(f"{stats[name][column]:8.1f}" if column == "mean" else f"{stats[name][column]:8d}"
+                                   for column in columns)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# ----------------------------------------------------------------------
+# Columnar cache
+# ----------------------------------------------------------------------
+
+CACHE_VERSION = 1
+# Bytes at the start of the file whose hash tells an appended file from a rewritten one
+HEAD_BYTES = 4096
+_CATEGORICAL = ("persona", "scenario", "mode")
+_NUMERIC = {"temperature": "f4", "top_p": "f4", "turns": "i4", "tool_calls": "i4",
+            "response_chars": "i4", "success": "?"}
+_DTYPES = dict({"timestamp": "S32"}, **{name: "i4" for name in _CATEGORICAL}, **_NUMERIC)
+_COLUMNS = tuple(_DTYPES)
+
+
+class ColumnarCache:
+    """
+    NumPy column cache of a detailed_results.jsonl file.
+
+    Args:
+        source: The results file
+        cache_dir: Directory of the .npy columns (default: a hidden directory next
+            to the source)
+    """
+
+    def __init__(self, source: Path = DEFAULT_RESULTS, cache_dir: Optional[Path] = None):
+        if np is None:
+            raise ImportError("ColumnarCache needs NumPy (pip install numpy)")
+        self.source = Path(source)
+        self.cache_dir = Path(cache_dir) if cache_dir else self.source.with_name(f".{self.source.stem}.columns")
+        self.meta: Dict = {}
+        self.columns: Dict = {}
+
+    def _head_hash(self, length: int) -> str:
+        with open(self.source, "rb") as f:
+            return hashlib.sha256(f.read(min(length, HEAD_BYTES))).hexdigest()
+
+    def _load_meta(self) -> Dict:
+        try:
+            meta = json.loads((self.cache_dir / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return meta if meta.get("version") == CACHE_VERSION else {}
+
+    def refresh(self) -> int:
+        """
+        Bring the cache up to date with the source file.
+
+        Returns:
+            Rows read from the source (0 when the cache was current)
+        """
+        meta = self._load_meta()
+        size = self.source.stat().st_size
+        # Appended to: the cached part is still there, byte for byte at the start
+        if meta and (size < meta["offset"] or self._head_hash(meta["offset"]) != meta["head"]):
+            meta = {}
+        start = meta.get("offset", 0)
+
+        categories = {name: list(meta.get("categories", {}).get(name, [])) for name in _CATEGORICAL}
+        codes = {name: {value: i for i, value in enumerate(values)} for name, values in categories.items()}
+        new: Dict[str, List] = {name: [] for name in _COLUMNS}
+        end = start
+        if size > start:
+            with open(self.source, "rb") as f:
+                f.seek(start)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    end += len(raw)
+                    if not raw.strip():
+                        continue
+                    row = to_row(json.loads(raw))
+                    new["timestamp"].append(row.timestamp)
+                    for name in _CATEGORICAL:
+                        value = getattr(row, name)
+                        code = codes[name].get(value)
+                        if code is None:
+                            code = codes[name][value] = len(categories[name])
+                            categories[name].append(value)
+                        new[name].append(code)
+                    for name in _NUMERIC:
+                        new[name].append(getattr(row, name))
+
+        if meta and end == start:
+            self._open(meta)
+            return 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        previous = self._read_columns() if meta else {}
+        rows = 0
+        for name in _COLUMNS:
+            array = np.array(new[name], dtype=_DTYPES[name])
+            if name in previous:
+                array = np.concatenate([previous[name], array])
+            np.save(self.cache_dir / f"{name}.npy", array)
+            rows = len(array)
+
+        meta = {"version": CACHE_VERSION, "offset": end, "head": self._head_hash(end), "rows": rows,
+                "categories": categories}
+        (self.cache_dir / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        self._open(meta)
+        return len(new["turns"])
+
+    def _read_columns(self) -> Dict:
+        return {name: np.load(self.cache_dir / f"{name}.npy") for name in _COLUMNS}
+
+    def _open(self, meta: Dict) -> None:
+        self.meta = meta
+        self.columns = {name: np.load(self.cache_dir / f"{name}.npy", mmap_mode="r") for name in _COLUMNS}
+
+    def __len__(self) -> int:
+        return self.meta.get("rows", 0)
+
+    def query(self, persona: Optional[str] = None, scenario: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None,
+              by: Sequence[str] = ("persona",), percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[Tuple, Dict]:
+        """The same statistics as aggregate(iter_rows(...)), from the columns."""
+        by = _check_by(by)
+        if not self.columns:
+            self.refresh()
+        columns, categories = self.columns, self.meta["categories"]
+        mask = np.ones(len(columns["turns"]), dtype=bool)
+        for name, value in (("persona", persona), ("scenario", scenario)):
+            if value is not None:
+                if value not in categories[name]:
+                    return {}
+                mask &= columns[name] == categories[name].index(value)
+        if since is not None:
+            mask &= columns["timestamp"] >= since.encode("utf-8")
+        if until is not None:
+            mask &= columns["timestamp"] <= until.encode("utf-8") + b"\xff"
+
+        selected = np.flatnonzero(mask)
+        group_columns = [self._group_column(field, selected) for field in by]
+        if group_columns:
+            keys, inverse = np.unique(np.stack(group_columns, axis=1), axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            keys, inverse = np.zeros((1, 0)), np.zeros(len(selected), dtype=int)
+        if not len(selected):
+            return {}
+
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+        values = {name: np.asarray(columns[name])[selected] for name in METRIC_NAMES + ("success",)}
+        summary = {}
+        for i, key in enumerate(keys):
+            members = order[bounds[i]:bounds[i + 1]]
+            stats = {"count": int(len(members)), "success_rate": float(values["success"][members].mean())}
+            for name in METRIC_NAMES:
+                ordered = np.sort(values[name][members])
+                metric = {"mean": float(ordered.mean())}
+                for q in percentiles:
+                    metric[f"p{q * 100:g}"] = int(ordered[min(len(ordered) - 1, int(q * len(ordered)))])
+                metric["max"] = int(ordered[-1])
+                stats[name] = metric
+            summary[tuple(self._group_value(field, code) for field, code in zip(by, key))] = stats
+        return dict(sorted(summary.items()))
+
+    def _group_column(self, field: str, selected):
+        """Integer codes of a group field for the selected rows."""
+        if field in _CATEGORICAL:
+            return np.asarray(self.columns[field])[selected].astype("i8")
+        if field == "date":
+            dates = np.asarray(self.columns["timestamp"])[selected].astype("S10")
+            self._dates, codes = np.unique(dates, return_inverse=True)
+            return codes.reshape(-1).astype("i8")
+        # temperature / top_p: float32 bits as integers keep equal values equal
+        return np.asarray(self.columns[field])[selected].view("i4").astype("i8")
+
+    def _group_value(self, field: str, code):
+        if field in _CATEGORICAL:
+            return self.meta["categories"][field][int(code)]
+        if field == "date":
+            return self._dates[int(code)].decode("utf-8")
+        return round(float(np.array([code], dtype="i4").view("f4")[0]), 4)
+
+
+# ----------------------------------------------------------------------
+# Command line
+# ----------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Turns, tool calls and response length percentiles "
+                                                 "of the experiment results.")
+    parser.add_argument("--file", type=Path, default=DEFAULT_RESULTS, help="Results file (default: %(default)s)")
+    parser.add_argument("--persona", default=None)
+    parser.add_argument("--scenario", default=None)
+    parser.add_argument("--since", default=None, help="First timestamp or date (inclusive)")
+    parser.add_argument("--until", default=None, help="Last timestamp or date (inclusive)")
+    parser.add_argument("--by", default="persona",
+                        help=f"Comma-separated group fields from {', '.join(GROUP_FIELDS)} ('' for none)")
+    parser.add_argument("--percentiles", type=float, nargs="+", default=[50, 90, 99])
+    parser.add_argument("--cache", action="store_true",
+                        help="Answer from the NumPy column cache (built or brought up to date first)")
+    args = parser.parse_args(argv)
+
+    if not args.file.exists():
+        print(f"No results at {args.file}. Run: python run_detailed_experiments.py")
+        return 1
+    by = tuple(field for field in args.by.split(",") if field)
+    percentiles = tuple(p / 100 for p in args.percentiles)
+    filters = {"persona": args.persona, "scenario": args.scenario, "since": args.since, "until": args.until}
+    if args.cache:
+        cache = ColumnarCache(args.file)
+        cache.refresh()
+        summary = cache.query(by=by, percentiles=percentiles, **filters)
+    else:
+        summary = aggregate(iter_rows(args.file, **filters), by=by, percentiles=percentiles)
+
+    chosen = ", ".join(f"{name}={value}" for name, value in filters.items() if value is not None)
+    print(f"{args.file} ({os.path.getsize(args.file) / 1e6:.1f} MB){': ' + chosen if chosen else ''}")
+    print(format_summary(summary, by))
+    return 0
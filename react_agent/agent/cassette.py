@@ -0,0 +1,408 @@
+"""
+LLM Call Cassette
+Record/replay of chat completions, so re-running the experiment grid or a
+conversation being debugged does not pay for the same API calls again.
+
+    client = CASSETTE.wrap(OpenAI(...))      # or AsyncOpenAI(...)
+    client.chat.completions.create(...)      # same interface
+
+Every request is reduced to a key: SHA-256 over the canonical JSON of its
+messages, model, temperature, top_p, tools, tool_choice, stop and stream
+options (None fields dropped; message objects dumped to dicts). max_tokens is
+left out, since it follows from the token budget left at the time. Responses
+are stored as the SDK's response objects serialized with model_dump_json (not
+the raw bytes on the wire), in one SQLite table (WAL mode, one connection per
+thread), and rebuilt from them on replay. A streamed response is stored as its
+chunks. A stream closed before its end (the ReAct controller cancels at the
+decision point, a client disconnects) is stored as the chunks that were read,
+marked partial: record mode calls the API again for it and replaces it once a
+stream is read to the end, replay mode plays back the recorded part.
+
+Modes (FLEUR_CASSETTE, or --cassette on run_detailed_experiments.py):
+  - passthrough (default): every call goes to the API, nothing is stored
+  - record: recorded requests are replayed, new ones go to the API and are stored
+  - replay: recorded requests only; anything else raises CassetteMiss
+
+The database is FLEUR_CASSETTE_PATH (default cassettes/llm_calls.db).
+"""
+
+import os
+import json
+import atexit
+import sqlite3
+import hashlib
+import inspect
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import METRICS
+
+CASSETTE_MODES = ("passthrough", "record", "replay")
+DEFAULT_MODE = os.getenv("FLEUR_CASSETTE", "passthrough")
+DEFAULT_CASSETTE_PATH = Path(os.getenv("FLEUR_CASSETTE_PATH", "cassettes/llm_calls.db"))
+
+# Request fields that make up the key (max_tokens and transport options do not)
+KEY_FIELDS = ("model", "messages", "temperature", "top_p", "tools", "tool_choice", "stop",
+              "stream", "stream_options")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    stream INTEGER NOT NULL,
+    request TEXT NOT NULL,
+    response TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 1
+)
+"""
+
+
+class CassetteMiss(LookupError):
+    """A request that is not in the cassette, in replay mode."""
+
+
+def _plain(value):
+    """JSON-ready copy of a request value (pydantic objects dumped, None fields dropped)."""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def normalize_request(kwargs: Dict) -> Dict:
+    """The part of a chat.completions.create call that determines its response."""
+    return {field: _plain(kwargs[field]) for field in KEY_FIELDS if kwargs.get(field) is not None}
+
+
+def request_key(request: Dict) -> str:
+    """SHA-256 of a normalized request's canonical JSON."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    SQLite store of recorded completions.
+
+    The database is opened on first use, so constructing a cassette is free.
+
+    Args:
+        path: Database file (parent directories are created)
+        mode: One of CASSETTE_MODES
+        metrics: Registry for hit/miss/record counters
+    """
+
+    def __init__(self, path: Path = DEFAULT_CASSETTE_PATH, mode: str = DEFAULT_MODE, metrics=METRICS):
+        self.path = Path(path)
+        self.mode = _check_mode(mode)
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._ready = False
+        atexit.register(self.close)
+
+    def configure(self, mode: Optional[str] = None, path: Optional[Path] = None) -> "Cassette":
+        """Switch the mode and/or the database file."""
+        if mode is not None:
+            self.mode = _check_mode(mode)
+        if path is not None and Path(path) != self.path:
+            self.close()
+            self.path = Path(path)
+            self._ready = False
+        return self
+
+    @property
+    def active(self) -> bool:
+        return self.mode != "passthrough"
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection (opened, and the table created, on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            if not self._ready:
+                with conn:
+                    conn.execute(SCHEMA)
+                    columns = {row[1] for row in conn.execute("PRAGMA table_info(calls)")}
+                    if "complete" not in columns:  # cassettes recorded before partial streams were marked
+                        conn.execute("ALTER TABLE calls ADD COLUMN complete INTEGER NOT NULL DEFAULT 1")
+                self._ready = True
+            self._connections.append(conn)
+        self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[str, bool]]:
+        """(response, complete) recorded for a key (stream chunks joined by newlines), or None."""
+        row = self.connection().execute("SELECT response, complete FROM calls WHERE key = ?", (key,)).fetchone()
+        return (row[0], bool(row[1])) if row else None
+
+    def put(self, key: str, request: Dict, response: str, complete: bool = True) -> None:
+        """
+        Store a response. The first complete recording of a key wins; a partial
+        one (a stream closed before its end) is replaced by a complete one.
+        """
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO calls (key, model, stream, request, response, recorded_at, complete) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET response = excluded.response, "
+                "recorded_at = excluded.recorded_at, complete = excluded.complete "
+                "WHERE calls.complete = 0 AND excluded.complete = 1",
+                (key, request.get("model"), int(bool(request.get("stream"))),
+                 json.dumps(request, ensure_ascii=False), response, datetime.utcnow().isoformat() + "Z",
+                 int(complete)),
+            )
+        self.metrics.increment("cassette.recorded" if complete else "cassette.recorded_partial")
+
+    def lookup(self, request: Dict) -> Optional[str]:
+        """
+        The recorded response for a normalized request, counting the hit or miss.
+        A partial stream is a hit in replay mode only; record mode asks the API
+        again, so the stream can be recorded to its end.
+
+        Raises:
+            CassetteMiss: In replay mode, when it was never recorded
+        """
+        key = request_key(request)
+        recorded = self.get(key)
+        if recorded is not None and (recorded[1] or self.mode == "replay"):
+            self.metrics.increment("cassette.hits")
+            return recorded[0]
+        self.metrics.increment("cassette.misses")
+        if self.mode == "replay":
+            raise CassetteMiss(f"No recorded response for request {key[:12]} (model {request.get('model')}, "
+                               f"{len(request.get('messages', []))} messages) in {self.path}; "
+                               f"run in record mode first")
+        return None
+
+    def __len__(self) -> int:
+        return self.connection().execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+
+    def wrap(self, client):
+        """`client` (OpenAI or AsyncOpenAI) with chat.completions.create going through this cassette."""
+        if isinstance(client, CassetteClient):
+            return client
+        return CassetteClient(client, self)
+
+    def close(self) -> None:
+        """Close every connection."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def _check_mode(mode: str) -> str:
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"Unknown cassette mode: {mode}. Choose from: {list(CASSETTE_MODES)}")
+    return mode
+
+
+# ----------------------------------------------------------------------
+# Client wrapper
+# ----------------------------------------------------------------------
+
+def _response_types():
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+    return ChatCompletion, ChatCompletionChunk
+
+
+class CassetteClient:
+    """
+    An OpenAI / AsyncOpenAI client whose chat.completions.create is recorded
+    and replayed. Every other attribute (read or set) is the wrapped client's.
+    """
+
+    __slots__ = ("client", "cassette", "is_async", "chat")
+
+    def __init__(self, client, cassette: Cassette):
+        object.__setattr__(self, "client", client)
+        object.__setattr__(self, "cassette", cassette)
+        object.__setattr__(self, "is_async", inspect.iscoroutinefunction(inspect.unwrap(client.chat.completions.create)))
+        object.__setattr__(self, "chat", _Chat(self))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def __setattr__(self, name, value):
+        if name in CassetteClient.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.client, name, value)
+
+
+class _Chat:
+    __slots__ = ("completions",)
+
+    def __init__(self, owner: CassetteClient):
+        self.completions = _Completions(owner)
+
+
+class _Completions:
+    __slots__ = ("owner",)
+
+    def __init__(self, owner: CassetteClient):
+        self.owner = owner
+
+    def create(self, **kwargs):
+        owner = self.owner
+        if owner.is_async:
+            return self._create_async(kwargs)
+        create = owner.client.chat.completions.create
+        cassette = owner.cassette
+        if not cassette.active:
+            return create(**kwargs)
+
+        request = normalize_request(kwargs)
+        recorded = cassette.lookup(request)
+        if recorded is not None:
+            return _replay(recorded, bool(kwargs.get("stream")))
+        response = create(**kwargs)
+        if kwargs.get("stream"):
+            return _RecordingStream(response, cassette, request)
+        cassette.put(request_key(request), request, response.model_dump_json())
+        return response
+
+    async def _create_async(self, kwargs):
+        create = self.owner.client.chat.completions.create
+        cassette = self.owner.cassette
+        if not cassette.active:
+            return await create(**kwargs)
+
+        request = normalize_request(kwargs)
+        recorded = cassette.lookup(request)
+        if recorded is not None:
+            replayed = _replay(recorded, bool(kwargs.get("stream")))
+            return _AsyncReplayStream(replayed.chunks) if kwargs.get("stream") else replayed
+        response = await create(**kwargs)
+        if kwargs.get("stream"):
+            return _AsyncRecordingStream(response, cassette, request)
+        cassette.put(request_key(request), request, response.model_dump_json())
+        return response
+
+
+def _replay(recorded: str, stream: bool):
+    completion_type, chunk_type = _response_types()
+    if not stream:
+        return completion_type.model_validate_json(recorded)
+    return _ReplayStream([chunk_type.model_validate_json(line) for line in recorded.split("\n") if line])
+
+
+class _ReplayStream:
+    """A recorded stream: iterates its chunks, like openai.Stream."""
+
+    def __init__(self, chunks: List):
+        self.chunks = chunks
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+class _AsyncReplayStream:
+    """A recorded stream for the async client, like openai.AsyncStream."""
+
+    def __init__(self, chunks: List):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def close(self) -> None:
+        pass
+
+
+class _RecordingStream:
+    """
+    A live stream that stores the chunks read once it ends or is closed
+    (marked partial when it was closed before its end).
+    """
+
+    def __init__(self, stream, cassette: Cassette, request: Dict):
+        self.stream = stream
+        self.cassette = cassette
+        self.request = request
+        self.chunks: List[str] = []
+        self.finished = False
+        self.saved = False
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.chunks.append(chunk.model_dump_json())
+            yield chunk
+        self.finished = True
+        self._save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        self.stream.close()
+        self._save()
+
+    def _save(self) -> None:
+        if not self.saved:
+            self.saved = True
+            self.cassette.put(request_key(self.request), self.request, "\n".join(self.chunks), self.finished)
+
+
+class _AsyncRecordingStream(_RecordingStream):
+    """The async client's version of _RecordingStream."""
+
+    def __iter__(self):
+        raise TypeError("Use async for with an async stream")
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.chunks.append(chunk.model_dump_json())
+            yield chunk
+        self.finished = True
+        self._save()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+    async def close(self) -> None:
+        await self.stream.close()
+        self._save()
+
+
+# Shared cassette for app.py and the experiment runner
+CASSETTE = Cassette()
@@ -0,0 +1,215 @@
+"""
+History Compaction
+Keeps a growing conversation under a token threshold before it is sent.
+
+When the estimated tokens of a message list cross `threshold`, everything
+between the static system prefix and the most recent messages is replaced by a
+single summary message (see prompt_layout.SUMMARY_HEADER):
+
+  - user/assistant turns are summarized, rule-based by default
+    (sessions.summarize_turns) or by the model (create_llm_summarizer)
+  - stale Observation payloads (ReAct "Observation: {...}" messages and
+    function-calling tool messages) are dropped, except results of tool calls
+    that committed something (status "success": a lead, feedback, pickup or
+    order was recorded), which stay in the summary as one line each so the
+    model never repeats them
+  - a summary from an earlier compaction is extended, not replaced
+
+The recent messages are kept verbatim, and a tool result is never separated
+from the call that produced it. Runs and tokens saved are counted in METRICS
+as compaction.runs / compaction.tokens_saved.
+"""
+
+import os
+import re
+import json
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .metrics import METRICS
+from .prompt_layout import CONTEXT_HEADER, SUMMARY_HEADER, estimate_tokens
+from .sessions import summarize_turns
+
+DEFAULT_COMPACT_TOKENS = int(os.getenv("FLEUR_COMPACT_TOKENS", "3000"))
+DEFAULT_KEEP_RECENT_MESSAGES = 6
+
+OBSERVATION_PREFIX = "Observation:"
+COMMITTED_PREFIX = "- Committed:"
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_ACTION_NAME = re.compile(r'Action\s*:\s*(\w+)\s*\(', re.IGNORECASE)
+_ANSWER = re.compile(r'\bAnswer\s*:\s*(.*)', re.IGNORECASE | re.DOTALL)
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize this bakery customer conversation for the assistant that continues it. "
+    "Keep names, contact details, dates, times, items, quantities and open requests; "
+    "drop greetings and repeated policy explanations. Extend the existing summary, "
+    "at most {max_words} words, as short '- ' bullet lines."
+)
+
+
+def message_tokens(messages: Sequence[Dict]) -> int:
+    """Estimated prompt tokens of a message list."""
+    total = 0
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content") or "")
+        for call in message.get("tool_calls") or []:
+            total += estimate_tokens(call["function"]["name"] + call["function"].get("arguments", ""))
+    return total
+
+
+def _is_observation(message: Dict) -> bool:
+    if message.get("role") == "tool":
+        return True
+    return message.get("role") == "user" and (message.get("content") or "").startswith(OBSERVATION_PREFIX)
+
+
+def _observation_payload(message: Dict) -> Optional[Dict]:
+    content = message.get("content") or ""
+    if message.get("role") != "tool":
+        content = content[len(OBSERVATION_PREFIX):]
+    try:
+        payload = json.loads(content)
+    except json.JSONDecodeError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _tool_names(messages: Sequence[Dict]) -> List[Optional[str]]:
+    """Tool name behind each message (for observations), None elsewhere."""
+    names, pending, call_names = [], None, {}
+    for message in messages:
+        name = None
+        if message.get("role") == "assistant":
+            action = _ACTION_NAME.search(message.get("content") or "")
+            pending = action.group(1) if action else None
+            for call in message.get("tool_calls") or []:
+                call_names[call["id"]] = call["function"]["name"]
+        elif message.get("role") == "tool":
+            name = message.get("name") or call_names.get(message.get("tool_call_id"))
+        elif _is_observation(message):
+            name = pending
+        names.append(name)
+    return names
+
+
+def summarize_messages(summary: str, messages: Sequence[Dict]) -> str:
+    """
+    Rule-based summarizer: one line per user turn (with the reply it got), appended
+    to the previous summary.
+
+    Args:
+        summary: Summary so far ("" for none)
+        messages: User and assistant messages being folded, oldest first
+    """
+    turns = []
+    for message in messages:
+        content = message.get("content") or ""
+        if message.get("role") == "user":
+            turns.append([content, ""])
+        elif message.get("role") == "assistant" and content:
+            answer = _ANSWER.search(content)
+            reply = answer.group(1) if answer else content
+            if turns:
+                turns[-1][1] = reply
+            else:
+                turns.append(["", reply])
+    return summarize_turns(summary, [(user, reply, None, ()) for user, reply in turns])
+
+
+def create_llm_summarizer(llm_call: Callable[[List[Dict[str, str]]], str],
+                          max_words: int = 150) -> Callable[[str, Sequence[Dict]], str]:
+    """
+    Summarizer that asks the model to extend the summary.
+
+    Args:
+        llm_call: Function that takes messages and returns the response text
+        max_words: Length limit given to the model
+    """
+    def summarizer(summary: str, messages: Sequence[Dict]) -> str:
+        transcript = "\n".join(f"{m['role']}: {m.get('content')}" for m in messages if m.get("content"))
+        return llm_call([
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(max_words=max_words)},
+            {"role": "user", "content": f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ]).strip()
+
+    return summarizer
+
+
+class Compactor:
+    """
+    Replaces old turns with a summary once a conversation crosses a token threshold.
+
+    Args:
+        threshold: Estimated tokens above which a message list is compacted
+        keep_recent: Messages at the end always kept verbatim
+        summarizer: (summary, messages) -> new summary
+        summary_tokens: Cap on the summarized turns (oldest lines dropped first;
+            committed tool results are always kept)
+        metrics: Registry for counters
+    """
+
+    def __init__(self, threshold: int = DEFAULT_COMPACT_TOKENS, keep_recent: int = DEFAULT_KEEP_RECENT_MESSAGES,
+                 summarizer: Callable[[str, Sequence[Dict]], str] = summarize_messages,
+                 summary_tokens: Optional[int] = None, metrics=METRICS):
+        self.threshold = threshold
+        self.keep_recent = keep_recent
+        self.summarizer = summarizer
+        self.summary_tokens = summary_tokens if summary_tokens is not None else threshold // 4
+        self.metrics = metrics
+
+    def compact(self, messages: List[Dict]) -> List[Dict]:
+        """Return `messages` unchanged if under the threshold, else the compacted list."""
+        before = message_tokens(messages)
+        if self.threshold <= 0 or before <= self.threshold:
+            return messages
+
+        # Static prefix and an earlier summary stay in front
+        start = 1 if messages and messages[0].get("role") == "system" else 0
+        summary = ""
+        if start < len(messages) and (messages[start].get("content") or "").startswith(SUMMARY_HEADER) \
+                and messages[start].get("role") == "system":
+            summary = messages[start]["content"][len(SUMMARY_HEADER):].strip()
+            body_start = start + 1
+        else:
+            body_start = start
+
+        # Keep a tool result together with the call that produced it
+        tail_start = max(body_start, len(messages) - self.keep_recent)
+        while tail_start > body_start and _is_observation(messages[tail_start]):
+            tail_start -= 1
+        if tail_start <= body_start:
+            return messages
+
+        middle = messages[body_start:tail_start]
+        names = _tool_names(messages[:tail_start])[body_start:]
+        committed, turns = [], []
+        for message, name in zip(middle, names):
+            if _is_observation(message):
+                payload = _observation_payload(message)
+                if payload and payload.get("status") == "success":
+                    committed.append(f"{COMMITTED_PREFIX} {name or 'tool'} -> {payload.get('message', 'done')}")
+                else:
+                    self.metrics.increment("compaction.observations_dropped")
+            elif message.get("role") == "system" and (message.get("content") or "").startswith(CONTEXT_HEADER):
+                continue  # passages are retrieved again for the current message
+            elif message.get("role") in ("user", "assistant"):
+                turns.append(message)
+
+        summary = self._cap(self.summarizer(summary, turns) if turns else summary, committed)
+        compacted = messages[:start] + [{"role": "system", "content": f"{SUMMARY_HEADER}\n{summary}"}] \
+            + messages[tail_start:]
+
+        self.metrics.increment("compaction.runs")
+        self.metrics.increment("compaction.tokens_saved", before - message_tokens(compacted))
+        return compacted
+
+    def _cap(self, summary: str, committed: List[str]) -> str:
+        """Committed lines last and always kept; other lines roll off oldest first."""
+        lines = [line for line in summary.split("\n") if line]
+        kept = [line for line in lines if line.startswith(COMMITTED_PREFIX)] + committed
+        rolling = [line for line in lines if not line.startswith(COMMITTED_PREFIX)]
+        while rolling and estimate_tokens("\n".join(rolling)) > self.summary_tokens:
+            rolling.pop(0)
+        return "\n".join(rolling + kept)
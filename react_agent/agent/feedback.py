@@ -0,0 +1,265 @@
+"""
+Feedback Detection
+Decides whether a chat message carries customer feedback (praise, complaints,
+suggestions) so it can be logged with record_feedback when the model did not.
+
+Two detectors:
+  - keywords (default): one precompiled alternation regex over whole words and
+    phrases (factored into a character trie), scanned once per lowercased
+    message. Phrases that contain a keyword without being feedback ("cold
+    brew", "could you", "what do you recommend", "good morning") are
+    alternatives of the same regex that match first and are skipped, so "add"
+    no longer fires inside "address" nor "cold" on a cold brew order. Short
+    exclamations still count, as before.
+  - classifier: logistic regression over hashed word unigrams and bigrams,
+    scored with NumPy (a gather and a sum per message, one np.add.reduceat for
+    a batch). It is trained on the "train" split of feedback_examples.jsonl the
+    first time it is needed (a few milliseconds).
+
+FLEUR_FEEDBACK_DETECTOR selects the detector ("keywords" or "classifier").
+The labeled examples' "test" split is held out for evaluation (see
+benchmarks/bench_feedback_detector.py).
+"""
+
+import os
+import re
+import json
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_DETECTOR = os.getenv("FLEUR_FEEDBACK_DETECTOR", "keywords")
+DETECTORS = ("keywords", "classifier")
+
+EXAMPLES_PATH = Path(__file__).parent / "feedback_examples.jsonl"
+
+POSITIVE_KEYWORDS = [
+    'amazing', 'love', 'loved', 'best', 'great', 'excellent', 'delicious',
+    'wonderful', 'fantastic', 'awesome', 'perfect', 'incredible', 'outstanding',
+    'tasty', 'yummy', 'so fresh', 'very fresh', 'really fresh', 'super fresh',
+    'good', 'nice', 'enjoyed', 'favorite', 'favourite'
+]
+
+NEGATIVE_KEYWORDS = [
+    'bad', 'terrible', 'awful', 'horrible', 'disappointing', 'disappointed',
+    'too expensive', 'too sweet', 'too salty', 'stale', 'cold', 'dry', 'burnt',
+    'undercooked', 'overcooked', 'worst', 'disgusting', 'gross'
+]
+
+SUGGESTION_KEYWORDS = [
+    'should', 'could', 'suggest', 'recommend', 'add', 'wish', 'hope',
+    'would be nice', 'would be better', 'improve', 'change'
+]
+
+# Phrases containing a keyword that are requests or questions, not feedback
+# (regex fragments; tried before the keywords at every position)
+EXCLUDED_PHRASES = [
+    r"cold\s+(?:brew|drinks?|coffee)",
+    r"(?:could|should)\s+(?:i|we|you|it)\b",
+    r"how\s+should",
+    r"you\s+recommend",
+    r"add\s+(?:a|an|another|some|the|to|candles?|my)\b",
+    r"change\s+(?:my|the)\b",
+    r"good\s+(?:morning|afternoon|evening)",
+    r"best[\s-]+sell(?:er|ers|ing)",
+    r"best\s+(?:time|way)",
+    r"love\s+to",
+]
+
+# Short messages with an exclamation mark usually state an opinion
+EXCLAMATION_MAX_WORDS = 20
+
+N_FEATURES = 2 ** 12
+DEFAULT_THRESHOLD = 0.5
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Alternation of `words` factored into a character trie ("stale|stop" becomes
+    "st(?:ale|op)"), so the regex engine never re-reads a shared prefix.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [(r"\s+" if ch == " " else re.escape(ch)) + build(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ending here while longer ones continue makes the rest optional
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def compile_keywords(keywords: Iterable[str], exclusions: Iterable[str] = EXCLUDED_PHRASES) -> re.Pattern:
+    """
+    One regex for whole-word keywords and phrases, applied to lowercased text.
+
+    The keywords are the only capturing group. Exclusions are a non-capturing
+    alternative listed first, so where both match the excluded phrase wins, is
+    consumed, and shows up in findall() as an empty string. A lookahead on the
+    first letters skips positions where nothing can start.
+    """
+    keywords = [" ".join(word.lower().split()) for word in keywords]
+    exclusions = list(exclusions)
+    initials = "".join(sorted({word[0] for word in keywords} | {e[0] for e in exclusions if e[0].isalpha()}))
+    return re.compile(rf"\b(?=[{initials}])(?:(?:{'|'.join(exclusions)})\b|({_trie_pattern(keywords)})\b)")
+
+
+# n-gram -> hash bucket, memoized (a chat vocabulary is small); reset past the cap
+_buckets: Dict[Tuple[str, int], int] = {}
+MAX_CACHED_BUCKETS = 1 << 16
+
+
+def _bucket(gram: str, n_features: int) -> int:
+    key = (gram, n_features)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        if len(_buckets) >= MAX_CACHED_BUCKETS:
+            _buckets.clear()
+        # crc32 is stable across processes (unlike hash()), so trained weights are reproducible
+        bucket = _buckets[key] = zlib.crc32(gram.encode("utf-8")) % n_features
+    return bucket
+
+
+def _features(text: str, n_features: int = N_FEATURES) -> List[int]:
+    """Distinct hash buckets of the message's word unigrams and bigrams (plus ?/! markers)."""
+    words = _WORD_RE.findall(text.lower())
+    # "<message>" is in every row, so no message has an empty feature set
+    grams = ["<message>"] + words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if "?" in text:
+        grams.append("<question>")
+    if "!" in text:
+        grams.append("<exclamation>")
+    return list({_bucket(gram, n_features) for gram in grams})
+
+
+def load_examples(path: Path = EXAMPLES_PATH, split: Optional[str] = None) -> List[Tuple[str, int]]:
+    """Labeled (text, label) pairs from the examples file, optionally one split only."""
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if split is None or record["split"] == split:
+                    examples.append((record["text"], int(record["label"])))
+    return examples
+
+
+class FeedbackClassifier:
+    """
+    Logistic regression over hashed n-gram features.
+
+    Args:
+        n_features: Hash buckets
+        threshold: Probability at or above which a message is feedback
+    """
+
+    def __init__(self, n_features: int = N_FEATURES, threshold: float = DEFAULT_THRESHOLD):
+        self.n_features = n_features
+        self.threshold = threshold
+        self.weights = np.zeros(n_features, dtype=np.float64)
+        self.bias = 0.0
+
+    def fit(self, texts: Sequence[str], labels: Sequence[int], epochs: int = 400,
+            learning_rate: float = 0.5, l2: float = 1e-3) -> "FeedbackClassifier":
+        """Full-batch gradient descent on the logistic loss."""
+        X = np.zeros((len(texts), self.n_features), dtype=np.float64)
+        for row, text in enumerate(texts):
+            X[row, _features(text, self.n_features)] = 1.0
+        y = np.asarray(labels, dtype=np.float64)
+
+        weights, bias = np.zeros(self.n_features), 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(X @ weights + bias)))
+            error = p - y
+            weights -= learning_rate * (X.T @ error / len(y) + l2 * weights)
+            bias -= learning_rate * error.mean()
+        self.weights, self.bias = weights, bias
+        return self
+
+    def score(self, text: str) -> float:
+        """Probability that `text` is feedback."""
+        z = self.weights[_features(text, self.n_features)].sum() + self.bias
+        return float(1.0 / (1.0 + np.exp(-z)))
+
+    def score_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Probabilities for a batch: one gather and one segmented sum over all features."""
+        if not texts:
+            return np.zeros(0)
+        rows = [_features(text, self.n_features) for text in texts]
+        offsets = np.cumsum([0] + [len(row) for row in rows[:-1]])
+        indices = np.fromiter((i for row in rows for i in row), dtype=np.int64, count=int(offsets[-1]) + len(rows[-1]))
+        sums = np.add.reduceat(self.weights[indices], offsets)
+        return 1.0 / (1.0 + np.exp(-(sums + self.bias)))
+
+    def predict(self, text: str) -> bool:
+        return self.score(text) >= self.threshold
+
+
+def train_classifier(path: Path = EXAMPLES_PATH, split: str = "train", **options) -> FeedbackClassifier:
+    """A classifier fitted on one split of the labeled examples."""
+    texts, labels = zip(*load_examples(path, split))
+    return FeedbackClassifier(**options).fit(texts, labels)
+
+
+class FeedbackDetector:
+    """
+    Keyword or classifier feedback detection.
+
+    Args:
+        mode: One of DETECTORS
+        keywords: Words and phrases that signal feedback (keywords mode)
+        exclusions: Regex fragments of phrases that never count (keywords mode)
+        classifier: Fitted classifier (classifier mode; trained on the labeled
+            examples on first use when not given)
+    """
+
+    def __init__(self, mode: str = DEFAULT_DETECTOR,
+                 keywords: Optional[Iterable[str]] = None,
+                 exclusions: Iterable[str] = EXCLUDED_PHRASES,
+                 classifier: Optional[FeedbackClassifier] = None):
+        if mode not in DETECTORS:
+            raise ValueError(f"Unknown feedback detector: {mode}. Choose from: {list(DETECTORS)}")
+        self.mode = mode
+        if keywords is None:
+            keywords = POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS + SUGGESTION_KEYWORDS
+        self.pattern = compile_keywords(keywords, exclusions)
+        self._classifier = classifier
+
+    @property
+    def classifier(self) -> FeedbackClassifier:
+        if self._classifier is None:
+            self._classifier = train_classifier()
+        return self._classifier
+
+    def matches(self, message: str) -> List[str]:
+        """Keywords found in `message`, excluded phrases left out."""
+        return [hit for hit in self.pattern.findall(message.lower()) if hit]
+
+    def _keyword_match(self, message: str) -> bool:
+        if any(self.pattern.findall(message.lower())):
+            return True
+        return '!' in message and len(message.split()) < EXCLAMATION_MAX_WORDS
+
+    def detect(self, message: str) -> bool:
+        """True if `message` looks like feedback."""
+        if self.mode == "classifier":
+            return self.classifier.predict(message)
+        return self._keyword_match(message)
+
+    def detect_many(self, messages: Sequence[str]) -> List[bool]:
+        """detect() for a batch (vectorized in classifier mode)."""
+        if self.mode == "classifier":
+            return (self.classifier.score_many(messages) >= self.classifier.threshold).tolist()
+        return [self._keyword_match(message) for message in messages]
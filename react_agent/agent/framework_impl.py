@@ -1,15 +1,35 @@
 """
 LangGraph Framework Implementation
 Wires the custom ReAct loop into LangGraph's state machine architecture
+
+The graph only describes structure, so it is compiled once per structure and
+shared by every agent (get_compiled_graph). What differs between agents and
+requests - the controller with its llm_call, and the persona - is passed at
+run time through the graph's config. AgentPool hands out one agent per
+(mode, max_turns, retriever, top_k, response_cache, compactor); persona and
+llm_call are chosen per run().
 """
 
-from typing import TypedDict, List, Dict, Annotated
+import threading
+from typing import TypedDict, List, Dict, Annotated, Callable, Optional
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
+from langchain_core.runnables import RunnableConfig
 import operator
 
 from .react_loop import ReActController
+from .function_calling import FunctionCallingController
+from .streaming_react import StreamingReActController
 from .personas import get_persona_prompt
+from .retrieval import DEFAULT_TOP_K
+from .prompt_layout import RETRIEVED_CONTEXT_NOTE, layout_messages
+
+# Agent mode -> (controller class, persona prompt mode)
+AGENT_MODES = {
+    "react": (ReActController, "react"),
+    "react_stream": (StreamingReActController, "react"),
+    "function_calling": (FunctionCallingController, "function_calling"),
+}
 
 
 class AgentState(TypedDict):
@@ -22,6 +42,89 @@ class AgentState(TypedDict):
     iteration: int
 
 
+def _process_with_react_loop(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Process messages using our custom ReAct loop.
+
+    Args:
+        state: Current agent state
+        config: Run-time config; config["configurable"]["controller"] is the
+            ReActController (or subclass) to run for this request, and
+            config["configurable"]["session_id"] the conversation it belongs to
+
+    Returns:
+        Updated state with results
+    """
+    messages = state["messages"]
+
+    # Run our custom ReAct controller
+    controller = config["configurable"]["controller"]
+    final_answer, all_messages, metadata = controller.run(messages, config["configurable"].get("session_id"))
+
+    # Update state
+    return {
+        "messages": all_messages,
+        "persona": state["persona"],
+        "business_context": state.get("business_context", ""),
+        "final_answer": final_answer,
+        "metadata": metadata,
+        "iteration": state.get("iteration", 0) + 1
+    }
+
+
+def _build_react_loop_graph():
+    """
+    Build the LangGraph state machine.
+
+    Graph structure:
+    START → process_message → END
+
+    Note: We keep it simple since our ReActController handles the complex loop internally.
+    """
+    workflow = StateGraph(AgentState)
+
+    # Add single processing node that runs our custom ReAct loop
+    workflow.add_node("process_message", _process_with_react_loop)
+
+    # Set entry point
+    workflow.set_entry_point("process_message")
+
+    # Always end after processing (our loop handles iterations internally)
+    workflow.add_edge("process_message", END)
+
+    return workflow.compile()
+
+
+# Graph structure name -> builder. Compiled graphs hold no per-agent state
+# (no checkpointer), so one instance is safely shared across threads.
+GRAPH_BUILDERS = {
+    "react_loop": _build_react_loop_graph,
+}
+
+_GRAPH_CACHE = {}
+_GRAPH_LOCK = threading.Lock()
+
+
+def get_compiled_graph(structure: str = "react_loop"):
+    """Return the compiled graph for `structure`, compiling it on first use."""
+    graph = _GRAPH_CACHE.get(structure)
+    if graph is None:
+        builder = GRAPH_BUILDERS.get(structure)
+        if builder is None:
+            raise ValueError(f"Unknown graph structure: {structure}. Choose from: {list(GRAPH_BUILDERS)}")
+        with _GRAPH_LOCK:
+            graph = _GRAPH_CACHE.get(structure)
+            if graph is None:
+                graph = _GRAPH_CACHE[structure] = builder()
+    return graph
+
+
+def clear_graph_cache() -> None:
+    """Drop compiled graphs (they are rebuilt on next use)."""
+    with _GRAPH_LOCK:
+        _GRAPH_CACHE.clear()
+
+
 class LangGraphReActAgent:
     """
     LangGraph-based ReAct agent that uses our custom loop controller.
@@ -33,118 +136,160 @@ class LangGraphReActAgent:
     - Node 4 (answer): Provide final response
 
     Our custom ReActController handles the actual logic, LangGraph provides the structure.
+    The compiled graph is shared; persona and llm_call given to __init__ are only
+    defaults that run() can override per request.
     """
 
-    def __init__(self, llm_call, persona: str = "friendly_advisor", max_turns: int = 10):
+    def __init__(self, llm_call: Optional[Callable] = None, persona: str = "friendly_advisor",
+                 max_turns: int = 10, retriever=None, top_k: int = DEFAULT_TOP_K,
+                 response_cache=None, mode: str = "react", compactor=None):
         """
         Initialize the LangGraph ReAct agent.
 
         Args:
-            llm_call: Function to call LLM
-            persona: Persona name to use
+            llm_call: Default function to call the LLM (None: every run() passes one)
+            persona: Default persona name
             max_turns: Maximum reasoning iterations
+            retriever: Optional BM25Index; when set, only the top_k passages relevant
+                to each user message are put in the prompt instead of the full context
+            top_k: Number of passages to retrieve per message
+            response_cache: Optional ResponseCache serving repeated questions
+                that were answered without a tool
+            mode: "react" (text Action parsing; llm_call(messages) -> str),
+                "react_stream" (same format parsed from a stream that is cut at the
+                decided Action/Answer; llm_call(messages) -> iterator of text deltas) or
+                "function_calling" (native tool calls; llm_call(messages, tools) -> message dict)
+            compactor: Optional Compactor applied to the conversation before each LLM call
         """
+        if mode not in AGENT_MODES:
+            raise ValueError(f"Unknown agent mode: {mode}. Choose from: {list(AGENT_MODES)}")
         self.llm_call = llm_call
         self.persona = persona
         self.max_turns = max_turns
-        self.react_controller = ReActController(llm_call, max_turns)
-        self.graph = self._build_graph()
-
-    def _build_graph(self) -> StateGraph:
-        """
-        Build the LangGraph state machine.
-
-        Graph structure:
-        START → process_message → END
-
-        Note: We keep it simple since our ReActController handles the complex loop internally.
-        """
-        workflow = StateGraph(AgentState)
-
-        # Add single processing node that runs our custom ReAct loop
-        workflow.add_node("process_message", self._process_with_react_loop)
-
-        # Set entry point
-        workflow.set_entry_point("process_message")
-
-        # Always end after processing (our loop handles iterations internally)
-        workflow.add_edge("process_message", END)
-
-        return workflow.compile()
-
-    def _process_with_react_loop(self, state: AgentState) -> AgentState:
-        """
-        Process messages using our custom ReAct loop.
-
-        Args:
-            state: Current agent state
-
-        Returns:
-            Updated state with results
-        """
-        messages = state["messages"]
-
-        # Run our custom ReAct controller
-        final_answer, all_messages, metadata = self.react_controller.run(messages)
-
-        # Update state
-        return {
-            "messages": all_messages,
-            "persona": state["persona"],
-            "business_context": state.get("business_context", ""),
-            "final_answer": final_answer,
-            "metadata": metadata,
-            "iteration": state.get("iteration", 0) + 1
-        }
-
-    def run(self, user_message: str, business_context: str) -> Dict:
+        self.retriever = retriever
+        self.top_k = top_k
+        self.response_cache = response_cache
+        self.compactor = compactor
+        self.mode = mode
+        self.controller_class, self.prompt_mode = AGENT_MODES[mode]
+        self.react_controller = self._controller(llm_call) if llm_call is not None else None
+        self.graph = get_compiled_graph("react_loop")
+
+    def _controller(self, llm_call: Callable):
+        """Controllers are cheap: one is made per run whenever the llm_call differs."""
+        return self.controller_class(llm_call, self.max_turns, self.response_cache, self.compactor)
+
+    def run(self, user_message: str, business_context: str, persona: Optional[str] = None,
+            llm_call: Optional[Callable] = None, session_id: Optional[str] = None) -> Dict:
         """
         Run the agent on a user message.
 
         Args:
             user_message: User's input
             business_context: Business information to ground responses
+            persona: Persona for this request (defaults to the agent's)
+            llm_call: LLM call for this request (defaults to the agent's)
+            session_id: Conversation this message belongs to; repeated tool calls
+                are only skipped within one conversation (default: this run only)
 
         Returns:
             Dictionary with final_answer and metadata
         """
+        persona = persona or self.persona
+        if llm_call is not None:
+            controller = self._controller(llm_call)
+        elif self.react_controller is not None:
+            controller = self.react_controller
+        else:
+            raise ValueError("No llm_call: pass one to run() or to the agent")
+
+        # With retrieval on, the persona prompt stays a static prefix and the
+        # passages relevant to this message follow it in their own message
+        passages = None
+        if self.retriever is not None and self.top_k > 0:
+            passages = self.retriever.context_for(user_message, self.top_k)
+            business_context = RETRIEVED_CONTEXT_NOTE
+
         # Get persona prompt
-        system_prompt = get_persona_prompt(self.persona, business_context)
+        system_prompt = get_persona_prompt(persona, business_context, self.prompt_mode)
 
         # Initialize state
         initial_state = {
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            "persona": self.persona,
-            "business_context": business_context,
+            "messages": layout_messages(system_prompt, user_message, context=passages),
+            "persona": persona,
+            "business_context": passages or business_context,
             "final_answer": "",
             "metadata": {},
             "iteration": 0
         }
 
-        # Run the graph
-        result = self.graph.invoke(initial_state)
+        # Run the shared graph with this request's controller
+        result = self.graph.invoke(initial_state, config={"configurable": {"controller": controller,
+                                                                         "session_id": session_id}})
 
         return {
             "final_answer": result["final_answer"],
             "metadata": result["metadata"],
-            "persona": self.persona,
+            "persona": persona,
+            "mode": self.mode,
             "conversation": result["messages"]
         }
 
 
-def create_langgraph_agent(llm_call, persona: str = "friendly_advisor", max_turns: int = 10):
+class AgentPool:
+    """
+    Agents keyed by their structural settings, shared across callers.
+
+    Usage:
+        agent = AGENT_POOL.get(mode="react")
+        agent.run(message, context, persona="strict_expert", llm_call=llm_call)
+    """
+
+    def __init__(self):
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def get(self, mode: str = "react", max_turns: int = 10, retriever=None,
+            top_k: int = DEFAULT_TOP_K, response_cache=None, compactor=None) -> LangGraphReActAgent:
+        """Return the shared agent for these settings, creating it on first use."""
+        key = (mode, max_turns, id(retriever), top_k, id(response_cache), id(compactor))
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                agent = self._agents[key] = LangGraphReActAgent(
+                    None, max_turns=max_turns, retriever=retriever, top_k=top_k,
+                    response_cache=response_cache, mode=mode, compactor=compactor)
+            return agent
+
+    def clear(self) -> None:
+        with self._lock:
+            self._agents.clear()
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+
+# Process-wide pool
+AGENT_POOL = AgentPool()
+
+
+def create_langgraph_agent(llm_call=None, persona: str = "friendly_advisor", max_turns: int = 10,
+                           retriever=None, top_k: int = DEFAULT_TOP_K, response_cache=None,
+                           mode: str = "react", compactor=None):
     """
     Factory function to create a LangGraph ReAct agent.
 
     Args:
-        llm_call: Function to call LLM
-        persona: Persona to use
+        llm_call: Default function to call LLM (run() can pass another)
+        persona: Default persona (run() can pass another)
         max_turns: Max reasoning turns
+        retriever: Optional BM25Index for per-message passage retrieval
+        top_k: Passages to retrieve per message
+        response_cache: Optional ResponseCache for repeated questions
+        mode: "react", "react_stream" or "function_calling" controller backend
+        compactor: Optional Compactor for long conversations
 
     Returns:
         LangGraphReActAgent instance
     """
-    return LangGraphReActAgent(llm_call, persona, max_turns)
+    return LangGraphReActAgent(llm_call, persona, max_turns, retriever, top_k, response_cache, mode, compactor)
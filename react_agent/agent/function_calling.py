@@ -0,0 +1,109 @@
+"""
+Function-Calling Controller
+Alternate backend for ReActController that uses the model's native tool calls
+instead of parsing "Action: tool_name({...})" text.
+
+The model gets the registry's JSON schema and answers either with text (the
+final answer) or with one or more structured tool calls, all of which are run
+in the same turn. There is no regex parsing, and no extra turn per tool just to
+print an Action. The run() contract (final_answer, conversation, metadata) and
+the metadata keys are the same as the text ReAct loop's.
+
+The llm_call for this backend takes (messages, tools) and returns the assistant
+message as a dict in chat-completions format:
+    {"role": "assistant", "content": str | None,
+     "tool_calls": [{"id": ..., "type": "function",
+                     "function": {"name": ..., "arguments": "<json>"}}]}
+"""
+
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .react_loop import ReActController
+from .tools import REGISTRY
+from .tracing import TRACER
+
+
+class FunctionCallingController(ReActController):
+    """
+    Tool loop driven by structured tool calls:
+    1. LLM answers or requests tool calls (possibly several at once)
+    2. Every requested tool runs; results go back as tool messages
+    3. LLM answers using the results
+    """
+
+    def __init__(self, llm_call: Callable, max_turns: int = 10, response_cache=None, compactor=None, tools=None):
+        """
+        Initialize the controller.
+
+        Args:
+            llm_call: Function (messages, tools) -> assistant message dict
+            max_turns: Maximum number of model turns
+            response_cache: Optional ResponseCache (same rules as the ReAct loop)
+            compactor: Optional Compactor (same rules as the ReAct loop)
+            tools: Function-calling schema (defaults to the shared registry's)
+        """
+        super().__init__(llm_call, max_turns, response_cache, compactor)
+        self.tools = tools if tools is not None else REGISTRY.openai_tools
+
+    def _run_loop(self, conversation: List[Dict], metadata: Dict) -> Tuple[str, List[Dict], Dict]:
+        for turn in range(self.max_turns):
+            metadata["turns"] = turn + 1
+
+            self._compact(conversation)
+            with TRACER.span("llm_call", turn=turn + 1):
+                message = self.llm_call(conversation, self.tools)
+            tool_calls = message.get("tool_calls") or []
+            conversation.append(message)
+
+            if not tool_calls:
+                metadata["stopped_reason"] = "answer_found"
+                return message.get("content") or "", conversation, metadata
+
+            # All calls requested in this turn run before the model is asked again
+            for call in tool_calls:
+                tool_name = call["function"]["name"]
+                tool_args, observation = self._run_tool_call(tool_name, call["function"].get("arguments"),
+                                                             metadata["session_id"])
+
+                metadata["actions_taken"].append({
+                    "turn": turn + 1,
+                    "tool": tool_name,
+                    "args": tool_args,
+                    "result": observation
+                })
+                conversation.append({
+                    "role": "tool",
+                    "tool_call_id": call["id"],
+                    "content": json.dumps(observation)
+                })
+
+        # Max turns reached while the model was still calling tools
+        metadata["stopped_reason"] = "max_turns_exceeded"
+        final_answer = "I apologize, but I need more information to help you properly. Could you please rephrase your question?"
+        return final_answer, conversation, metadata
+
+    def _run_tool_call(self, tool_name: str, arguments: str, session_id: Optional[str] = None) -> Tuple[Dict, Dict]:
+        """Decode the model's JSON arguments and dispatch; malformed JSON becomes an error observation."""
+        try:
+            tool_args = json.loads(arguments or "{}")
+        except json.JSONDecodeError as e:
+            return {}, {"status": "error", "message": f"Invalid JSON arguments for {tool_name}: {e}"}
+        return tool_args, self._execute_tool(tool_name, tool_args, session_id)
+
+
+def create_function_calling_controller(llm_call: Callable, max_turns: int = 10,
+                                       response_cache=None, compactor=None) -> FunctionCallingController:
+    """
+    Factory function to create a FunctionCallingController.
+
+    Args:
+        llm_call: Function (messages, tools) -> assistant message dict
+        max_turns: Maximum model turns
+        response_cache: Optional ResponseCache for repeated questions
+        compactor: Optional Compactor for long conversations
+
+    Returns:
+        FunctionCallingController instance
+    """
+    return FunctionCallingController(llm_call, max_turns, response_cache, compactor)
@@ -0,0 +1,192 @@
+"""
+Idempotent Tool Execution
+Skips repeated side effects (the same feedback logged twice, the same customer
+captured as a lead again) caused by retries, regenerated replies and the app's
+detect_feedback fallback.
+
+Every call of a tool with side effects gets a key: a BLAKE2b digest of the tool
+name, the session id and the tool's key arguments, normalized to lowercase with
+punctuation and extra whitespace dropped, so "Do you have gluten-free sourdough
+daily?" and "do you have gluten free sourdough daily" collide. Every word is
+kept: "The bread was not good" is not a repeat of "The bread was good".
+Calls without a session id are never deduplicated.
+Keys live in a hash map (insertion ordered, so expiry pops from the front)
+for `window` seconds (FLEUR_IDEMPOTENCY_WINDOW, default 3600; 0 disables):
+a duplicate is found with one dict lookup and gets the first call's result
+back, marked "duplicate": true, without running the tool.
+
+The index is backed by its own JSONL log (logs/idempotency.jsonl, one line per
+committed key, written through the buffered log writer) and reloaded from it on
+first use, so a restarted worker still recognizes the last window's calls.
+Loading skips expired lines without parsing them and, if there were any,
+rewrites the log with only the live window, so it does not grow forever.
+Skipped calls are counted in METRICS as tools.duplicates_skipped.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence
+
+from .metrics import METRICS
+from .logwriter import append_record, get_writer
+
+DEFAULT_WINDOW = float(os.getenv("FLEUR_IDEMPOTENCY_WINDOW", "3600"))
+DEFAULT_MAX_KEYS = int(os.getenv("FLEUR_IDEMPOTENCY_MAX_KEYS", "100000"))
+
+# Returned to a duplicate of a call that is still running
+IN_PROGRESS_RESULT = {"status": "success", "message": "This request is already being processed."}
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+# The "at" field of a log line ("ts" comes first, the result after it)
+_AT = re.compile(r'"at": (-?[0-9.eE+-]+)')
+
+
+def normalize_value(value) -> str:
+    """Argument value as compared for idempotency (lowercase, punctuation and extra whitespace dropped)."""
+    return " ".join(_PUNCTUATION.sub(" ", str(value or "").lower()).split())
+
+
+def idempotency_key(tool_name: str, args: Dict, session_id: Optional[str] = None,
+                    fields: Optional[Sequence[str]] = None) -> str:
+    """
+    Key of one tool call.
+
+    Args:
+        tool_name: Tool being called
+        args: Validated keyword arguments
+        session_id: Conversation the call belongs to (None: shared by all callers)
+        fields: Arguments that identify the side effect (default: all of them)
+    """
+    names = sorted(args) if fields is None else sorted(fields)
+    payload = [tool_name, session_id or ""] + [[name, normalize_value(args.get(name))] for name in names]
+    canonical = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class IdempotencyIndex:
+    """
+    Thread-safe set of recent call keys with their results.
+
+    Args:
+        window: Seconds a key is remembered (0 disables deduplication)
+        log_path: JSONL file keys are appended to and reloaded from (None: memory only)
+        max_keys: Keys kept at most (oldest dropped first)
+        clock: Time source
+        metrics: Registry for the duplicate counter
+    """
+
+    def __init__(self, window: float = DEFAULT_WINDOW, log_path: Optional[Path] = None,
+                 max_keys: int = DEFAULT_MAX_KEYS, clock: Callable[[], float] = time.time,
+                 metrics=METRICS):
+        self.window = window
+        self.log_path = Path(log_path) if log_path else None
+        self.max_keys = max_keys
+        self.clock = clock
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        # key -> (timestamp, result or None while the call runs)
+        self._keys: "OrderedDict[str, tuple]" = OrderedDict()
+        self._loaded = self.log_path is None
+
+    def _load(self) -> None:
+        """Reload the keys of the current window from the log and drop the rest from it (under the lock)."""
+        self._loaded = True
+        if not self.log_path.exists():
+            return
+        horizon = self.clock() - self.window
+        live, expired = [], 0
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                match = _AT.search(line)
+                if match and float(match.group(1)) < horizon:
+                    expired += 1  # skipped without parsing the result
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    expired += 1  # a line cut off by a crash
+                    continue
+                if record.get("at", 0) < horizon:
+                    expired += 1
+                    continue
+                live.append(line)
+                self._keys[record["key"]] = (record["at"], record.get("result"))
+                self._keys.move_to_end(record["key"])
+        if expired:
+            self._rewrite(live)
+
+    def _rewrite(self, lines) -> None:
+        """Replace the log with `lines` (the writer reopens the new file on its next write)."""
+        get_writer(self.log_path).close()
+        tmp = self.log_path.with_name(self.log_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp, self.log_path)
+
+    def _expire(self, now: float) -> None:
+        horizon = now - self.window
+        while self._keys:
+            key, (at, _) = next(iter(self._keys.items()))
+            if at >= horizon and len(self._keys) <= self.max_keys:
+                break
+            self._keys.popitem(last=False)
+
+    def claim(self, key: str) -> Optional[Dict]:
+        """
+        Reserve `key` for a call about to run.
+
+        Returns:
+            None if the call should run (the key was new), else the result to
+            return for the duplicate
+        """
+        if self.window <= 0:
+            return None
+        now = self.clock()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._expire(now)
+            entry = self._keys.get(key)
+            if entry is None:
+                self._keys[key] = (now, None)
+                return None
+        self.metrics.increment("tools.duplicates_skipped")
+        return dict(entry[1] or IN_PROGRESS_RESULT, duplicate=True)
+
+    def commit(self, key: str, tool_name: str, result: Dict) -> None:
+        """Remember the result of a call that ran (and persist the key)."""
+        if self.window <= 0:
+            return
+        now = self.clock()
+        with self._lock:
+            self._keys[key] = (now, result)
+            self._keys.move_to_end(key)
+        if self.log_path is not None:
+            append_record(self.log_path, {
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "at": now,
+                "key": key,
+                "tool": tool_name,
+                "result": result,
+            })
+
+    def release(self, key: str) -> None:
+        """Forget a claimed key whose call failed, so a retry runs again."""
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
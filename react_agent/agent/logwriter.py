@@ -0,0 +1,207 @@
+"""
+Buffered JSONL Log Writer
+Shared by the tool functions in app.py and tools.py so that logging an event does
+not cost an open/mkdir/close per call and concurrent writers never interleave.
+
+One writer per file keeps its handle open. Records are serialized by the caller,
+queued under the writer's lock, and written according to the durability mode:
+
+    "record"  write and flush every record (visible to readers immediately)
+    "group"   group commit: buffer and flush when `max_batch` records are queued
+              or the oldest has waited `max_delay` seconds (default)
+    "fsync"   write, flush and fsync every record (survives a power loss)
+
+Defaults come from FLEUR_LOG_DURABILITY, FLEUR_LOG_MAX_BATCH and
+FLEUR_LOG_MAX_DELAY. Everything still queued is flushed at interpreter exit.
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .metrics import METRICS
+
+_log = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("record", "group", "fsync")
+
+DEFAULT_DURABILITY = os.getenv("FLEUR_LOG_DURABILITY", "group")
+DEFAULT_MAX_BATCH = int(os.getenv("FLEUR_LOG_MAX_BATCH", "64"))
+DEFAULT_MAX_DELAY = float(os.getenv("FLEUR_LOG_MAX_DELAY", "0.5"))
+
+
+class JsonlWriter:
+    """
+    Append-only JSONL writer for a single file.
+
+    Args:
+        path: File to append to (parent directories are created once)
+        durability: One of DURABILITY_MODES
+        max_batch: Group commit size threshold
+        max_delay: Group commit age threshold in seconds
+    """
+
+    def __init__(self, path: Path, durability: str = DEFAULT_DURABILITY,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_delay: float = DEFAULT_MAX_DELAY):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}. Choose from: {list(DURABILITY_MODES)}")
+
+        self.path = Path(path)
+        self.durability = durability
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._oldest = 0.0
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def write(self, record: Dict) -> None:
+        """Queue one record (serialized here, outside the lock)."""
+        self.write_line(json.dumps(record))
+
+    def write_line(self, line: str) -> None:
+        """Queue one already-serialized JSON line (without the trailing newline)."""
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(line + "\n")
+
+            if self.durability != "group" or len(self._buffer) >= self.max_batch:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        f = self._open()
+        f.write("".join(self._buffer))
+        f.flush()
+        if self.durability == "fsync":
+            os.fsync(f.fileno())
+        self._buffer.clear()
+
+    def flush(self) -> None:
+        """Write out everything queued."""
+        with self._lock:
+            self._flush_locked()
+
+    def flush_if_due(self, now: float) -> None:
+        """Flush if the oldest queued record has waited at least max_delay."""
+        with self._lock:
+            if self._buffer and now - self._oldest >= self.max_delay:
+                self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _WriterPool:
+    """Process-wide writers keyed by absolute path, plus the group-commit flusher."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._writers: Dict[str, JsonlWriter] = {}
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def get(self, path: Path, **options) -> JsonlWriter:
+        key = os.path.abspath(path)
+        writer = self._writers.get(key)
+        if writer is not None:
+            return writer
+
+        with self._lock:
+            writer = self._writers.get(key)
+            if writer is None:
+                writer = self._writers[key] = JsonlWriter(Path(key), **options)
+                if writer.durability == "group":
+                    self._start_flusher()
+        return writer
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None:
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(target=self._run_flusher, args=(self._stop,),
+                                             name="jsonl-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            writers = self.writers()
+            interval = min((w.max_delay for w in writers), default=DEFAULT_MAX_DELAY)
+            stop.wait(max(interval / 2, 0.01))
+            now = time.monotonic()
+            for writer in writers:
+                try:
+                    writer.flush_if_due(now)
+                except OSError as e:
+                    # Records stay buffered; retry after another max_delay, keep flushing the other files
+                    writer._oldest = now
+                    METRICS.increment("logwriter.write_errors")
+                    _log.warning("JSONL log %s not flushed (%s); retrying on the next pass", writer.path, e)
+
+    def writers(self) -> List[JsonlWriter]:
+        with self._lock:
+            return list(self._writers.values())
+
+    def flush_all(self) -> None:
+        for writer in self.writers():
+            writer.flush()
+
+    def close_all(self) -> None:
+        with self._lock:
+            self._stop.set()
+            self._flusher = None
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+
+
+_POOL = _WriterPool()
+atexit.register(_POOL.close_all)
+
+
+def get_writer(path: Path, durability: Optional[str] = None,
+               max_batch: Optional[int] = None, max_delay: Optional[float] = None) -> JsonlWriter:
+    """
+    Get the shared writer for `path`, creating it on first use.
+    Options only apply when the writer is created.
+    """
+    options = {}
+    if durability is not None:
+        options["durability"] = durability
+    if max_batch is not None:
+        options["max_batch"] = max_batch
+    if max_delay is not None:
+        options["max_delay"] = max_delay
+    return _POOL.get(path, **options)
+
+
+def append_record(path: Path, record: Dict) -> None:
+    """Append one JSON record to the JSONL file at `path` via its shared writer."""
+    _POOL.get(path).write(record)
+
+
+def flush_all() -> None:
+    """Flush every writer (e.g. before reading the log files in the same process)."""
+    _POOL.flush_all()
+
+
+def close_all() -> None:
+    """Flush and close every writer."""
+    _POOL.close_all()
@@ -0,0 +1,128 @@
+"""
+In-Process Metrics
+Thread-safe counters and latency observations shared by app.py and the ReAct agent.
+
+Observations keep count/sum/min/max plus a bounded sample window for percentiles,
+so recording is O(1) and memory stays flat however long the process runs.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Most recent observations kept per metric for percentile estimates
+DEFAULT_WINDOW = 1024
+
+_PROMETHEUS_INVALID = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _prometheus_name(name: str) -> str:
+    """Metric name with the characters Prometheus does not allow ("." etc.) as "_"."""
+    return _PROMETHEUS_INVALID.sub("_", name)
+
+
+class _Observation:
+    __slots__ = ("count", "total", "minimum", "maximum", "window")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+        self.window = deque(maxlen=window)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.window.append(value)
+
+    def percentile(self, q: float) -> float:
+        values = sorted(self.window)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.minimum if self.count else 0.0,
+            "max": self.maximum if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+        }
+
+
+class MetricsRegistry:
+    """Named counters and observations."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self._window = window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._observations = {}
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        """Add `amount` to counter `name`."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one observation (e.g. a latency in seconds) for `name`."""
+        with self._lock:
+            observation = self._observations.get(name)
+            if observation is None:
+                observation = self._observations[name] = _Observation(self._window)
+            observation.add(value)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def summary(self, name: str) -> Optional[Dict[str, float]]:
+        with self._lock:
+            observation = self._observations.get(name)
+            return observation.summary() if observation else None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """All counters and observation summaries."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "observations": {name: obs.summary() for name, obs in self._observations.items()},
+            }
+
+    def to_prometheus(self, prefix: str = "fleur") -> str:
+        """
+        Counters and observations in the Prometheus text exposition format:
+        counters as <prefix>_<name>_total, observations as summaries (p50/p95
+        over the sample window, plus _sum and _count).
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{prefix}_{_prometheus_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, summary in sorted(snapshot["observations"].items()):
+            metric = f"{prefix}_{_prometheus_name(name)}"
+            lines += [
+                f"# TYPE {metric} summary",
+                f'{metric}{{quantile="0.5"}} {summary["p50"]}',
+                f'{metric}{{quantile="0.95"}} {summary["p95"]}',
+                f"{metric}_sum {summary['sum']}",
+                f"{metric}_count {summary['count']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+
+# Process-wide registry
+METRICS = MetricsRegistry()
@@ -3,34 +3,111 @@ Personas for Fleur de Pain ReAct Agent
 Defines different agent personalities with distinct voices and behaviors
 """
 
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
 from .tools import get_tool_descriptions
+from .snapshot import on_snapshot_change
+
+# Rendered prompts kept per (persona, business context); retrieval produces a
+# different context per message, so the cache is bounded
+PROMPT_CACHE_SIZE = 64
 
 
-def get_persona_prompt(persona_name: str, business_context: str) -> str:
+class PromptCache:
+    """
+    Bounded LRU of rendered persona prompts keyed by (persona, context hash).
+
+    The context string is stored with each entry and compared on a hit, so a
+    hash collision can never return another context's prompt.
+    """
+
+    def __init__(self, maxsize: int = PROMPT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, persona_name: str, business_context: str, build: Callable[[str], str]) -> str:
+        # str hashes are cached on the object, so repeat calls with the same context are O(1)
+        key = (persona_name, hash(business_context))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == business_context:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        prompt = build(business_context)
+
+        with self._lock:
+            self._entries[key] = (business_context, prompt)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return prompt
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_PROMPT_CACHE = PromptCache()
+
+# Documents changed on disk: drop prompts rendered from the old text
+on_snapshot_change(lambda snapshot_key: _PROMPT_CACHE.clear())
+
+
+def get_persona_prompt(persona_name: str, business_context: str, mode: str = "react") -> str:
     """
     Get the system prompt for a specific persona.
 
+    Only the requested persona is rendered, and the result is memoized per
+    (persona, mode, business context) in a bounded LRU.
+
     Args:
         persona_name: Name of the persona ("friendly_advisor" or "strict_expert")
         business_context: Business information from PDF and text files
+        mode: "react" (text Thought/Action/Answer format) or "function_calling"
+            (tools are passed as a schema, so the prompt only sets voice and policy)
 
     Returns:
         str: Complete system prompt for the persona
     """
-    personas = {
-        "friendly_advisor": get_friendly_advisor_prompt(business_context),
-        "strict_expert": get_strict_expert_prompt(business_context)
-    }
+    builders = PROMPT_MODES.get(mode)
+    if builders is None:
+        raise ValueError(f"Unknown prompt mode: {mode}. Choose from: {list(PROMPT_MODES)}")
+    builder = builders.get(persona_name)
+    if builder is None:
+        raise ValueError(f"Unknown persona: {persona_name}. Choose from: {list(PERSONA_BUILDERS.keys())}")
 
-    if persona_name not in personas:
-        raise ValueError(f"Unknown persona: {persona_name}. Choose from: {list(personas.keys())}")
+    cache_name = persona_name if mode == "react" else f"{persona_name}:{mode}"
+    return _PROMPT_CACHE.get(cache_name, business_context, builder)
 
-    return personas[persona_name]
 
+def clear_persona_prompt_cache() -> None:
+    """Drop every memoized persona prompt."""
+    _PROMPT_CACHE.clear()
 
-def get_friendly_advisor_prompt(business_context: str) -> str:
-    """Friendly, warm, encouraging persona."""
-    return f"""You are a Friendly Advisor for Fleur de Pain bakery.
+
+def persona_prompt_cache_info() -> Dict[str, int]:
+    """Hit/miss counters and current size of the persona prompt cache."""
+    return {
+        "hits": _PROMPT_CACHE.hits,
+        "misses": _PROMPT_CACHE.misses,
+        "size": len(_PROMPT_CACHE),
+        "maxsize": _PROMPT_CACHE.maxsize,
+    }
+
+
+# Voice and policies shared by each persona's ReAct and function-calling prompts
+FRIENDLY_ADVISOR_PROFILE = """You are a Friendly Advisor for Fleur de Pain bakery.
 
 VOICE & STYLE:
 - Warm, encouraging, and helpful
@@ -45,7 +122,29 @@ CORE POLICIES (ALWAYS ENFORCE):
 4. Delivery available with 2-hour windows (when available)
 5. NEVER invent prices or availability - use business documents or ask for details
 
-YOUR REASONING PROCESS (ReAct Format):
+"""
+
+STRICT_EXPERT_PROFILE = """You are a Strict Expert for Fleur de Pain bakery.
+
+VOICE & STYLE:
+- Precise and policy-focused
+- Minimal wording - no fluff
+- Facts over feelings
+- Enforce rules strictly
+
+CORE POLICIES (NON-NEGOTIABLE):
+1. Fresh batches every 3 hours
+2. Custom cakes: 24-hour notice required
+3. Pre-orders: WhatsApp only
+4. Delivery: 2-hour windows
+5. NO invented prices or availability
+
+"""
+
+
+def get_friendly_advisor_prompt(business_context: str) -> str:
+    """Friendly, warm, encouraging persona."""
+    return f"""{FRIENDLY_ADVISOR_PROFILE}YOUR REASONING PROCESS (ReAct Format):
 You MUST follow this exact format:
 
 OPTION 1 - If you can answer directly (no tool needed):
@@ -90,22 +189,7 @@ Remember: Think first, act if needed, observe results, then answer. Always be wa
 
 def get_strict_expert_prompt(business_context: str) -> str:
     """Precise, policy-first, minimal wording persona."""
-    return f"""You are a Strict Expert for Fleur de Pain bakery.
-
-VOICE & STYLE:
-- Precise and policy-focused
-- Minimal wording - no fluff
-- Facts over feelings
-- Enforce rules strictly
-
-CORE POLICIES (NON-NEGOTIABLE):
-1. Fresh batches every 3 hours
-2. Custom cakes: 24-hour notice required
-3. Pre-orders: WhatsApp only
-4. Delivery: 2-hour windows
-5. NO invented prices or availability
-
-YOUR REASONING PROCESS (ReAct Format):
+    return f"""{STRICT_EXPERT_PROFILE}YOUR REASONING PROCESS (ReAct Format):
 Follow this exact format:
 
 OPTION 1 - Direct answer (no tool):
@@ -148,8 +232,58 @@ Execute: Think, Act if required, Observe, Answer. Maintain precision.
 """
 
 
+def get_friendly_advisor_tools_prompt(business_context: str) -> str:
+    """Friendly Advisor for native function calling (tools come from the schema)."""
+    return f"""{FRIENDLY_ADVISOR_PROFILE}HOW TO RESPOND:
+- Answer directly from the business information when you can.
+- Call record_feedback for any opinion, experience, suggestion, or question the
+  business information does not answer.
+- Use record_customer_interest, schedule_pickup or create_cake_order when the
+  customer gives the details for them.
+- If several tools apply, call them all in the same turn.
+- After the tool results come back, reply to the customer in your own voice.
+
+BUSINESS INFORMATION:
+{business_context}
+
+Remember: Be warm and helpful, and never invent details!
+"""
+
+
+def get_strict_expert_tools_prompt(business_context: str) -> str:
+    """Strict Expert for native function calling (tools come from the schema)."""
+    return f"""{STRICT_EXPERT_PROFILE}RESPONSE RULES:
+- Answer from business information only.
+- Unknown question, opinion or suggestion: call record_feedback.
+- Lead, pickup or cake order details given: call the matching tool.
+- Multiple tools apply: call all of them in one turn.
+- After tool results: reply to the customer.
+
+BUSINESS INFORMATION:
+{business_context}
+
+Execute: Answer or call tools. Maintain precision.
+"""
+
+
+# Prompt builders by persona name (rendered lazily, one persona at a time)
+PERSONA_BUILDERS = {
+    "friendly_advisor": get_friendly_advisor_prompt,
+    "strict_expert": get_strict_expert_prompt,
+}
+
+FUNCTION_CALLING_BUILDERS = {
+    "friendly_advisor": get_friendly_advisor_tools_prompt,
+    "strict_expert": get_strict_expert_tools_prompt,
+}
+
+PROMPT_MODES = {
+    "react": PERSONA_BUILDERS,
+    "function_calling": FUNCTION_CALLING_BUILDERS,
+}
+
 # List of all available personas
-AVAILABLE_PERSONAS = ["friendly_advisor", "strict_expert"]
+AVAILABLE_PERSONAS = list(PERSONA_BUILDERS)
 
 
 def list_personas() -> list:
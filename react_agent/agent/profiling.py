@@ -0,0 +1,363 @@
+"""
+Request Profiling
+Opt-in CPU profiling of the agent hot path, to see what is left on our side
+once the LLM time is taken out: regex parsing, JSON serialization, prompt
+formatting, token counting, PDF extraction.
+
+Entry points are wrapped with PROFILER.request(name): app.py's chat handlers,
+ReActController.run and ToolRegistry.dispatch. Nested entries (a tool inside
+a turn) belong to the outermost one, which counts as a request; nesting is
+tracked per asyncio task (a ContextVar), so concurrent turns on one event loop
+count separately. Every
+`window` requests the profiler writes a report to `output_dir` and starts a
+new window:
+
+    profile-<time>.collapsed   folded stacks ("a;b;c <samples>"), the input of
+                               flamegraph.pl / speedscope (sample mode)
+    profile-<time>.pstats      the merged cProfile stats (cprofile mode)
+    profile-<time>.txt         top self-time hotspots and time per category
+
+Two modes (FLEUR_PROFILE_MODE):
+  - sample (default): a thread takes the stacks of the threads inside a
+    request every FLEUR_PROFILE_INTERVAL seconds (default 0.005), with
+    sys._current_frames(). Overhead does not depend on call counts.
+  - cprofile: deterministic cProfile per request (exact call counts, slower
+    on call-heavy code), merged across threads.
+
+Samples and functions that are waiting on the network or a lock (socket, ssl,
+selectors, threading waits) are left out of the hotspots and stacks, and
+reported as one "waiting" total instead. A sample whose leaf is in the
+standard library (uuid, posixpath, ...) is charged to the category of its
+nearest categorized caller.
+
+Off unless FLEUR_PROFILE=<requests per window> (or --profile N on app.py and
+run_detailed_experiments.py); disabled, request() returns a shared no-op.
+Reports go to FLEUR_PROFILE_DIR (default logs/profiles).
+"""
+
+import os
+import sys
+import time
+import atexit
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PROFILE_MODES = ("sample", "cprofile")
+
+DEFAULT_WINDOW = int(os.getenv("FLEUR_PROFILE", "0"))
+DEFAULT_MODE = os.getenv("FLEUR_PROFILE_MODE", "sample")
+DEFAULT_INTERVAL = float(os.getenv("FLEUR_PROFILE_INTERVAL", "0.005"))
+DEFAULT_OUTPUT_DIR = Path(os.getenv("FLEUR_PROFILE_DIR", "logs/profiles"))
+
+# Hotspots listed in the .txt report
+TOP_FUNCTIONS = 25
+
+# Leaf frames (sample mode, by file) and builtins (cprofile mode, by name)
+# where a thread is blocked rather than running our code
+# Outermost open request of the current asyncio task or thread
+_current: ContextVar = ContextVar("fleur_profile_request", default=None)
+
+WAIT_FILES = ("socket.py", "ssl.py", "selectors.py", "threading.py", "queue.py", "subprocess.py")
+# (the socket backends of httpcore and anyio, whatever the package is called)
+WAIT_PATH_PARTS = ("/_backends/", "asyncio/base_events.py")
+WAIT_BUILTINS = ("recv", "read' of '_ssl", "write' of '_ssl", "select", "poll", "sleep", "acquire",
+                 "connect", "getaddrinfo", "do_handshake", "sendall", "send'")
+
+# Category -> path fragments of the code it covers (first match wins)
+CATEGORIES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("regex", ("/re/", "/re.py", "sre_", "'re.Pattern'", "_sre")),
+    ("json", ("/json/", "_json")),
+    ("pdf extraction", ("PyPDF2", "pypdf")),
+    ("token counting", ("agent/tokens.py", "tiktoken")),
+    ("prompt formatting", ("agent/prompt_layout.py", "agent/personas.py", "agent/retrieval.py",
+                           "agent/compaction.py", "agent/sessions.py")),
+    ("feedback detection", ("agent/feedback.py",)),
+    ("logging and storage", ("agent/logwriter.py", "agent/store.py", "sqlite3")),
+    ("openai / http client", ("openai/", "httpx", "httpcore", "h11/", "pydantic", "anyio/")),
+    ("gradio", ("gradio/",)),
+    ("agent", ("react_agent/", "app.py")),
+]
+
+
+def categorize(location: str) -> str:
+    """Category of a function given its file path (or a builtin's description)."""
+    location = location.replace("\\", "/")
+    for category, parts in CATEGORIES:
+        if any(part in location for part in parts):
+            return category
+    return "other"
+
+
+def _is_wait_frame(filename: str) -> bool:
+    filename = filename.replace("\\", "/")
+    return os.path.basename(filename) in WAIT_FILES or any(part in filename for part in WAIT_PATH_PARTS)
+
+
+def _is_wait_builtin(func: Tuple[str, int, str]) -> bool:
+    filename, _, name = func
+    return filename == "~" and any(part in name for part in WAIT_BUILTINS)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class _NoopRequest:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_REQUEST = _NoopRequest()
+
+
+class _Request:
+    """Context manager marking the current task (or thread) as inside a profiled request."""
+
+    __slots__ = ("profiler", "name", "outermost", "thread_id", "started")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.outermost = False
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit(self)
+        return False
+
+
+class Profiler:
+    """
+    Windowed request profiler.
+
+    Args:
+        window: Requests per report (0 disables profiling)
+        mode: One of PROFILE_MODES
+        output_dir: Directory reports are written to
+        interval: Seconds between stack samples (sample mode)
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, mode: str = DEFAULT_MODE,
+                 output_dir: Path = DEFAULT_OUTPUT_DIR, interval: float = DEFAULT_INTERVAL):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # thread id -> open requests (one per task on an event loop thread)
+        self._active: Dict[int, int] = {}
+        self._sampler = None
+        self._stop = threading.Event()
+        self.reports: List[Path] = []
+        self.configure(window, mode, output_dir, interval)
+
+    def configure(self, window: Optional[int] = None, mode: Optional[str] = None,
+                  output_dir: Optional[Path] = None, interval: Optional[float] = None) -> "Profiler":
+        """Change the settings (starts a new window)."""
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}. Choose from: {list(PROFILE_MODES)}")
+        with self._lock:
+            if window is not None:
+                self.window = window
+            if mode is not None:
+                self.mode = mode
+            if output_dir is not None:
+                self.output_dir = Path(output_dir)
+            if interval is not None:
+                self.interval = interval
+            self._reset_window()
+        return self
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def _reset_window(self) -> None:
+        self._requests = 0
+        self._names: Counter = Counter()
+        self._samples: Counter = Counter()
+        self._wait_samples = 0
+        self._stats: Optional[pstats.Stats] = None
+        self._wall = 0.0
+
+    def request(self, name: str = "request"):
+        """Context manager profiling one request (no-op while disabled)."""
+        if self.window <= 0:
+            return _NOOP_REQUEST
+        return _Request(self, name)
+
+    def _enter(self, request: _Request) -> None:
+        if _current.get() is not None:
+            return  # nested in this task's request
+        _current.set(request)
+        request.outermost = True
+        request.thread_id = threading.get_ident()
+        request.started = time.perf_counter()
+        with self._lock:
+            running = self._active.get(request.thread_id, 0)
+            self._active[request.thread_id] = running + 1
+            if self.mode == "sample":
+                self._start_sampler()
+        # cProfile hooks the whole thread: one profile while any of its requests is open
+        if running == 0 and self.mode == "cprofile":
+            self._local.profile = cProfile.Profile()
+            self._local.profile.enable()
+
+    def _exit(self, request: _Request) -> None:
+        if not request.outermost:
+            return
+        # Restore directly (not via a reset token): an async generator may exit in another context
+        _current.set(None)
+        elapsed = time.perf_counter() - request.started
+        with self._lock:
+            running = self._active[request.thread_id] - 1
+            if running:
+                self._active[request.thread_id] = running
+            else:
+                del self._active[request.thread_id]
+
+        profile = None
+        if running == 0:
+            profile = getattr(self._local, "profile", None)
+            if profile is not None:
+                profile.disable()
+                self._local.profile = None
+
+        with self._lock:
+            if profile is not None:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            self._wall += elapsed
+            self._requests += 1
+            self._names[request.name] += 1
+            due = self._requests >= self.window
+        if due:
+            self.write_report()
+
+    def _start_sampler(self) -> None:
+        """Start the sampling thread (under the lock)."""
+        if self._sampler is None:
+            self._stop = threading.Event()
+            self._sampler = threading.Thread(target=self._run_sampler, args=(self._stop,),
+                                             name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def _run_sampler(self, stop: threading.Event) -> None:
+        own = threading.get_ident()
+        while not stop.wait(self.interval):
+            with self._lock:
+                threads = [thread_id for thread_id in self._active if thread_id != own]
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for thread_id in threads:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self._record_sample(frame)
+
+    def _record_sample(self, frame) -> None:
+        if _is_wait_frame(frame.f_code.co_filename):
+            with self._lock:
+                self._wait_samples += 1
+            return
+        stack = []
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        folded = ";".join(_frame_label(f) for f in reversed(stack))
+        # Standard library leaves (uuid, posixpath, ...) count for their nearest categorized caller
+        category = next((c for c in (categorize(f.f_code.co_filename) for f in stack) if c != "other"), "other")
+        with self._lock:
+            self._samples[(folded, category)] += 1
+
+    def write_report(self) -> Optional[Path]:
+        """Write the current window's reports and start a new window."""
+        with self._lock:
+            samples, wait_samples, stats = self._samples, self._wait_samples, self._stats
+            requests, wall, names = self._requests, self._wall, self._names
+            self._reset_window()
+        if not requests:
+            return None
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        if self.mode == "sample":
+            with open(base.with_suffix(".collapsed"), "w", encoding="utf-8") as f:
+                for (folded, _), count in samples.most_common():
+                    f.write(f"{folded} {count}\n")
+            hotspots, waiting = self._sample_hotspots(samples, wait_samples)
+        else:
+            stats.dump_stats(str(base.with_suffix(".pstats")))
+            hotspots, waiting = self._cprofile_hotspots(stats)
+
+        summary = base.with_suffix(".txt")
+        summary.write_text(self._render(requests, names, wall, hotspots, waiting), encoding="utf-8")
+        self.reports.append(summary)
+        return summary
+
+    def _sample_hotspots(self, samples: Counter, wait_samples: int) -> Tuple[List[Tuple], float]:
+        """(function, category, self seconds, calls) by leaf-frame samples."""
+        by_leaf: Counter = Counter()
+        for (folded, category), count in samples.items():
+            by_leaf[(folded.rsplit(";", 1)[-1], category)] += count
+        hotspots = [(leaf, category, count * self.interval, None) for (leaf, category), count in by_leaf.items()]
+        return hotspots, wait_samples * self.interval
+
+    def _cprofile_hotspots(self, stats: pstats.Stats) -> Tuple[List[Tuple], float]:
+        """(function, category, self seconds, calls) by cProfile tottime."""
+        hotspots, waiting = [], 0.0
+        for func, (_, calls, tottime, _, _) in stats.stats.items():
+            if _is_wait_builtin(func):
+                waiting += tottime
+                continue
+            filename, line, name = func
+            label = name if filename == "~" else f"{os.path.basename(filename)}:{line}({name})"
+            hotspots.append((label, categorize(f"{filename} {name}"), tottime, calls))
+        return hotspots, waiting
+
+    def _render(self, requests: int, names: Counter, wall: float, hotspots: List[Tuple], waiting: float) -> str:
+        cpu = sum(seconds for _, _, seconds, _ in hotspots)
+        lines = [
+            f"Profile ({self.mode}) of {requests} requests: {wall:.3f}s wall, "
+            f"{cpu:.3f}s on our side, {waiting:.3f}s waiting on network/locks (excluded)",
+            "Requests: " + ", ".join(f"{name} {count}" for name, count in names.most_common()),
+            "",
+            f"{'category':<24} {'seconds':>9} {'share':>7}",
+        ]
+        by_category: Counter = Counter()
+        for _, category, seconds, _ in hotspots:
+            by_category[category] += seconds
+        for category, seconds in by_category.most_common():
+            lines.append(f"{category:<24} {seconds:9.4f} {seconds / cpu if cpu else 0:7.1%}")
+
+        lines += ["", f"Top {TOP_FUNCTIONS} functions by self time", f"{'seconds':>9} {'calls':>9}  function"]
+        for label, category, seconds, calls in sorted(hotspots, key=lambda h: -h[2])[:TOP_FUNCTIONS]:
+            lines.append(f"{seconds:9.4f} {'' if calls is None else calls:>9}  {label}  [{category}]")
+        return "\n".join(lines) + "\n"
+
+    def close(self) -> None:
+        """Stop the sampler and write what the current window has."""
+        self._stop.set()
+        self._sampler = None
+        self.write_report()
+
+
+# Shared profiler for app.py, the controllers and the tool registry; the last,
+# partial window is written at exit
+PROFILER = Profiler()
+atexit.register(PROFILER.close)
+
@@ -0,0 +1,133 @@
+"""
+Prompt Prefix Layout
+Assembles chat messages so the provider's automatic prefix caching can reuse as
+much of every request as possible.
+
+Layout (most stable first):
+    1. system   static prefix: instructions, policies, tool descriptions and,
+                when retrieval is off, the full business documents
+    2. system   summary of older turns, when a session store has compacted them
+    3. ...      conversation history, each past turn preceded by the context it
+                was answered with (append-only, so a turn's request is a prefix
+                of the next turn's)
+    4. system   context for the current message (retrieved passages), if any
+    5. user     the current message
+
+The static prefix must be byte-identical across requests and processes: it is
+rendered once from fixed templates (no timestamps, ids or set/dict-order
+dependent content) and fingerprinted with `prefix_fingerprint`.
+"""
+
+import json
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .metrics import METRICS
+
+# Stands in for the business documents in the static prefix when retrieval is on
+RETRIEVED_CONTEXT_NOTE = (
+    "The business passages relevant to the customer's current message are provided "
+    "in a separate BUSINESS INFORMATION message right before it. Use only those passages."
+)
+
+CONTEXT_HEADER = "BUSINESS INFORMATION (passages relevant to this message):"
+
+SUMMARY_HEADER = "CONVERSATION SO FAR (summary of earlier turns):"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def context_message(context: str) -> Dict[str, str]:
+    """The volatile per-message context block."""
+    return {"role": "system", "content": f"{CONTEXT_HEADER}\n{context}"}
+
+
+def layout_messages(prefix: str, user_message: str,
+                    history: Optional[Sequence[Tuple[str, str]]] = None,
+                    context: Optional[str] = None,
+                    history_contexts: Optional[Sequence[Optional[str]]] = None,
+                    summary: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Build the message list for one request.
+
+    Args:
+        prefix: Static system prompt (identical for every request of this agent)
+        user_message: Current user message
+        history: Previous (user, assistant) turns
+        context: Context for this message (e.g. retrieved passages)
+        history_contexts: Context each previous turn was sent with, parallel to
+            `history` (must be reproduced exactly for the next request to reuse
+            the cached prefix)
+        summary: Summary of turns older than `history`, if they were compacted
+
+    Returns:
+        Messages ordered static -> summary -> history -> current context -> user
+    """
+    messages = [{"role": "system", "content": prefix}]
+    if summary:
+        messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{summary}"})
+    for i, (human, assistant) in enumerate(history or []):
+        if history_contexts and history_contexts[i]:
+            messages.append(context_message(history_contexts[i]))
+        messages.append({"role": "user", "content": human})
+        messages.append({"role": "assistant", "content": assistant})
+    if context:
+        messages.append(context_message(context))
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+
+def prefix_fingerprint(messages: Sequence[Dict], tools: Optional[List[Dict]] = None) -> str:
+    """
+    SHA-256 over the canonical serialization of the tools and messages.
+    Equal fingerprints mean the provider sees byte-identical prefixes.
+    """
+    payload = {"tools": tools or [], "messages": list(messages)}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _field(obj, name: str, default=None):
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def usage_counts(usage) -> Dict[str, int]:
+    """
+    Extract token counts from a completion's `usage` (SDK object or dict).
+
+    Returns:
+        {"prompt_tokens", "completion_tokens", "cached_tokens"}
+    """
+    details = _field(usage, "prompt_tokens_details")
+    return {
+        "prompt_tokens": _field(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": _field(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": _field(details, "cached_tokens", 0) or 0,
+    }
+
+
+def record_usage(usage, metrics=METRICS) -> Dict[str, int]:
+    """
+    Add a completion's token usage to the metrics registry:
+    counters llm.calls, llm.prompt_tokens, llm.completion_tokens, llm.cached_tokens.
+    """
+    counts = usage_counts(usage)
+    if usage is not None:
+        metrics.increment("llm.calls")
+        metrics.increment("llm.prompt_tokens", counts["prompt_tokens"])
+        metrics.increment("llm.completion_tokens", counts["completion_tokens"])
+        metrics.increment("llm.cached_tokens", counts["cached_tokens"])
+    return counts
+
+
+def cached_token_ratio(metrics=METRICS) -> float:
+    """Share of prompt tokens served from the provider's prefix cache so far."""
+    prompt_tokens = metrics.counter("llm.prompt_tokens")
+    return metrics.counter("llm.cached_tokens") / prompt_tokens if prompt_tokens else 0.0
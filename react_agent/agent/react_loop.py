@@ -5,8 +5,13 @@ Implements Thought → Action → Observation → Answer cycle without prebuilt
 
 import re
 import json
+import uuid
 from typing import List, Dict, Callable, Tuple, Optional
-from .tools import get_tool
+from .tools import REGISTRY
+from .metrics import METRICS
+from .tracing import TRACER
+from .profiling import PROFILER
+from .prompt_layout import prefix_fingerprint, estimate_tokens
 
 
 class ReActController:
@@ -18,56 +23,103 @@ class ReActController:
     4. Answer: LLM provides final response
     """
 
-    def __init__(self, llm_call: Callable, max_turns: int = 10):
+    def __init__(self, llm_call: Callable, max_turns: int = 10, response_cache=None, compactor=None):
         """
         Initialize the ReAct controller.
 
         Args:
             llm_call: Function that takes messages and returns LLM response text
             max_turns: Maximum number of reasoning turns to prevent infinite loops
+            response_cache: Optional ResponseCache; first-turn questions answered
+                without a tool are served from it on repeat
+            compactor: Optional Compactor; the conversation is compacted before
+                each LLM call once it crosses the compactor's token threshold
         """
         self.llm_call = llm_call
         self.max_turns = max_turns
+        self.response_cache = response_cache
+        self.compactor = compactor
 
-    def run(self, messages: List[Dict[str, str]]) -> Tuple[str, List[Dict[str, str]], Dict]:
+    def run(self, messages: List[Dict[str, str]], session_id: Optional[str] = None) -> Tuple[str, List[Dict[str, str]], Dict]:
         """
         Run the ReAct loop until we get a final Answer.
 
         Args:
             messages: List of message dicts with 'role' and 'content'
+            session_id: Conversation this run belongs to; repeated tool calls are
+                only skipped within it (default: a new id per run)
 
         Returns:
-            Tuple of (final_answer, all_messages, metadata)
+            Tuple of (final_answer, all_messages, metadata); with tracing on,
+            metadata["timings"] has the seconds spent per stage ("llm_call",
+            "tool", "compaction", "total")
         """
+        with TRACER.span("agent.run", controller=type(self).__name__) as trace, PROFILER.request("agent.run"):
+            final_answer, conversation, metadata = self._run(messages, session_id or f"run-{uuid.uuid4().hex}")
+            trace.set(turns=metadata["turns"], stopped_reason=metadata["stopped_reason"])
+        timings = trace.stage_timings()
+        if timings is not None:
+            metadata["timings"] = timings
+        return final_answer, conversation, metadata
+
+    def _run(self, messages: List[Dict[str, str]], session_id: str) -> Tuple[str, List[Dict[str, str]], Dict]:
         conversation = messages.copy()
         metadata = {
             "turns": 0,
             "actions_taken": [],
-            "stopped_reason": None
+            "stopped_reason": None,
+            "session_id": session_id
         }
 
+        # Repeated first-turn questions: the cache is keyed on the question plus
+        # everything before it (persona prompt, retrieved passages)
+        question, namespace = self._cache_key(messages)
+        if question is not None:
+            cached = self.response_cache.get(question, namespace)
+            if cached is not None:
+                conversation.append({"role": "assistant", "content": f"Answer: {cached}"})
+                metadata["stopped_reason"] = "answer_found"
+                metadata["cached"] = True
+                return cached, conversation, metadata
+
+        final_answer, conversation, metadata = self._run_loop(conversation, metadata)
+
+        if question is not None and metadata["stopped_reason"] == "answer_found":
+            self.response_cache.remember(question, final_answer, bool(metadata["actions_taken"]), namespace)
+        return final_answer, conversation, metadata
+
+    def _cache_key(self, messages: List[Dict[str, str]]) -> Tuple[Optional[str], str]:
+        """(question, namespace) when the response cache applies to this run, else (None, "")."""
+        if self.response_cache is None or not messages or messages[-1].get("role") != "user":
+            return None, ""
+        if any(m.get("role") == "assistant" for m in messages):
+            return None, ""
+        return messages[-1]["content"], prefix_fingerprint(messages[:-1])
+
+    def _run_loop(self, conversation: List[Dict[str, str]], metadata: Dict) -> Tuple[str, List[Dict[str, str]], Dict]:
+        """The Thought → Action → Observation → Answer loop itself."""
         for turn in range(self.max_turns):
             metadata["turns"] = turn + 1
 
-            # Call LLM
-            response_text = self.llm_call(conversation)
+            # Call LLM and parse its turn
+            self._compact(conversation)
+            with TRACER.span("llm_call", turn=turn + 1):
+                response_text, step = self._next_step(conversation)
 
             # Add LLM response to conversation
             conversation.append({"role": "assistant", "content": response_text})
 
             # Check if we have a final Answer
-            if self._has_final_answer(response_text):
-                final_answer = self._extract_answer(response_text)
+            if step is not None and step[0] == "answer":
                 metadata["stopped_reason"] = "answer_found"
-                return final_answer, conversation, metadata
+                return step[1], conversation, metadata
 
             # Check for Action
-            action_detected = self._detect_action(response_text)
-            if action_detected:
-                tool_name, tool_args, raw_action = action_detected
+            if step is not None:
+                _, tool_name, tool_args = step
 
                 # Execute the tool
-                observation = self._execute_tool(tool_name, tool_args)
+                observation = self._execute_tool(tool_name, tool_args, metadata["session_id"])
 
                 # Log the action
                 metadata["actions_taken"].append({
@@ -89,7 +141,9 @@ class ReActController:
                         "role": "user",
                         "content": "Please provide your final Answer to the customer."
                     })
-                    final_response = self.llm_call(conversation)
+                    self._compact(conversation)
+                    with TRACER.span("llm_call", turn=turn + 1):
+                        final_response = self._complete_text(conversation)
                     conversation.append({"role": "assistant", "content": final_response})
                     final_answer = self._extract_answer(final_response) or final_response
                     metadata["stopped_reason"] = "max_turns_reached"
@@ -100,6 +154,45 @@ class ReActController:
         final_answer = "I apologize, but I need more information to help you properly. Could you please rephrase your question?"
         return final_answer, conversation, metadata
 
+    def _compact(self, conversation: List[Dict]) -> None:
+        """Compact the conversation in place when it has grown past the threshold."""
+        if self.compactor is not None:
+            with TRACER.span("compaction"):
+                conversation[:] = self.compactor.compact(conversation)
+
+    def _complete_text(self, conversation: List[Dict[str, str]]) -> str:
+        """One full completion as text."""
+        return self.llm_call(conversation)
+
+    def _next_step(self, conversation: List[Dict[str, str]]) -> Tuple[str, Optional[Tuple]]:
+        """
+        Call the LLM once and parse its turn.
+
+        Returns:
+            (assistant_text, step) where step is ("answer", text),
+            ("action", tool_name, tool_args) or None
+        """
+        response_text = self._complete_text(conversation)
+
+        if self._has_final_answer(response_text):
+            answer = self._extract_answer(response_text)
+            # Everything after the answer's first paragraph is discarded
+            start = re.search(r'\bAnswer\s*:', response_text, re.IGNORECASE).end()
+            METRICS.observe("react.wasted_output_tokens",
+                            estimate_tokens(response_text[start:].strip()[len(answer):]))
+            return response_text, ("answer", answer)
+
+        action_detected = self._detect_action(response_text)
+        if action_detected:
+            tool_name, tool_args, raw_action = action_detected
+            # Anything after the Action call (e.g. an invented Observation) is discarded
+            end = response_text.find(raw_action) + len(raw_action)
+            METRICS.observe("react.wasted_output_tokens", estimate_tokens(response_text[end:]))
+            return response_text, ("action", tool_name, tool_args)
+
+        METRICS.observe("react.wasted_output_tokens", 0)
+        return response_text, None
+
     def _has_final_answer(self, text: str) -> bool:
         """Check if the text contains a final Answer."""
         # Look for "Answer:" marker
@@ -142,50 +235,34 @@ class ReActController:
 
         return None
 
-    def _execute_tool(self, tool_name: str, tool_args: Dict) -> Dict:
+    def _execute_tool(self, tool_name: str, tool_args: Dict, session_id: Optional[str] = None) -> Dict:
         """
         Execute a tool and return the result.
 
         Args:
             tool_name: Name of the tool to execute
             tool_args: Dictionary of arguments for the tool
+            session_id: Conversation the call belongs to (scope of duplicate detection)
 
         Returns:
             Dictionary with result or error
         """
-        tool_func = get_tool(tool_name)
-
-        if not tool_func:
-            return {
-                "status": "error",
-                "message": f"Unknown tool: {tool_name}. Available tools: record_customer_interest, record_feedback"
-            }
-
-        try:
-            # Call the tool function
-            result = tool_func(**tool_args)
-            return result
-        except TypeError as e:
-            return {
-                "status": "error",
-                "message": f"Invalid arguments for {tool_name}: {str(e)}"
-            }
-        except Exception as e:
-            return {
-                "status": "error",
-                "message": f"Tool execution error: {str(e)}"
-            }
-
-
-def create_react_controller(llm_call: Callable, max_turns: int = 10) -> ReActController:
+        # Registry lookup + precompiled argument validation; errors come back as dicts
+        return REGISTRY.dispatch(tool_name, tool_args, session_id=session_id)
+
+
+def create_react_controller(llm_call: Callable, max_turns: int = 10,
+                            response_cache=None, compactor=None) -> ReActController:
     """
     Factory function to create a ReActController.
 
     Args:
         llm_call: Function that takes messages and returns LLM response
         max_turns: Maximum reasoning turns
+        response_cache: Optional ResponseCache for repeated questions
+        compactor: Optional Compactor for long conversations
 
     Returns:
         ReActController instance
     """
-    return ReActController(llm_call, max_turns)
+    return ReActController(llm_call, max_turns, response_cache, compactor)
@@ -0,0 +1,297 @@
+"""
+Tool Registry
+One declaration per tool produces everything the agents need:
+  - the OpenAI function-calling `tools` schema (app.py)
+  - the ReAct prompt tool descriptions (personas.py)
+  - the argument validator used before every call (both)
+  - optionally, a confirmation template the reply after a successful call is
+    rendered from, instead of asking the model for it (app.py)
+
+The schema, descriptions and validators are built when the tools are registered at import, so dispatching a
+call is a dict lookup plus a precompiled validation pass.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .idempotency import IdempotencyIndex, idempotency_key
+from .tracing import TRACER
+from .profiling import PROFILER
+
+
+class ToolError(Exception):
+    """Raised when a tool call cannot be dispatched (unknown tool or bad arguments)."""
+
+
+class Param:
+    """
+    A tool parameter.
+
+    Args:
+        name: Parameter name (as passed to the Python function)
+        description: Shown to the model in both the schema and the ReAct prompt
+        required: Whether the call must include it
+        default: Value used when an optional parameter is omitted
+        aliases: Alternative names accepted from the model (e.g. "feedback" for "question")
+    """
+
+    def __init__(self, name: str, description: str, required: bool = True,
+                 default: Any = None, aliases: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.required = required
+        self.default = default
+        self.aliases = tuple(aliases)
+
+
+class ToolSpec:
+    """
+    Declaration of a single tool.
+
+    Args:
+        func: Python function implementing the tool
+        description: Function-calling description (what the model reads in the schema)
+        purpose: One-line purpose for the ReAct prompt
+        when_to_use: When the ReAct agent should call it
+        returns: What the observation contains
+        params: Ordered parameter declarations (all strings)
+        example: Example arguments used in the ReAct prompt
+        confirmation: Reply to the customer after a successful call, rendered
+            locally from the call's arguments and the result's fields (e.g.
+            "{message}"), so no second completion is needed; None if the model
+            has to write the reply
+        idempotency_fields: Arguments that identify the call's side effect for
+            deduplication (default: all of them)
+    """
+
+    def __init__(self, func: Callable, description: str, purpose: str, when_to_use: str,
+                 returns: str, params: List[Param], example: Dict[str, str],
+                 confirmation: Optional[str] = None, idempotency_fields: Optional[Sequence[str]] = None):
+        self.func = func
+        self.name = func.__name__
+        self.description = description
+        self.purpose = purpose
+        self.when_to_use = when_to_use
+        self.returns = returns
+        self.params = params
+        self.example = example
+        self.confirmation = confirmation
+        self.idempotency_fields = tuple(idempotency_fields) if idempotency_fields is not None else None
+
+        # Precompiled validation tables
+        self._accepted = {}
+        for param in params:
+            self._accepted[param.name] = param
+            for alias in param.aliases:
+                self._accepted[alias] = param
+        self._names = frozenset(p.name for p in params)
+        self._required = tuple(p.name for p in params if p.required)
+        self._defaults = {p.name: p.default for p in params if not p.required}
+
+    def schema(self) -> Dict:
+        """OpenAI function-calling schema entry."""
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        p.name: {"type": "string", "description": p.description}
+                        for p in self.params
+                    },
+                    "required": list(self._required),
+                },
+            },
+        }
+
+    def render_confirmation(self, args: Dict, result: Dict) -> Optional[str]:
+        """
+        The locally rendered reply for a finished call, or None when the model
+        must write it (no template, the call failed, or a field is missing).
+        """
+        if self.confirmation is None or not isinstance(result, dict) or result.get("status") != "success":
+            return None
+        try:
+            return self.confirmation.format(**{**self.validate(args), **result})
+        except (ToolError, KeyError, IndexError):
+            return None
+
+    def react_description(self, number: int) -> str:
+        """Numbered block for the ReAct prompt's tool list."""
+        lines = [
+            f"{number}. {self.name}({', '.join(p.name for p in self.params)})",
+            f"   - Purpose: {self.purpose}",
+            f"   - When to use: {self.when_to_use}",
+            "   - Parameters:",
+        ]
+        for p in self.params:
+            kind = "str" if p.required else "str, optional"
+            lines.append(f"     * {p.name} ({kind}): {p.description}")
+        lines.append(f"   - Returns: {self.returns}")
+        return "\n".join(lines)
+
+    def validate(self, args: Dict) -> Dict:
+        """
+        Map model-supplied arguments onto the function's keyword arguments.
+
+        Resolves aliases, fills optional defaults and coerces scalars to strings.
+
+        Raises:
+            ToolError: On unknown, missing or non-scalar arguments
+        """
+        if not isinstance(args, dict):
+            raise ToolError(f"Invalid arguments for {self.name}: expected a JSON object")
+
+        # Fast path: canonical names with string values (what models almost always send)
+        if self._names.issuperset(args):
+            for value in args.values():
+                if type(value) is not str:
+                    break
+            else:
+                kwargs = {**self._defaults, **args}
+                for name in self._required:
+                    if name not in kwargs:
+                        raise ToolError(f"Invalid arguments for {self.name}: missing required argument '{name}'")
+                return kwargs
+
+        kwargs = dict(self._defaults)
+        for key, value in args.items():
+            param = self._accepted.get(key)
+            if param is None:
+                raise ToolError(f"Invalid arguments for {self.name}: unexpected argument '{key}'")
+            if value is None:
+                continue
+            if not isinstance(value, str):
+                if isinstance(value, (dict, list)):
+                    raise ToolError(f"Invalid arguments for {self.name}: '{key}' must be a string")
+                value = str(value)
+            kwargs[param.name] = value
+
+        for name in self._required:
+            if kwargs.get(name) is None:
+                raise ToolError(f"Invalid arguments for {self.name}: missing required argument '{name}'")
+        return kwargs
+
+
+class ToolRegistry:
+    """
+    Name -> ToolSpec map with precomputed schema, prompt text and dispatch table.
+
+    Args:
+        idempotency: Index of recent calls; when given, dispatch() skips a call
+            whose key (session + normalized arguments) it has already seen
+            (calls without a session are always run)
+    """
+
+    def __init__(self, idempotency: Optional[IdempotencyIndex] = None):
+        self.idempotency = idempotency
+        self._specs: Dict[str, ToolSpec] = {}
+        self.functions: Dict[str, Callable] = {}
+        self.openai_tools: List[Dict] = []
+        self.react_descriptions = ""
+
+    def register(self, spec: ToolSpec) -> ToolSpec:
+        if spec.name in self._specs:
+            raise ValueError(f"Tool already registered: {spec.name}")
+        self._specs[spec.name] = spec
+        self.functions[spec.name] = spec.func
+        self._build()
+        return spec
+
+    def _build(self) -> None:
+        specs = list(self._specs.values())
+        self.openai_tools = [spec.schema() for spec in specs]
+
+        examples = "\n".join(
+            f"Action: {spec.name}({json.dumps(spec.example)})" for spec in specs
+        )
+        blocks = "\n\n".join(spec.react_description(i) for i, spec in enumerate(specs, 1))
+        self.react_descriptions = f"""
+Available Tools:
+
+{blocks}
+
+Tool Call Format:
+Action: tool_name({{"param1": "value1", "param2": "value2"}})
+
+Examples:
+{examples}
+"""
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def spec(self, name: str) -> Optional[ToolSpec]:
+        return self._specs.get(name)
+
+    def get(self, name: str) -> Optional[Callable]:
+        """Tool function by name (None if unknown)."""
+        return self.functions.get(name)
+
+    def prepare(self, name: str, args: Dict) -> Tuple[Callable, Dict]:
+        """
+        Resolve and validate a call without running it.
+
+        Returns:
+            (function, keyword_arguments)
+
+        Raises:
+            ToolError: Unknown tool or invalid arguments
+        """
+        spec = self._specs.get(name)
+        if spec is None:
+            raise ToolError(f"Unknown tool: {name}. Available tools: {', '.join(self._specs)}")
+        return spec.func, spec.validate(args)
+
+    def confirmation(self, name: str, args: Dict, result: Dict) -> Optional[str]:
+        """Locally rendered reply for a finished call (see ToolSpec.render_confirmation), or None."""
+        spec = self._specs.get(name)
+        return spec.render_confirmation(args, result) if spec is not None else None
+
+    def dispatch(self, name: str, args: Dict, session_id: Optional[str] = None) -> Dict:
+        """
+        Validate and execute a tool call, unless it repeats a recent one.
+
+        Args:
+            name: Tool name
+            args: Arguments from the model
+            session_id: Conversation the call belongs to (part of its idempotency
+                key; None: the call is not deduplicated)
+
+        Returns:
+            The tool's result dict, the first call's result with "duplicate": True
+            for a repeat, or {"status": "error", "message": ...}
+        """
+        with TRACER.span("tool", tool=name) as span, PROFILER.request(f"tool.{name}"):
+            try:
+                func, kwargs = self.prepare(name, args)
+            except ToolError as e:
+                span.set(status="error")
+                return {"status": "error", "message": str(e)}
+
+            key = None
+            if self.idempotency is not None and session_id is not None:
+                key = idempotency_key(name, kwargs, session_id, self._specs[name].idempotency_fields)
+                previous = self.idempotency.claim(key)
+                if previous is not None:
+                    span.set(duplicate=True)
+                    return previous
+
+            try:
+                result = func(**kwargs)
+            except Exception as e:
+                result = {"status": "error", "message": f"Tool execution error: {str(e)}"}
+
+            if key is not None:
+                if isinstance(result, dict) and result.get("status") == "success":
+                    self.idempotency.commit(key, name, result)
+                else:
+                    self.idempotency.release(key)
+            span.set(status=result.get("status") if isinstance(result, dict) else None)
+            return result
@@ -0,0 +1,175 @@
+"""
+FAQ Response Cache
+Answers to repeated questions ("What breads are fresh now?") served without a
+model round trip.
+
+Questions are normalized to lowercase with punctuation and extra whitespace
+dropped, so "What breads are fresh now?" and "what breads are fresh now" share an
+entry. Every word is kept (no stopwords or stemming): "Which breads have no nuts?"
+and "Which breads have nuts?", or "When do you open?" and "Where do you open?",
+are different questions.
+
+Rules:
+  - only answers produced without any tool call are stored; a question whose
+    answer needed a tool is marked tool-bound and always goes to the model, so
+    feedback, leads and orders are still recorded every time
+  - entries expire at the end of the bake cycle they were created in (fresh
+    batches every 3 hours), so "what's fresh now" never outlives its batch
+  - least recently used entries are evicted beyond `maxsize`
+
+Lookups are counted in METRICS as response_cache.hits / .misses / .bypassed.
+"""
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from .metrics import METRICS
+
+# Fresh batches every 3 hours (business_summary.txt)
+BAKE_CYCLE_SECONDS = 3 * 3600
+
+DEFAULT_CACHE_SIZE = int(os.getenv("FLEUR_RESPONSE_CACHE", "256"))
+DEFAULT_TTL = float(os.getenv("FLEUR_RESPONSE_CACHE_TTL", str(BAKE_CYCLE_SECONDS)))
+# Local hour the first bake cycle of the day starts at
+BAKE_CYCLE_START_HOUR = int(os.getenv("FLEUR_BAKE_CYCLE_START_HOUR", "0"))
+
+# Stored in place of an answer for questions that need a tool
+_TOOL_BOUND = object()
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+def normalize_question(question: str) -> str:
+    """Cache key text for a question ("" if nothing meaningful is left)."""
+    return " ".join(_PUNCTUATION.sub(" ", question.lower()).split())
+
+
+def bake_cycle_end(now: float, cycle: float = BAKE_CYCLE_SECONDS,
+                   start_hour: int = BAKE_CYCLE_START_HOUR) -> float:
+    """Timestamp at which the bake cycle containing `now` ends (local time)."""
+    local = datetime.fromtimestamp(now)
+    anchor = local.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+    elapsed = (local - anchor).total_seconds() % cycle
+    return now + cycle - elapsed
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of normalized question -> answer with bake-cycle expiry.
+
+    Args:
+        maxsize: Maximum entries (answers and tool-bound markers)
+        ttl: Upper bound on an entry's lifetime in seconds
+        align_to_cycle: Also expire entries at the end of their bake cycle
+        clock: Wall-clock time source (replaceable for replays)
+        metrics: Registry for hit/miss counters
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_TTL,
+                 align_to_cycle: bool = True, clock: Callable[[], float] = time.time,
+                 metrics=METRICS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.align_to_cycle = align_to_cycle
+        self.clock = clock
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[object, float]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _key(self, question: str, namespace: str) -> Optional[Tuple[str, str]]:
+        normalized = normalize_question(question)
+        return (namespace, normalized) if normalized else None
+
+    def _expiry(self, now: float) -> float:
+        expires = now + self.ttl
+        if self.align_to_cycle:
+            expires = min(expires, bake_cycle_end(now))
+        return expires
+
+    def get(self, question: str, namespace: str = "") -> Optional[str]:
+        """
+        Cached answer for `question`, or None (not cached, expired or tool-bound).
+        """
+        if not self.enabled:
+            return None
+        key = self._key(question, namespace)
+        if key is None:
+            return None
+
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            self.metrics.increment("response_cache.misses")
+            return None
+        if entry[0] is _TOOL_BOUND:
+            self.metrics.increment("response_cache.bypassed")
+            return None
+        self.metrics.increment("response_cache.hits")
+        return entry[0]
+
+    def _store(self, question: str, value: object, namespace: str) -> None:
+        if not self.enabled:
+            return
+        key = self._key(question, namespace)
+        if key is None:
+            return
+
+        expires = self._expiry(self.clock())
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.metrics.increment("response_cache.evictions")
+
+    def put(self, question: str, answer: str, namespace: str = "") -> None:
+        """Store an answer the model gave without calling any tool."""
+        if answer:
+            self._store(question, answer, namespace)
+
+    def mark_tool_bound(self, question: str, namespace: str = "") -> None:
+        """Record that answering `question` needed a tool, so it is never served from cache."""
+        self._store(question, _TOOL_BOUND, namespace)
+
+    def remember(self, question: str, answer: str, used_tools: bool, namespace: str = "") -> None:
+        """Store `answer`, or mark the question tool-bound if the model called a tool."""
+        if used_tools:
+            self.mark_tool_bound(question, namespace)
+        else:
+            self.put(question, answer, namespace)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def info(self) -> Dict[str, float]:
+        """Entry count and hit rate so far."""
+        hits = self.metrics.counter("response_cache.hits")
+        lookups = hits + self.metrics.counter("response_cache.misses") + self.metrics.counter("response_cache.bypassed")
+        return {
+            "entries": len(self),
+            "maxsize": self.maxsize,
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,189 @@
+"""
+Local Retrieval over Business Documents
+Chunks the business documents and scores them with BM25 so each prompt carries
+only the passages relevant to the user's message instead of the full context.
+
+Scoring is fully vectorized with NumPy: the BM25 term weights are precomputed
+into a (chunks x vocabulary) matrix at build time, so a query is a column
+gather plus a row sum.
+"""
+
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Default number of passages injected per message
+DEFAULT_TOP_K = 4
+
+# Chunks are packed up to this many characters (a single long paragraph may exceed it)
+DEFAULT_CHUNK_CHARS = 500
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_BULLET_RE = re.compile(r"\s*•\s*")
+_BLANK_LINE_RE = re.compile(r"\n\s*\n")
+
+_STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its
+me my no not of on or our so that the their them there they this to us was we
+what when where which who will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with plural 's' stripped."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _split_units(text: str) -> List[str]:
+    """Split a document into paragraphs and bullet items, whitespace-normalized."""
+    units = []
+    for paragraph in _BLANK_LINE_RE.split(text):
+        for item in _BULLET_RE.split(paragraph):
+            item = " ".join(item.split())
+            if item:
+                units.append(item)
+    return units
+
+
+def chunk_documents(documents: Dict[str, str], max_chars: int = DEFAULT_CHUNK_CHARS) -> List[Tuple[str, str]]:
+    """
+    Pack each document's paragraphs/bullets into chunks of at most `max_chars`.
+
+    Args:
+        documents: Text keyed by source name
+        max_chars: Soft size limit per chunk
+
+    Returns:
+        List of (source_name, chunk_text) in document order
+    """
+    chunks = []
+    for source, text in documents.items():
+        current = ""
+        for unit in _split_units(text):
+            if current and len(current) + 1 + len(unit) > max_chars:
+                chunks.append((source, current))
+                current = unit
+            else:
+                current = f"{current} {unit}" if current else unit
+        if current:
+            chunks.append((source, current))
+    return chunks
+
+
+class BM25Index:
+    """
+    BM25 index over a fixed set of chunks.
+
+    Args:
+        chunks: List of (source_name, text)
+        k1: Term-frequency saturation
+        b: Length normalization
+    """
+
+    def __init__(self, chunks: List[Tuple[str, str]], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+
+        tokenized = [tokenize(text) for _, text in chunks]
+        self.vocabulary = {}
+        for tokens in tokenized:
+            for token in tokens:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        n_chunks = len(chunks)
+        tf = np.zeros((n_chunks, max(len(self.vocabulary), 1)), dtype=np.float32)
+        for row, tokens in enumerate(tokenized):
+            for token in tokens:
+                tf[row, self.vocabulary[token]] += 1.0
+
+        lengths = tf.sum(axis=1)
+        avg_length = float(lengths.mean()) if n_chunks else 0.0
+        doc_freq = (tf > 0).sum(axis=0)
+        self.idf = np.log1p((n_chunks - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        norm = k1 * (1.0 - b + b * lengths / max(avg_length, 1e-9))
+        # Precomputed BM25 contribution of every (chunk, term) pair
+        self.weights = (tf * (k1 + 1.0) / (tf + norm[:, None])) * self.idf[None, :]
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for `query`."""
+        term_ids = [self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary]
+        if not term_ids:
+            return np.zeros(len(self.chunks), dtype=np.float32)
+        return self.weights[:, term_ids].sum(axis=1)
+
+    def search(self, query: str, k: int = DEFAULT_TOP_K) -> List[Tuple[float, str, str]]:
+        """
+        Return the top-k chunks for `query`.
+
+        Returns:
+            List of (score, source_name, text), best first; chunks scoring 0 are skipped
+        """
+        if k <= 0 or not self.chunks:
+            return []
+        scores = self.scores(query)
+        k = min(k, len(self.chunks))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (float(scores[i]), self.chunks[i][0], self.chunks[i][1])
+            for i in top if scores[i] > 0
+        ]
+
+    def context_for(self, query: str, k: int = DEFAULT_TOP_K, shown: Optional[Set] = None) -> str:
+        """
+        Render the top-k passages as a business-context block for a prompt.
+        Passages keep their original document order so related text stays together.
+
+        Args:
+            query: Text to retrieve for
+            k: Number of passages
+            shown: Optional set of (source, text) chunks already in the conversation;
+                those are left out and the new ones are added to it. Returns "" when
+                every relevant passage was already shown.
+        """
+        hits = self.search(query, k)
+        if not hits:
+            return "(No passages in the business documents matched this question.)\n"
+
+        if shown is not None:
+            hits = [hit for hit in hits if (hit[1], hit[2]) not in shown]
+            shown.update((source, text) for _, source, text in hits)
+
+        order = {chunk: i for i, chunk in enumerate(self.chunks)}
+        hits.sort(key=lambda hit: order[(hit[1], hit[2])])
+        return "".join(f"[{source}] {text}\n\n" for _, source, text in hits)
+
+
+def build_business_index(documents: Dict[str, str], max_chars: int = DEFAULT_CHUNK_CHARS,
+                         k1: float = 1.5, b: float = 0.75) -> BM25Index:
+    """
+    Build a BM25 index over the business documents.
+
+    Args:
+        documents: Text keyed by source name (e.g. BusinessSnapshot.documents)
+        max_chars: Soft size limit per chunk
+
+    Returns:
+        BM25Index
+    """
+    return BM25Index(chunk_documents(documents, max_chars), k1=k1, b=b)
+
+
+def parse_top_k(value: Optional[str], default: int = DEFAULT_TOP_K) -> int:
+    """Parse a top-k setting (e.g. from an env var); 0 disables retrieval."""
+    if value is None or value.strip() == "":
+        return default
+    return max(int(value), 0)
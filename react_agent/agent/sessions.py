@@ -0,0 +1,248 @@
+"""
+Conversation Session Store
+Server-side conversation state keyed by session id, so a chat turn no longer
+rebuilds (and resends) the whole transcript from the client's history.
+
+Each session keeps:
+  - the recent turns verbatim as compact tuples
+    (user, assistant, passages the turn was answered with, their chunk keys)
+  - a rolling summary of the older turns (rule-based by default; any
+    summarizer(summary, turns) -> str can be plugged in)
+
+When a session's estimated tokens exceed `token_budget`, its oldest turns are
+folded into the summary (the last `keep_recent` turns always stay verbatim),
+and the summary itself is capped by dropping its oldest lines. Beyond
+`max_sessions` the least recently used session is evicted, and sessions idle
+for longer than `idle_ttl` are dropped when next looked up.
+
+Sizes are observed per append in METRICS as session.tokens / session.bytes;
+compactions, evictions, expiries and resyncs are counted under sessions.*.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .metrics import METRICS
+from .prompt_layout import estimate_tokens, layout_messages
+
+DEFAULT_MAX_SESSIONS = int(os.getenv("FLEUR_MAX_SESSIONS", "1024"))
+DEFAULT_TOKEN_BUDGET = int(os.getenv("FLEUR_SESSION_TOKENS", "2000"))
+DEFAULT_IDLE_TTL = float(os.getenv("FLEUR_SESSION_IDLE_TTL", str(2 * 3600)))
+DEFAULT_KEEP_RECENT = 2
+
+# Characters kept per side of a turn in the rule-based summary
+SUMMARY_SNIPPET_CHARS = 160
+
+# (user, assistant, context, chunk keys added to the conversation by this turn)
+Turn = Tuple[str, str, Optional[str], Tuple]
+
+
+def _snippet(text: str, limit: int = SUMMARY_SNIPPET_CHARS) -> str:
+    """First sentence (or `limit` characters) of a message, on one line."""
+    text = " ".join((text or "").split())
+    for end in (". ", "? ", "! "):
+        cut = text.find(end)
+        if 0 < cut < limit:
+            return text[:cut + 1]
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def summarize_turns(summary: str, turns: Sequence[Turn]) -> str:
+    """
+    Rule-based rolling summary: one line per folded turn, appended to the previous summary.
+
+    Args:
+        summary: Summary so far ("" for none)
+        turns: Turns being folded, oldest first
+
+    Returns:
+        The new summary
+    """
+    lines = [summary] if summary else []
+    for user, assistant, _, _ in turns:
+        lines.append(f"- Customer: {_snippet(user)} | Assistant: {_snippet(assistant)}")
+    return "\n".join(lines)
+
+
+class Session:
+    """One conversation: rolling summary plus the recent turns verbatim."""
+
+    __slots__ = ("session_id", "summary", "turns", "folded", "last_used", "tokens", "nbytes")
+
+    def __init__(self, session_id: str, now: float):
+        self.session_id = session_id
+        self.summary = ""
+        self.turns: List[Turn] = []
+        self.folded = 0  # turns folded into the summary
+        self.last_used = now
+        self.tokens = 0
+        self.nbytes = 0
+
+    @property
+    def turn_count(self) -> int:
+        """Turns in the conversation, including the summarized ones."""
+        return self.folded + len(self.turns)
+
+    @property
+    def last_user_message(self) -> Optional[str]:
+        return self.turns[-1][0] if self.turns else None
+
+    def shown(self) -> Set:
+        """Chunk keys of the passages still in the prompt (for retrieval dedupe)."""
+        return {chunk for turn in self.turns for chunk in turn[3]}
+
+    def messages(self, prefix: str, user_message: str, context: Optional[str] = None) -> List[Dict[str, str]]:
+        """The message list for the next request (see prompt_layout.layout_messages)."""
+        return layout_messages(
+            prefix, user_message,
+            history=[(user, assistant) for user, assistant, _, _ in self.turns],
+            context=context,
+            history_contexts=[turn[2] for turn in self.turns],
+            summary=self.summary or None,
+        )
+
+    def _measure(self) -> None:
+        parts = [self.summary] + [part or "" for turn in self.turns for part in turn[:3]]
+        self.tokens = sum(estimate_tokens(part) for part in parts)
+        self.nbytes = sum(len(part.encode("utf-8")) for part in parts)
+
+
+class SessionStore:
+    """
+    Thread-safe LRU of sessions with a per-session token budget.
+
+    Args:
+        max_sessions: Sessions kept before the least recently used is evicted
+        token_budget: Estimated tokens (summary + turns + their passages) a
+            session may hold before old turns are summarized
+        idle_ttl: Seconds without a turn after which a session is dropped
+        keep_recent: Turns always kept verbatim (at least 1)
+        summarizer: (summary, turns) -> new summary
+        summary_tokens: Cap on the summary itself (oldest lines dropped beyond it)
+        clock: Time source
+        metrics: Registry for sizes and counters
+    """
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 idle_ttl: float = DEFAULT_IDLE_TTL, keep_recent: int = DEFAULT_KEEP_RECENT,
+                 summarizer: Callable[[str, Sequence[Turn]], str] = summarize_turns,
+                 summary_tokens: Optional[int] = None, clock: Callable[[], float] = time.time,
+                 metrics=METRICS):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self.idle_ttl = idle_ttl
+        self.keep_recent = max(1, keep_recent)
+        self.summarizer = summarizer
+        self.summary_tokens = summary_tokens if summary_tokens is not None else token_budget // 4
+        self.clock = clock
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def get(self, session_id: str) -> Session:
+        """The session for `session_id` (created empty if new, expired or evicted)."""
+        now = self.clock()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and now - session.last_used > self.idle_ttl:
+                del self._sessions[session_id]
+                self.metrics.increment("sessions.expired")
+                session = None
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id, now)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.metrics.increment("sessions.evictions")
+            else:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def sync(self, session_id: str, history: Sequence[Tuple[str, str]]) -> Session:
+        """
+        The session for `session_id`, checked against the client's history.
+
+        The client's history is the source of truth: if it no longer matches the
+        stored turns (retry/undo in the UI, a restarted or evicted server
+        session), the session is rebuilt from it.
+        """
+        session = self.get(session_id)
+        history = list(history or [])
+        if session.turn_count == len(history) and (
+                not history or session.last_user_message == history[-1][0]):
+            return session
+
+        with self._lock:
+            session.summary, session.turns, session.folded = "", [], 0
+        for user, assistant in history:
+            self.append(session, user, assistant or "")
+        if history:
+            self.metrics.increment("sessions.resynced")
+        return session
+
+    def append(self, session: Session, user_message: str, reply: str, context: Optional[str] = None,
+               chunks: Sequence = ()) -> Session:
+        """
+        Record one finished turn and compact the session if it is over budget.
+
+        Args:
+            session: Session from get()/sync()
+            user_message: The customer's message
+            reply: The assistant's reply
+            context: Passages the turn was sent with (re-sent with it later)
+            chunks: Chunk keys of those passages
+        """
+        with self._lock:
+            session.turns.append((user_message, reply or "", context or None, tuple(chunks)))
+            session.last_used = self.clock()
+            session._measure()
+            if session.tokens > self.token_budget:
+                self._compact(session)
+        self.metrics.observe("session.tokens", session.tokens)
+        self.metrics.observe("session.bytes", session.nbytes)
+        return session
+
+    def _compact(self, session: Session) -> None:
+        """Fold the oldest turns into the summary until the session fits its budget."""
+        folded = []
+        while session.tokens > self.token_budget and len(session.turns) > self.keep_recent:
+            turn = session.turns.pop(0)
+            folded.append(turn)
+            session.tokens -= sum(estimate_tokens(part or "") for part in turn[:3])
+        if not folded:
+            return
+
+        summary = self.summarizer(session.summary, folded)
+        # Rolling: beyond its own cap the summary forgets its oldest lines
+        lines = summary.split("\n")
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        session.summary = "\n".join(lines)
+        session.folded += len(folded)
+        session._measure()
+        self.metrics.increment("sessions.compactions")
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+    def info(self) -> Dict[str, float]:
+        """Session count and total/max tokens and bytes held."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "tokens": sum(s.tokens for s in sessions),
+            "bytes": sum(s.nbytes for s in sessions),
+            "max_tokens": max((s.tokens for s in sessions), default=0),
+            "max_bytes": max((s.nbytes for s in sessions), default=0),
+        }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,263 @@
+"""
+Business Context Snapshot
+Caches the text extracted from the business documents (and prompts built from it)
+so a process start costs one JSON read instead of a full PDF parse.
+
+The snapshot is content-addressed: each source file is recorded with its size,
+mtime and SHA-256. When the size and mtime still match, the cached text is used
+as-is; when they differ, the file is re-hashed and only re-parsed if its content
+actually changed.
+
+CLI (rebuild ahead of a deploy):
+    python react_agent/build_snapshot.py --rebuild
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Bump when the on-disk layout or the text extraction changes
+SNAPSHOT_VERSION = 1
+
+# Repository root (react_agent/agent/snapshot.py -> repo root)
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+DEFAULT_DOCS_DIR = REPO_ROOT / "me"
+DEFAULT_SNAPSHOT_PATH = REPO_ROOT / ".cache" / "business_snapshot.json"
+DEFAULT_SOURCES = ["about_business.pdf", "business_summary.txt"]
+
+
+# Callbacks notified when a load observes different document content than the
+# previous load in this process (e.g. to drop prompts built from the old text)
+_change_listeners: List[Callable[[str], None]] = []
+_last_loaded_key: Optional[str] = None
+
+
+def on_snapshot_change(callback: Callable[[str], None]) -> None:
+    """Register `callback(new_key)` to run whenever the loaded snapshot content changes."""
+    _change_listeners.append(callback)
+
+
+def _notify_loaded(key: str) -> None:
+    global _last_loaded_key
+    if _last_loaded_key is not None and key != _last_loaded_key:
+        for callback in _change_listeners:
+            callback(key)
+    _last_loaded_key = key
+
+
+def _sha256_file(path: Path) -> str:
+    """Hash a file's content in 64 KiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_document_text(path: Path) -> str:
+    """
+    Extract the text of a single business document.
+
+    PDFs are parsed page by page with PyPDF2 (one trailing newline per page,
+    exactly like the original loaders); any other file is read as UTF-8 text.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".pdf":
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(str(path))
+        return "".join(page.extract_text() + "\n" for page in reader.pages)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class BusinessSnapshot:
+    """
+    In-memory view of a business context snapshot.
+
+    Attributes:
+        documents: Extracted text keyed by source file name (missing files are absent)
+        sources: Fingerprint of each source ({"size", "mtime_ns", "sha256"})
+        prompts: Rendered prompts keyed by name ({"key", "text"})
+    """
+
+    def __init__(self, path: Path, documents: Dict[str, str], sources: Dict[str, Dict],
+                 prompts: Optional[Dict[str, Dict]] = None):
+        self.path = Path(path)
+        self.documents = documents
+        self.sources = sources
+        self.prompts = prompts or {}
+        self.dirty = False
+
+    @property
+    def key(self) -> str:
+        """Content address of the snapshot (hash over all source hashes)."""
+        digest = hashlib.sha256(str(SNAPSHOT_VERSION).encode())
+        for name in sorted(self.sources):
+            digest.update(name.encode("utf-8"))
+            digest.update(self.sources[name]["sha256"].encode("ascii"))
+        return digest.hexdigest()
+
+    def document(self, name: str) -> str:
+        """Return a document's text, or "" if the source file does not exist."""
+        return self.documents.get(name, "")
+
+    def prompt(self, name: str, template: str, **fields: str) -> str:
+        """
+        Render `template` with `fields`, reusing the cached rendering when neither
+        the template nor the fields changed since it was stored.
+        """
+        digest = hashlib.sha256(template.encode("utf-8"))
+        for field in sorted(fields):
+            digest.update(b"\0" + field.encode("utf-8") + b"\0")
+            digest.update(fields[field].encode("utf-8"))
+        prompt_key = digest.hexdigest()
+
+        cached = self.prompts.get(name)
+        if cached and cached.get("key") == prompt_key:
+            return cached["text"]
+
+        text = template.format(**fields)
+        self.prompts[name] = {"key": prompt_key, "text": text}
+        self.dirty = True
+        return text
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "key": self.key,
+            "sources": self.sources,
+            "documents": self.documents,
+            "prompts": self.prompts,
+        }
+
+    def save(self) -> None:
+        """Atomically write the snapshot to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def flush(self) -> bool:
+        """Save if anything changed; returns False if the snapshot could not be written."""
+        if not self.dirty:
+            return True
+        try:
+            self.save()
+        except OSError:
+            # Read-only deploys still work, they just pay the parse on every start
+            return False
+        return True
+
+
+def _read_snapshot_file(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        return None
+    return data
+
+
+def load_snapshot(docs_dir: Optional[Path] = None,
+                  snapshot_path: Optional[Path] = None,
+                  sources: Optional[List[str]] = None,
+                  rebuild: bool = False) -> BusinessSnapshot:
+    """
+    Load the business context snapshot, re-extracting only what changed.
+
+    Args:
+        docs_dir: Directory containing the business documents (default: me/)
+        snapshot_path: Snapshot file location (default: .cache/business_snapshot.json)
+        sources: Document file names to include (default: PDF profile + text summary)
+        rebuild: Ignore any cached data and re-extract every document
+
+    Returns:
+        BusinessSnapshot (already saved to disk if anything was rebuilt)
+    """
+    docs_dir = Path(docs_dir) if docs_dir else DEFAULT_DOCS_DIR
+    snapshot_path = Path(snapshot_path) if snapshot_path else DEFAULT_SNAPSHOT_PATH
+    sources = sources or DEFAULT_SOURCES
+
+    cached = None if rebuild else _read_snapshot_file(snapshot_path)
+    cached_sources = cached["sources"] if cached else {}
+    cached_documents = cached["documents"] if cached else {}
+
+    documents = {}
+    fingerprints = {}
+    changed = cached is None
+
+    for name in sources:
+        path = docs_dir / name
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            if name in cached_sources:
+                changed = True
+            continue
+
+        previous = cached_sources.get(name)
+        if (previous and name in cached_documents
+                and previous["size"] == stat.st_size
+                and previous["mtime_ns"] == stat.st_mtime_ns):
+            # Fast path: unchanged since the snapshot was written
+            fingerprints[name] = previous
+            documents[name] = cached_documents[name]
+            continue
+
+        content_hash = _sha256_file(path)
+        fingerprints[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": content_hash,
+        }
+        changed = True
+
+        if previous and name in cached_documents and previous["sha256"] == content_hash:
+            # Touched but not modified (e.g. fresh checkout): keep the extracted text
+            documents[name] = cached_documents[name]
+        else:
+            documents[name] = extract_document_text(path)
+
+    prompts = {}
+    if cached and cached.get("key"):
+        prompts = cached.get("prompts", {})
+
+    snapshot = BusinessSnapshot(snapshot_path, documents, fingerprints, prompts)
+    if cached and cached.get("key") != snapshot.key:
+        # Source content changed: prompts built from the old text are stale
+        snapshot.prompts = {}
+
+    if changed:
+        snapshot.dirty = True
+        snapshot.flush()
+
+    _notify_loaded(snapshot.key)
+    return snapshot
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the Fleur de Pain business context snapshot.")
+    parser.add_argument("--docs-dir", type=Path, default=DEFAULT_DOCS_DIR,
+                        help="Directory containing the business documents")
+    parser.add_argument("--output", type=Path, default=DEFAULT_SNAPSHOT_PATH,
+                        help="Snapshot file to write")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Re-extract every document even if the snapshot is current")
+    args = parser.parse_args(argv)
+
+    snapshot = load_snapshot(args.docs_dir, args.output, rebuild=args.rebuild)
+    print(f"Snapshot: {snapshot.path}")
+    print(f"Key: {snapshot.key}")
+    for name, text in snapshot.documents.items():
+        print(f"  {name}: {len(text)} chars")
+    return 0
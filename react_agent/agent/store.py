@@ -0,0 +1,385 @@
+"""
+SQLite Record Store
+Keeps the business records (leads, feedback, pickups, cake orders) in a SQLite
+database next to the JSONL logs, so questions like "all pickups for Saturday"
+or "orders for maria@test.com" are an index lookup instead of a scan and JSON
+parse of every line.
+
+The tool functions write through `RecordStore.insert` with their signatures
+unchanged. FLEUR_RECORD_STORE selects where records go: "both" (default; the
+JSONL files stay as they are), "jsonl" or "sqlite".
+
+  - The database runs in WAL mode (readers never block the writer) with
+    synchronous=NORMAL; each thread reuses one connection.
+  - Inserts are queued and written with executemany in one transaction when
+    `max_batch` rows are queued or the oldest has waited `max_delay` seconds
+    (FLEUR_STORE_MAX_BATCH, FLEUR_STORE_MAX_DELAY). Reads flush first.
+  - A batch that fails to write (database locked, disk full) is logged and
+    retried by the flusher thread, at most FLEUR_STORE_MAX_ATTEMPTS times and
+    MAX_QUEUED_ROWS rows per table; rows past either limit are dropped to the
+    log as JSON. Inserts never write synchronously while a batch is failing.
+  - Dates, emails and names are indexed case-insensitively. Every row is
+    unique on its timestamp and first field (a missing field counts as ""),
+    so importing a JSONL file twice, or one the store already mirrors, adds
+    nothing.
+
+One-shot import of existing logs:
+    python react_agent/import_logs.py [--logs-dir logs] [--db logs/records.db]
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .metrics import METRICS
+
+_log = logging.getLogger(__name__)
+
+BACKENDS = ("jsonl", "sqlite", "both")
+DEFAULT_BACKEND = os.getenv("FLEUR_RECORD_STORE", "both")
+DEFAULT_MAX_BATCH = int(os.getenv("FLEUR_STORE_MAX_BATCH", "64"))
+DEFAULT_MAX_DELAY = float(os.getenv("FLEUR_STORE_MAX_DELAY", "0.5"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("FLEUR_STORE_MAX_ATTEMPTS", "5"))
+
+DEFAULT_LOGS_DIR = Path("logs")
+DEFAULT_DB_NAME = "records.db"
+
+# Rows per executemany transaction when importing
+IMPORT_BATCH = 10000
+
+# Rows kept queued per table while its writes fail (the oldest are dropped first)
+MAX_QUEUED_ROWS = 10000
+
+# table -> JSONL file, columns (after "ts"), indexed columns; the first column
+# is part of the row's identity together with "ts"
+TABLES: Dict[str, Dict] = {
+    "leads": {
+        "file": "leads.jsonl",
+        "columns": ("email", "name", "message"),
+        "indexes": ("email", "name"),
+    },
+    "feedback": {
+        "file": "feedback.jsonl",
+        "columns": ("question",),
+        "indexes": (),
+    },
+    "pickups": {
+        "file": "scheduled_pickups.jsonl",
+        "columns": ("customer_name", "items", "pickup_date", "pickup_time"),
+        "indexes": ("pickup_date", "customer_name"),
+    },
+    "cake_orders": {
+        "file": "cake_orders.jsonl",
+        "columns": ("name", "email", "cake_size", "flavor", "pickup_date", "custom_message"),
+        "indexes": ("email", "name", "pickup_date"),
+    },
+}
+
+
+def _schema() -> List[str]:
+    statements = []
+    for table, spec in TABLES.items():
+        columns = ", ".join(
+            f"{name} TEXT COLLATE NOCASE" if name in spec["indexes"] else f"{name} TEXT"
+            for name in spec["columns"]
+        )
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, ts TEXT NOT NULL, {columns})")
+        # NULLs never collide in a UNIQUE index, so a missing first field is keyed as ""
+        statements.append(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_identity "
+                          f"ON {table} (ts, COALESCE({spec['columns'][0]}, ''))")
+        for name in spec["indexes"]:
+            statements.append(f"CREATE INDEX IF NOT EXISTS {table}_{name} ON {table} ({name})")
+    return statements
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """
+    Replace the (ts, first column) unique index of databases created before
+    the identity index, dropping the duplicates it let through (NULL first column).
+    """
+    for table, spec in TABLES.items():
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                        (f"{table}_ts",)).fetchone() is None:
+            continue
+        conn.execute(f"DROP INDEX {table}_ts")
+        conn.execute(f"DELETE FROM {table} WHERE id NOT IN "
+                     f"(SELECT MIN(id) FROM {table} GROUP BY ts, COALESCE({spec['columns'][0]}, ''))")
+
+
+def _table(table: str) -> Dict:
+    spec = TABLES.get(table)
+    if spec is None:
+        raise ValueError(f"Unknown table: {table}. Choose from: {list(TABLES)}")
+    return spec
+
+
+def _row(spec: Dict, record: Dict) -> Tuple:
+    return (record.get("ts"),) + tuple(record.get(name) for name in spec["columns"])
+
+
+class RecordStore:
+    """
+    SQLite-backed store of the business records.
+
+    The database is opened on first use, so constructing a store is free.
+
+    Args:
+        path: Database file (parent directories are created)
+        max_batch: Queued rows that trigger a write
+        max_delay: Seconds the oldest queued row may wait
+        max_attempts: Failed writes of a table's batch before its rows are dropped
+        metrics: Registry for insert/query counters
+    """
+
+    def __init__(self, path: Path = DEFAULT_LOGS_DIR / DEFAULT_DB_NAME,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_delay: float = DEFAULT_MAX_DELAY,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, metrics=METRICS):
+        self.path = Path(path)
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.max_attempts = max(1, max_attempts)
+        self.metrics = metrics
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._ready = False
+        # table -> rows waiting for the next batch
+        self._pending: Dict[str, List[Tuple]] = {}
+        self._pending_count = 0
+        self._oldest = 0.0
+        # table -> consecutive failed writes of its queued rows
+        self._attempts: Dict[str, int] = {}
+        self._flusher = None
+        self._stop = threading.Event()
+        atexit.register(self.close)
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection (opened, and the schema created, on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            if not self._ready:
+                with conn:
+                    _migrate(conn)
+                    for statement in _schema():
+                        conn.execute(statement)
+                self._ready = True
+            self._connections.append(conn)
+        self._local.conn = conn
+        return conn
+
+    def insert(self, table: str, record: Dict) -> None:
+        """Queue one record (written with the next batch)."""
+        row = _row(_table(table), record)
+        with self._lock:
+            if not self._pending_count:
+                self._oldest = time.monotonic()
+            self._pending.setdefault(table, []).append(row)
+            self._pending_count += 1
+            # While a batch is failing, retrying is the flusher's job, not the caller's
+            if self._pending_count < self.max_batch or self._attempts:
+                self._start_flusher()
+                return
+        self.flush()
+
+    def insert_many(self, table: str, records: Iterable[Dict]) -> int:
+        """
+        Write records right away, in one transaction.
+
+        Returns:
+            Rows added (records already stored are skipped)
+        """
+        spec = _table(table)
+        return self._write(table, [_row(spec, record) for record in records])
+
+    def _write(self, table: str, rows: List[Tuple]) -> int:
+        spec = TABLES[table]
+        placeholders = ", ".join("?" * (len(spec["columns"]) + 1))
+        conn = self.connection()
+        before = conn.total_changes
+        with conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {table} (ts, {', '.join(spec['columns'])}) VALUES ({placeholders})", rows)
+        added = conn.total_changes - before
+        self.metrics.increment("store.rows_written", added)
+        return added
+
+    def flush(self) -> None:
+        """Write every queued row (rows that fail to write are queued again, within limits)."""
+        with self._lock:
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+        failed: Dict[str, List[Tuple]] = {}
+        for table, rows in pending.items():
+            try:
+                self._write(table, rows)
+            except Exception as e:
+                failed[table] = rows
+                self.metrics.increment("store.write_errors")
+                _log.warning("Record store: %d %s rows not written (%s)", len(rows), table, e)
+            else:
+                with self._lock:
+                    self._attempts.pop(table, None)
+        if failed:
+            self._requeue(failed)
+
+    def _requeue(self, failed: Dict[str, List[Tuple]]) -> None:
+        """Put rows that failed to write back in front of the queue, or drop them past the limits."""
+        dropped: List[Tuple[str, List[Tuple], str]] = []
+        with self._lock:
+            for table, rows in failed.items():
+                attempts = self._attempts.get(table, 0) + 1
+                if self._stop.is_set() or attempts >= self.max_attempts:
+                    self._attempts.pop(table, None)
+                    dropped.append((table, rows, f"{attempts} failed writes"))
+                    continue
+                self._attempts[table] = attempts
+                queued = self._pending.get(table, [])
+                excess = len(rows) + len(queued) - MAX_QUEUED_ROWS
+                if excess > 0:
+                    dropped.append((table, rows[:excess], f"more than {MAX_QUEUED_ROWS} queued"))
+                    rows = rows[excess:]
+                self._pending[table] = rows + queued
+                self._pending_count += len(rows)
+            if self._pending_count:
+                self._oldest = time.monotonic()  # retry after another max_delay
+            if not self._stop.is_set():
+                self._start_flusher()
+        for table, rows, reason in dropped:
+            self._drop(table, rows, reason)
+
+    def _drop(self, table: str, rows: List[Tuple], reason: str) -> None:
+        """Give up on rows: count them and log them as JSON, so they can be restored by hand."""
+        if not rows:
+            return
+        self.metrics.increment("store.rows_dropped", len(rows))
+        columns = ("ts",) + TABLES[table]["columns"]
+        _log.error("Record store: %d %s rows dropped after %s: %s", len(rows), table, reason,
+                   json.dumps([dict(zip(columns, row)) for row in rows], ensure_ascii=False))
+
+    def _start_flusher(self) -> None:
+        """Start the thread that writes a batch once it is max_delay old (under the lock)."""
+        if self._flusher is None:
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(target=self._run_flusher, args=(self._stop,),
+                                             name="record-store-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self, stop: threading.Event) -> None:
+        while not stop.wait(max(self.max_delay / 2, 0.01)):
+            if self._pending_count and time.monotonic() - self._oldest >= self.max_delay:
+                self.flush()  # never raises: failed rows are queued again
+
+    def find(self, table: str, since: Optional[str] = None, until: Optional[str] = None,
+             limit: Optional[int] = None, **where) -> List[Dict]:
+        """
+        Records matching every `column=value` (case-insensitive on indexed columns),
+        oldest first.
+
+        Args:
+            table: One of TABLES
+            since: Earliest "ts" (ISO timestamp prefix, inclusive)
+            until: Latest "ts" (exclusive)
+            limit: Rows returned at most
+        """
+        spec = _table(table)
+        columns = ("ts",) + spec["columns"]
+        clauses, params = self._where(spec, since, until, where)
+        sql = f"SELECT {', '.join(columns)} FROM {table}{clauses} ORDER BY ts"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        self.flush()
+        self.metrics.increment("store.queries")
+        return [dict(zip(columns, row)) for row in self.connection().execute(sql, params)]
+
+    def count(self, table: str, since: Optional[str] = None, until: Optional[str] = None, **where) -> int:
+        """Number of records matching the same filters as find()."""
+        clauses, params = self._where(_table(table), since, until, where)
+        self.flush()
+        self.metrics.increment("store.queries")
+        return self.connection().execute(f"SELECT COUNT(*) FROM {table}{clauses}", params).fetchone()[0]
+
+    @staticmethod
+    def _where(spec: Dict, since: Optional[str], until: Optional[str], where: Dict) -> Tuple[str, List]:
+        clauses, params = [], []
+        for name, value in where.items():
+            if name not in spec["columns"]:
+                raise ValueError(f"Unknown column: {name}. Choose from: {list(spec['columns'])}")
+            clauses.append(f"{name} = ?")
+            params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def import_jsonl(self, logs_dir: Path = DEFAULT_LOGS_DIR,
+                     tables: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Import the JSONL logs in `logs_dir` (records already stored are skipped).
+
+        Returns:
+            table -> rows added
+        """
+        added = {}
+        for table in tables or TABLES:
+            path = Path(logs_dir) / _table(table)["file"]
+            added[table] = 0
+            if not path.exists():
+                continue
+            batch = []
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        batch.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # blank or cut-off line
+                    if len(batch) >= IMPORT_BATCH:
+                        added[table] += self.insert_many(table, batch)
+                        batch = []
+            added[table] += self.insert_many(table, batch)
+        return added
+
+    def close(self) -> None:
+        """Write queued rows and close every connection."""
+        self._stop.set()
+        self._flusher = None
+        if self._pending_count:
+            self.flush()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import the Fleur de Pain JSONL logs into the SQLite record store.")
+    parser.add_argument("--logs-dir", type=Path, default=DEFAULT_LOGS_DIR,
+                        help="Directory containing the JSONL logs")
+    parser.add_argument("--db", type=Path, default=None,
+                        help=f"Database file (default: <logs-dir>/{DEFAULT_DB_NAME})")
+    args = parser.parse_args(argv)
+
+    store = RecordStore(args.db or args.logs_dir / DEFAULT_DB_NAME)
+    added = store.import_jsonl(args.logs_dir)
+    print(f"Database: {store.path}")
+    for table, rows in added.items():
+        print(f"  {table}: {rows} added, {store.count(table)} total")
+    store.close()
+    return 0
@@ -0,0 +1,210 @@
+"""
+Streaming ReAct Controller
+Parses the model's ReAct turn while it is being generated and stops reading as
+soon as the turn is decided:
+
+  - a complete `Action: tool_name({...})` call (braces matched, strings and
+    nested objects included) -> the stream is closed and the tool runs at once,
+    before the model can invent an Observation
+  - an `Answer:` followed by a blank line -> the first paragraph is the answer
+    (what the blocking controller keeps too), the rest is not read
+
+The streaming llm_call takes messages and returns an iterator of text deltas;
+closing the iterator must cancel the request (create_stream_llm_call in
+run_detailed_experiments.py also sends "Observation:" as a stop sequence).
+
+Text that arrived after the decision point is observed per turn as
+"react.wasted_output_tokens" in METRICS, the same metric the blocking
+controller reports for everything after its Action/Answer.
+"""
+
+import re
+import json
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .react_loop import ReActController
+from .prompt_layout import estimate_tokens
+from .metrics import METRICS
+
+_ACTION_RE = re.compile(r'Action\s*:\s*(\w+)\s*\(', re.IGNORECASE)
+_ANSWER_RE = re.compile(r'\bAnswer\s*:', re.IGNORECASE)
+
+# Stop sequence for the streaming request: the model must never write the Observation
+STOP_SEQUENCES = ["\nObservation:"]
+
+
+def _match_call(text: str, start: int) -> Optional[Tuple[str, int]]:
+    """
+    Match `{...})` starting at `start` (just after the opening parenthesis).
+
+    Returns:
+        (json_text, end_index_after_closing_paren), or None while incomplete.
+        A malformed call (no object, or no closing parenthesis) returns ("", end).
+    """
+    i = start
+    while i < len(text) and text[i].isspace():
+        i += 1
+    if i == len(text):
+        return None
+    if text[i] != "{":
+        close = text.find(")", i)
+        return None if close < 0 else ("", close + 1)
+
+    depth, in_string, escaped = 0, False, False
+    for j in range(i, len(text)):
+        ch = text[j]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                k = j + 1
+                while k < len(text) and text[k].isspace():
+                    k += 1
+                if k == len(text):
+                    return None
+                return (text[i:j + 1], k + 1) if text[k] == ")" else ("", k)
+    return None
+
+
+class StreamingReActParser:
+    """
+    Incremental parser for one ReAct turn.
+
+    feed() each text delta; it returns the step once decided:
+        ("action", tool_name, tool_args) or ("answer", text)
+    finish() classifies whatever arrived when the stream ends by itself.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.end = None  # index in self.text where the decided step ends
+
+    def feed(self, delta: str) -> Optional[Tuple]:
+        # A turn is a few hundred characters: rescanning the whole text keeps
+        # markers that straddle two deltas simple to handle
+        self.text += delta
+        return self._scan(final=False)
+
+    def finish(self) -> Optional[Tuple]:
+        """Classify the full text (the stream ended without an early decision)."""
+        return self._scan(final=True)
+
+    def _scan(self, final: bool) -> Optional[Tuple]:
+        action = _ACTION_RE.search(self.text)
+        answer = _ANSWER_RE.search(self.text)
+
+        # The earliest marker decides the turn: an Action written before an
+        # Answer runs first (anything after it would be a guessed Observation)
+        if action is not None and (answer is None or action.start() < answer.start()):
+            matched = _match_call(self.text, action.end())
+            if matched is not None:
+                args_json, end = matched
+                try:
+                    tool_args = json.loads(args_json) if args_json else {}
+                except json.JSONDecodeError:
+                    tool_args = {}
+                self.end = end
+                return ("action", action.group(1), tool_args)
+            if not final and answer is None:
+                return None
+
+        if answer is not None:
+            body_start = answer.end()
+            body = self.text[body_start:]
+            stripped = body.lstrip()
+            paragraph_end = stripped.find("\n\n")
+            if paragraph_end >= 0:
+                self.end = len(self.text) - len(stripped) + paragraph_end
+                return ("answer", stripped[:paragraph_end].strip())
+            if final:
+                self.end = len(self.text)
+                return ("answer", stripped.strip())
+        return None
+
+    @property
+    def kept_text(self) -> str:
+        """The assistant turn as kept in the conversation (up to the decision point)."""
+        return self.text if self.end is None else self.text[:self.end]
+
+    @property
+    def wasted_text(self) -> str:
+        """Text received after the decision point."""
+        return "" if self.end is None else self.text[self.end:]
+
+
+class StreamingReActController(ReActController):
+    """ReActController that parses each turn from a token stream and cuts it short."""
+
+    def __init__(self, llm_call: Callable[[List[Dict[str, str]]], Iterator[str]],
+                 max_turns: int = 10, response_cache=None, compactor=None):
+        """
+        Initialize the controller.
+
+        Args:
+            llm_call: Function that takes messages and returns an iterator of text
+                deltas (closing it cancels the request)
+            max_turns: Maximum number of reasoning turns
+            response_cache: Optional ResponseCache
+            compactor: Optional Compactor
+        """
+        super().__init__(llm_call, max_turns, response_cache, compactor)
+
+    def _complete_text(self, conversation: List[Dict[str, str]]) -> str:
+        stream = self.llm_call(conversation)
+        try:
+            return "".join(stream)
+        finally:
+            _close(stream)
+
+    def _next_step(self, conversation: List[Dict[str, str]]) -> Tuple[str, Optional[Tuple]]:
+        parser = StreamingReActParser()
+        stream = self.llm_call(conversation)
+        step = None
+        try:
+            for delta in stream:
+                step = parser.feed(delta)
+                if step is not None:
+                    break
+        finally:
+            # Cancel the rest of the generation as soon as the turn is decided
+            _close(stream)
+
+        if step is None:
+            step = parser.finish()
+        METRICS.observe("react.wasted_output_tokens", estimate_tokens(parser.wasted_text))
+        if step is not None and step[0] == "action":
+            METRICS.increment("react.stream_cancelled_at_action")
+        return parser.kept_text, step
+
+
+def _close(stream) -> None:
+    close = getattr(stream, "close", None)
+    if close is not None:
+        close()
+
+
+def create_streaming_react_controller(llm_call: Callable, max_turns: int = 10,
+                                      response_cache=None, compactor=None) -> StreamingReActController:
+    """
+    Factory function to create a StreamingReActController.
+
+    Args:
+        llm_call: Function that takes messages and returns an iterator of text deltas
+        max_turns: Maximum reasoning turns
+        response_cache: Optional ResponseCache for repeated questions
+        compactor: Optional Compactor for long conversations
+
+    Returns:
+        StreamingReActController instance
+    """
+    return StreamingReActController(llm_call, max_turns, response_cache, compactor)
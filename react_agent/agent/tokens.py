@@ -0,0 +1,337 @@
+"""
+Token Accounting
+Counts the prompt tokens of every message list before it is sent, enforces
+per-request and per-session budgets, and records the prompt and completion
+tokens of every call.
+
+Counting uses tiktoken's local BPE encoding (FLEUR_TOKENIZER, default
+"o200k_base", the gpt-4o encoding) when tiktoken is installed and the encoding
+file is available (it is downloaded once into TIKTOKEN_CACHE_DIR). Otherwise
+the ~4 characters per token estimate from prompt_layout is used;
+`tokenizer_name()` says which one is active. Message framing follows the chat
+format: a few tokens per message plus the reply priming.
+
+The static prefix (system prompt, persona prompts, tool schemas) is the same
+string object on every request, so counts of long strings are memoized in an
+LRU and only the history and the current message are encoded per call.
+
+Budgets (0 disables each):
+    FLEUR_MAX_PROMPT_TOKENS      prompt tokens a single request may send (16000)
+    FLEUR_MAX_COMPLETION_TOKENS  max_tokens sent with every request (1500; with 0
+                                 no max_tokens is sent unless a session quota
+                                 needs one)
+    FLEUR_SESSION_TOKEN_QUOTA    prompt + completion tokens one session may
+                                 spend in total (200000)
+
+A request over budget raises TokenBudgetExceeded before anything is sent.
+`TokenAccountant.record` adds a call's usage to METRICS (llm.*), charges its
+session, appends it to the accountant's JSONL log if it has one, and to the
+calls collected by an enclosing `tracked_calls()` on the same thread.
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .metrics import METRICS
+from .logwriter import append_record
+from .tracing import TRACER
+from .prompt_layout import estimate_tokens, record_usage
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+TOKENIZER = os.getenv("FLEUR_TOKENIZER", "o200k_base")
+
+DEFAULT_MAX_PROMPT_TOKENS = int(os.getenv("FLEUR_MAX_PROMPT_TOKENS", "16000"))
+DEFAULT_MAX_COMPLETION_TOKENS = int(os.getenv("FLEUR_MAX_COMPLETION_TOKENS", "1500"))
+DEFAULT_SESSION_QUOTA = int(os.getenv("FLEUR_SESSION_TOKEN_QUOTA", "200000"))
+DEFAULT_MAX_TRACKED_SESSIONS = int(os.getenv("FLEUR_MAX_SESSIONS", "1024"))
+
+# Chat format framing: per message (role, separators) and the assistant reply priming
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+
+# Strings at least this long (prefixes, persona prompts, passages) have their counts memoized
+CACHED_TEXT_CHARS = 512
+PREFIX_CACHE_SIZE = 256
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+_tracked = threading.local()
+
+
+class TokenBudgetExceeded(Exception):
+    """A request would go over the per-request or per-session token budget."""
+
+    def __init__(self, message: str, tokens: int, budget: int, session_id: Optional[str] = None):
+        super().__init__(message)
+        self.tokens = tokens
+        self.budget = budget
+        self.session_id = session_id
+
+
+def _load_encoding():
+    """The BPE encoding, or None when tiktoken or its encoding file is unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                if tiktoken is not None:
+                    try:
+                        _encoding = tiktoken.get_encoding(TOKENIZER)
+                    except Exception:
+                        # Not cached locally and no network to fetch it
+                        _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def tokenizer_name() -> str:
+    """The tokenizer in use: the BPE encoding name, or "estimate"."""
+    return TOKENIZER if _load_encoding() is not None else "estimate"
+
+
+def _encode_count(text: str) -> int:
+    encoding = _load_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+_count_long = lru_cache(maxsize=PREFIX_CACHE_SIZE)(_encode_count)
+
+
+def count_text(text: Optional[str]) -> int:
+    """Tokens in `text` (memoized for long, repeated strings such as the static prefix)."""
+    if not text:
+        return 0
+    if len(text) >= CACHED_TEXT_CHARS:
+        return _count_long(text)
+    return _encode_count(text)
+
+
+def prefix_cache_info():
+    """Hit/miss statistics of the long-string count cache."""
+    return _count_long.cache_info()
+
+
+def clear_prefix_cache() -> None:
+    """Forget memoized counts (e.g. after switching tokenizers)."""
+    _count_long.cache_clear()
+    _tool_counts.clear()
+
+
+def _field(obj, name: str):
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+# id(tools) -> (tools, count); the tool schema list is a module constant
+_tool_counts: Dict[int, Tuple[object, int]] = {}
+
+
+def count_tools(tools: Optional[Sequence[Dict]]) -> int:
+    """Tokens of the tool schemas sent with a request."""
+    if not tools:
+        return 0
+    cached = _tool_counts.get(id(tools))
+    if cached is not None and cached[0] is tools:
+        return cached[1]
+    count = count_text(json.dumps(list(tools), sort_keys=True, separators=(",", ":")))
+    _tool_counts[id(tools)] = (tools, count)
+    return count
+
+
+def count_messages(messages: Sequence, tools: Optional[Sequence[Dict]] = None) -> int:
+    """
+    Prompt tokens of a request.
+
+    Args:
+        messages: Message dicts (or SDK message objects, as appended after a tool call)
+        tools: Tool schemas sent with the request, if any
+
+    Returns:
+        Token count, including the chat format framing
+    """
+    total = REPLY_PRIMING_TOKENS + count_tools(tools)
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS + count_text(_field(message, "content"))
+        name = _field(message, "name")
+        if name:
+            total += count_text(name)
+        for call in _field(message, "tool_calls") or []:
+            function = _field(call, "function")
+            total += count_text(_field(function, "name")) + count_text(_field(function, "arguments"))
+    return total
+
+
+@contextmanager
+def tracked_calls():
+    """
+    Collect the calls recorded on this thread while the block runs.
+
+    Yields:
+        The list every `TokenAccountant.record` appends its call dict to
+    """
+    outer = getattr(_tracked, "calls", None)
+    calls: List[Dict] = []
+    _tracked.calls = calls
+    try:
+        yield calls
+    finally:
+        _tracked.calls = outer
+
+
+def call_totals(calls: Sequence[Dict]) -> Dict[str, int]:
+    """Summed prompt/completion/cached tokens and call count of recorded calls."""
+    return {
+        "llm_calls": len(calls),
+        "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+        "completion_tokens": sum(call["completion_tokens"] for call in calls),
+        "cached_tokens": sum(call["cached_tokens"] for call in calls),
+    }
+
+
+def max_tokens_kwargs(max_tokens: Optional[int]) -> Dict[str, int]:
+    """The max_tokens argument for chat.completions.create ({} when there is no cap)."""
+    return {} if max_tokens is None else {"max_tokens": max_tokens}
+
+
+class TokenAccountant:
+    """
+    Checks requests against token budgets and records what every call used.
+
+    Args:
+        max_prompt_tokens: Prompt tokens one request may send (0 = unlimited)
+        max_completion_tokens: max_tokens sent with each request (0 = none sent)
+        session_quota: Prompt + completion tokens a session may spend (0 = unlimited)
+        max_sessions: Sessions whose spending is tracked (least recently used dropped)
+        log_path: JSONL file every recorded call is appended to (None = no log)
+        metrics: Registry for usage counters and budget rejections
+    """
+
+    def __init__(self, max_prompt_tokens: int = DEFAULT_MAX_PROMPT_TOKENS,
+                 max_completion_tokens: int = DEFAULT_MAX_COMPLETION_TOKENS,
+                 session_quota: int = DEFAULT_SESSION_QUOTA,
+                 max_sessions: int = DEFAULT_MAX_TRACKED_SESSIONS,
+                 log_path: Optional[Path] = None, metrics=METRICS):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_completion_tokens = max_completion_tokens
+        self.session_quota = session_quota
+        self.max_sessions = max_sessions
+        self.log_path = Path(log_path) if log_path else None
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._spent: "OrderedDict[str, int]" = OrderedDict()
+
+    def spent(self, session_id: str) -> int:
+        """Tokens the session has used so far."""
+        with self._lock:
+            return self._spent.get(session_id, 0)
+
+    def prepare(self, messages: Sequence, tools: Optional[Sequence[Dict]] = None,
+                session_id: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Count a request and check it against the budgets before it is sent.
+
+        Args:
+            messages: The request's messages
+            tools: Tool schemas sent with it, if any
+            session_id: Session charged for it (None: no session quota)
+
+        Returns:
+            (prompt_tokens, max_tokens): the local count, and the completion cap to
+            send (lowered to what is left of the session's quota; None: send no
+            max_tokens, see max_tokens_kwargs)
+
+        Raises:
+            TokenBudgetExceeded: The prompt is over max_prompt_tokens, or the
+                session has no quota left for it
+        """
+        prompt_tokens = count_messages(messages, tools)
+        self.metrics.observe("tokens.request_prompt_tokens", prompt_tokens)
+        if self.max_prompt_tokens and prompt_tokens > self.max_prompt_tokens:
+            self.metrics.increment("tokens.rejected_requests")
+            raise TokenBudgetExceeded(
+                f"Request has {prompt_tokens} prompt tokens (limit {self.max_prompt_tokens})",
+                prompt_tokens, self.max_prompt_tokens, session_id)
+
+        max_tokens = self.max_completion_tokens or None
+        if session_id is not None and self.session_quota:
+            left = self.session_quota - self.spent(session_id)
+            if prompt_tokens >= left:
+                self.metrics.increment("tokens.rejected_sessions")
+                raise TokenBudgetExceeded(
+                    f"Session {session_id} has {max(left, 0)} tokens left of {self.session_quota}",
+                    prompt_tokens, self.session_quota, session_id)
+            left -= prompt_tokens
+            max_tokens = left if max_tokens is None else min(max_tokens, left)
+        return prompt_tokens, max_tokens
+
+    def record(self, usage, prompt_tokens: Optional[int] = None, completion_text: Optional[str] = None,
+               session_id: Optional[str] = None, **fields) -> Dict:
+        """
+        Record one finished call.
+
+        Args:
+            usage: The completion's usage (None when a stream was cancelled
+                before reporting it)
+            prompt_tokens: Local count from prepare()
+            completion_text: Text received, counted when there is no usage
+            session_id: Session charged for the call
+            **fields: Extra fields for the log line (e.g. model, handler)
+
+        Returns:
+            {"prompt_tokens", "completion_tokens", "cached_tokens",
+             "local_prompt_tokens", "estimated"}: billed counts, or local counts
+            ("estimated": True) when there was no usage
+        """
+        counts = record_usage(usage, self.metrics)
+        call = dict(counts, local_prompt_tokens=prompt_tokens, estimated=usage is None)
+        if usage is None:
+            call["prompt_tokens"] = prompt_tokens or 0
+            call["completion_tokens"] = count_text(completion_text)
+        elif prompt_tokens is not None:
+            self.metrics.observe("tokens.count_error", counts["prompt_tokens"] - prompt_tokens)
+
+        if session_id is not None:
+            with self._lock:
+                self._spent[session_id] = self._spent.get(session_id, 0) \
+                    + call["prompt_tokens"] + call["completion_tokens"]
+                self._spent.move_to_end(session_id)
+                while len(self._spent) > self.max_sessions:
+                    self._spent.popitem(last=False)
+
+        TRACER.annotate(prompt_tokens=call["prompt_tokens"], completion_tokens=call["completion_tokens"],
+                        cached_tokens=call["cached_tokens"])
+        calls = getattr(_tracked, "calls", None)
+        if calls is not None:
+            calls.append(call)
+        if self.log_path is not None:
+            append_record(self.log_path, dict(ts=datetime.utcnow().isoformat() + "Z", session=session_id,
+                                              **fields, **call))
+        return call
+
+    def reset(self, session_id: Optional[str] = None) -> None:
+        """Forget the spending of one session, or of all of them."""
+        with self._lock:
+            if session_id is None:
+                self._spent.clear()
+            else:
+                self._spent.pop(session_id, None)
+
+
+# Shared accountant for the experiment runner and the ReAct agent (no log file)
+TOKEN_ACCOUNTANT = TokenAccountant()
@@ -3,10 +3,31 @@ Tools for Fleur de Pain ReAct Agent
 Implements two core functions: lead capture and feedback logging
 """
 
-import json
 from datetime import datetime
 from pathlib import Path
 
+from .logwriter import append_record
+from .idempotency import IdempotencyIndex
+from .store import BACKENDS, DEFAULT_BACKEND, DEFAULT_DB_NAME, TABLES, RecordStore
+from .registry import Param, ToolRegistry, ToolSpec
+
+# Log directory (relative to the working directory; created on first write)
+LOGS_DIR = Path("logs")
+
+# Business records go to the JSONL logs, the SQLite store or both (FLEUR_RECORD_STORE)
+if DEFAULT_BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown record store: {DEFAULT_BACKEND}. Choose from: {list(BACKENDS)}")
+RECORD_BACKEND = DEFAULT_BACKEND
+RECORD_STORE = RecordStore(LOGS_DIR / DEFAULT_DB_NAME)
+
+
+def save_record(table: str, record: dict) -> None:
+    """Append a business record to its JSONL log and/or queue it for the record store."""
+    if RECORD_BACKEND != "sqlite":
+        append_record(LOGS_DIR / TABLES[table]["file"], record)
+    if RECORD_BACKEND != "jsonl":
+        RECORD_STORE.insert(table, record)
+
 
 def record_customer_interest(email: str, name: str, message: str) -> dict:
     """
@@ -20,10 +41,6 @@ def record_customer_interest(email: str, name: str, message: str) -> dict:
     Returns:
         dict: Confirmation with status and message
     """
-    # Ensure logs directory exists
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-
     # Create lead data
     lead_data = {
         "ts": datetime.utcnow().isoformat() + "Z",
@@ -32,10 +49,8 @@ def record_customer_interest(email: str, name: str, message: str) -> dict:
         "message": message
     }
 
-    # Append to JSONL file (one JSON object per line)
-    leads_file = logs_dir / "leads.jsonl"
-    with open(leads_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(lead_data) + "\n")
+    # Append to the JSONL log and/or the record store (batched writers)
+    save_record("leads", lead_data)
 
     return {
         "status": "success",
@@ -53,20 +68,14 @@ def record_feedback(question: str) -> dict:
     Returns:
         dict: Confirmation with status and message
     """
-    # Ensure logs directory exists
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-
     # Create feedback data
     feedback_data = {
         "ts": datetime.utcnow().isoformat() + "Z",
         "question": question
     }
 
-    # Append to JSONL file (one JSON object per line)
-    feedback_file = logs_dir / "feedback.jsonl"
-    with open(feedback_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(feedback_data) + "\n")
+    # Append to the JSONL log and/or the record store (batched writers)
+    save_record("feedback", feedback_data)
 
     return {
         "status": "success",
@@ -87,10 +96,6 @@ def schedule_pickup(customer_name: str, items: str, pickup_date: str, pickup_tim
     Returns:
         dict: Confirmation with status and message
     """
-    # Ensure logs directory exists
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-
     # Create pickup data
     pickup_data = {
         "ts": datetime.utcnow().isoformat() + "Z",
@@ -100,10 +105,8 @@ def schedule_pickup(customer_name: str, items: str, pickup_date: str, pickup_tim
         "pickup_time": pickup_time
     }
 
-    # Append to JSONL file (one JSON object per line)
-    pickup_file = logs_dir / "scheduled_pickups.jsonl"
-    with open(pickup_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(pickup_data) + "\n")
+    # Append to the JSONL log and/or the record store (batched writers)
+    save_record("pickups", pickup_data)
 
     return {
         "status": "success",
@@ -126,10 +129,6 @@ def create_cake_order(name: str, email: str, cake_size: str, flavor: str, pickup
     Returns:
         dict: Confirmation with status and message
     """
-    # Ensure logs directory exists
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-
     # Create cake order data
     cake_order_data = {
         "ts": datetime.utcnow().isoformat() + "Z",
@@ -141,10 +140,8 @@ def create_cake_order(name: str, email: str, cake_size: str, flavor: str, pickup
         "custom_message": custom_message
     }
 
-    # Append to JSONL file (one JSON object per line)
-    cake_orders_file = logs_dir / "cake_orders.jsonl"
-    with open(cake_orders_file, 'a', encoding='utf-8') as f:
-        f.write(json.dumps(cake_order_data) + "\n")
+    # Append to the JSONL log and/or the record store (batched writers)
+    save_record("cake_orders", cake_order_data)
 
     return {
         "status": "success",
@@ -152,18 +149,80 @@ def create_cake_order(name: str, email: str, cake_size: str, flavor: str, pickup
     }
 
 
-# Tool registry for easy lookup
-TOOLS = {
-    "record_customer_interest": record_customer_interest,
-    "record_feedback": record_feedback,
-    "schedule_pickup": schedule_pickup,
-    "create_cake_order": create_cake_order
-}
+# Tool registry: one declaration per tool drives the function-calling schema,
+# the ReAct prompt descriptions and argument validation. Repeated calls (same
+# session and normalized arguments within FLEUR_IDEMPOTENCY_WINDOW) are skipped.
+REGISTRY = ToolRegistry(idempotency=IdempotencyIndex(log_path=LOGS_DIR / "idempotency.jsonl"))
+
+REGISTRY.register(ToolSpec(
+    record_customer_interest,
+    description="Record customer lead information when they express interest in ordering or want a quote. Call this when you have collected their contact details and order intent.",
+    purpose="Store potential customer leads (general orders/inquiries)",
+    when_to_use="Customer wants to order, needs a quote, or expresses general interest",
+    returns="Confirmation that lead was recorded",
+    params=[
+        Param("email", "Customer's email or WhatsApp number"),
+        Param("name", "Customer's full name"),
+        Param("message", "Details about order intent, items, quantities, dates, etc."),
+    ],
+    example={"email": "ana@example.com", "name": "Ana Darwish", "message": "Interested in weekly bread delivery"},
+    confirmation="Thank you, {name}! I've passed your request on to our team, and they'll reach out via {email} soon.",
+))
+
+REGISTRY.register(ToolSpec(
+    record_feedback,
+    description="MANDATORY: Call this function for EVERY customer statement about products, experiences, or opinions. This includes: (1) ANY positive comments like 'The croissants were amazing!', 'Best bread ever', 'Loved it', 'Delicious', 'Great service' (2) ANY negative comments like 'Too expensive', 'Stale bread', 'Bad experience' (3) ANY suggestions like 'Add more options', 'Open earlier' (4) ANY questions you cannot answer from docs. DO NOT just respond - you MUST call this function to log their feedback.",
+    purpose="Log unknown questions or general feedback",
+    when_to_use="You cannot answer confidently from the business documents",
+    returns="Confirmation that feedback was logged",
+    params=[
+        Param("question", "The customer's question or feedback", aliases=("feedback",)),
+    ],
+    example={"question": "Do you have gluten-free sourdough daily?"},
+    confirmation="Thank you for letting us know! I've logged it for our team to review.",
+))
+
+REGISTRY.register(ToolSpec(
+    schedule_pickup,
+    description="Schedule a pickup appointment when customer wants to pick up specific items at a specific time. Use this for same-day or future pickups of bread, pastries, or ready orders.",
+    purpose="Schedule a pickup appointment for bread/pastries",
+    when_to_use="Customer wants to pick up specific items at a specific time",
+    returns="Confirmation with scheduled details",
+    params=[
+        Param("customer_name", "Customer's full name"),
+        Param("items", 'Items to pick up (e.g., "2 sourdough loaves, 1 baguette")'),
+        Param("pickup_date", 'Date for pickup (e.g., "2025-10-20", "Saturday")'),
+        Param("pickup_time", 'Preferred time (e.g., "3:00 PM", "afternoon")'),
+    ],
+    example={"customer_name": "John Smith", "items": "2 sourdough loaves", "pickup_date": "Saturday", "pickup_time": "3 PM"},
+    confirmation="{message}",
+))
+
+REGISTRY.register(ToolSpec(
+    create_cake_order,
+    description="Create a custom cake order with all required details. Use this specifically for custom celebration cakes (not general lead capture). Remember: custom cakes require 24-hour notice.",
+    purpose="Create a structured custom cake order (REQUIRES 24-hour notice!)",
+    when_to_use="Customer specifically wants a CUSTOM CAKE (not general orders)",
+    returns="Confirmation with cake order details",
+    params=[
+        Param("name", "Customer's full name"),
+        Param("email", "Customer's email or WhatsApp"),
+        Param("cake_size", 'Size (e.g., "8 inch", "serves 15", "medium")'),
+        Param("flavor", 'Cake flavor (e.g., "chocolate", "vanilla", "red velvet")'),
+        Param("pickup_date", "Pickup date (must be 24+ hours from now)"),
+        Param("custom_message", "Message/text for the cake", required=False, default=""),
+    ],
+    example={"name": "Maria", "email": "maria@test.com", "cake_size": "serves 20", "flavor": "chocolate", "pickup_date": "2025-10-28", "custom_message": "Happy Birthday!"},
+    confirmation="{message}",
+))
+
+# Name -> function map (kept for existing callers)
+TOOLS = REGISTRY.functions
 
 
 def get_tool(tool_name: str):
     """Get a tool function by name."""
-    return TOOLS.get(tool_name)
+    return REGISTRY.get(tool_name)
 
 
 def get_tool_descriptions() -> str:
@@ -171,55 +230,6 @@ def get_tool_descriptions() -> str:
     Get formatted tool descriptions for the LLM prompt.
 
     Returns:
-        str: Formatted tool descriptions
+        str: Formatted tool descriptions (generated once from the registry)
     """
-    return """
-Available Tools:
-
-1. record_customer_interest(email, name, message)
-   - Purpose: Store potential customer leads (general orders/inquiries)
-   - When to use: Customer wants to order, needs a quote, or expresses general interest
-   - Parameters:
-     * email (str): Customer's email or WhatsApp number
-     * name (str): Customer's full name
-     * message (str): Details about order intent, items, quantities, dates, etc.
-   - Returns: Confirmation that lead was recorded
-
-2. record_feedback(question)
-   - Purpose: Log unknown questions or general feedback
-   - When to use: You cannot answer confidently from the business documents
-   - Parameters:
-     * question (str): The customer's question or feedback
-   - Returns: Confirmation that feedback was logged
-
-3. schedule_pickup(customer_name, items, pickup_date, pickup_time)
-   - Purpose: Schedule a pickup appointment for bread/pastries
-   - When to use: Customer wants to pick up specific items at a specific time
-   - Parameters:
-     * customer_name (str): Customer's full name
-     * items (str): Items to pick up (e.g., "2 sourdough loaves, 1 baguette")
-     * pickup_date (str): Date for pickup (e.g., "2025-10-20", "Saturday")
-     * pickup_time (str): Preferred time (e.g., "3:00 PM", "afternoon")
-   - Returns: Confirmation with scheduled details
-
-4. create_cake_order(name, email, cake_size, flavor, pickup_date, custom_message)
-   - Purpose: Create a structured custom cake order (REQUIRES 24-hour notice!)
-   - When to use: Customer specifically wants a CUSTOM CAKE (not general orders)
-   - Parameters:
-     * name (str): Customer's full name
-     * email (str): Customer's email or WhatsApp
-     * cake_size (str): Size (e.g., "8 inch", "serves 15", "medium")
-     * flavor (str): Cake flavor (e.g., "chocolate", "vanilla", "red velvet")
-     * pickup_date (str): Pickup date (must be 24+ hours from now)
-     * custom_message (str, optional): Message/text for the cake
-   - Returns: Confirmation with cake order details
-
-Tool Call Format:
-Action: tool_name({"param1": "value1", "param2": "value2"})
-
-Examples:
-Action: record_customer_interest({"email": "ana@example.com", "name": "Ana Darwish", "message": "Interested in weekly bread delivery"})
-Action: record_feedback({"question": "Do you have gluten-free sourdough daily?"})
-Action: schedule_pickup({"customer_name": "John Smith", "items": "2 sourdough loaves", "pickup_date": "Saturday", "pickup_time": "3 PM"})
-Action: create_cake_order({"name": "Maria", "email": "maria@test.com", "cake_size": "serves 20", "flavor": "chocolate", "pickup_date": "2025-10-28", "custom_message": "Happy Birthday!"})
-"""
+    return REGISTRY.react_descriptions
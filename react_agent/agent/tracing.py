@@ -0,0 +1,236 @@
+"""
+Stage Tracing
+Per-stage latency spans for a chat turn (app.py) or an agent run
+(ReActController.run), so a slow turn shows where its time went: history
+rebuild, each completion, each tool, the detect_feedback fallback.
+
+    with TRACER.span("chat.turn") as turn:        # root span: one trace
+        with TRACER.span("first_completion"):
+            ...
+            TRACER.annotate(prompt_tokens=812)    # numbers add up per span
+
+Tracing is off unless FLEUR_TRACING=1. Disabled, span() returns one shared
+no-op context manager, so an instrumented stage costs an attribute check and
+a call. Enabled, every finished span is observed in METRICS as
+"span.<name>.seconds", and each finished trace is appended as one JSONL line
+(FLEUR_TRACE_LOG, default logs/traces.jsonl) with its spans' offsets,
+durations and attributes (token counts, tool names). The root span's
+stage_timings() are what the agent adds to its run metadata.
+
+The current span is held in a ContextVar, so traces follow asyncio tasks and
+asyncio.to_thread, and concurrent requests never share a trace.
+
+METRICS (counters and span latencies) can be scraped in the Prometheus text
+format from serve_metrics(port); app.py starts it when FLEUR_METRICS_PORT is set.
+"""
+
+import os
+import time
+import uuid
+import itertools
+import threading
+from contextvars import ContextVar
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .metrics import METRICS
+from .logwriter import append_record
+
+TRACING_ENABLED = os.getenv("FLEUR_TRACING", "0") != "0"
+DEFAULT_TRACE_LOG = Path(os.getenv("FLEUR_TRACE_LOG", "logs/traces.jsonl"))
+
+_current: ContextVar = ContextVar("fleur_current_span", default=None)
+
+
+class _NoopSpan:
+    """What span() returns while tracing is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def add(self, **counts) -> None:
+        pass
+
+    def stage_timings(self) -> Optional[Dict[str, float]]:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed stage; the outermost span of a context is the trace's root."""
+
+    __slots__ = ("tracer", "name", "attrs", "parent", "root", "id", "start", "seconds", "spans", "_ids")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict, parent: Optional["Span"]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.root = parent.root if parent is not None else self
+        self.seconds = None
+        if parent is None:
+            self.spans: List["Span"] = []
+            self._ids = itertools.count()
+        self.id = next(self.root._ids)
+
+    def __enter__(self):
+        _current.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        # Restore the parent directly (not via a reset token), so a span held
+        # open across the yields of an async generator can close in any context
+        _current.set(self.parent)
+        if exc[0] is not None:
+            self.attrs["error"] = exc[0].__name__
+        self.tracer.metrics.observe(f"span.{self.name}.seconds", self.seconds)
+        if self.parent is not None:
+            self.root.spans.append(self)
+        else:
+            self.tracer.finish(self)
+        return False
+
+    def set(self, **attrs) -> None:
+        """Set attributes (tool name, handler, ...)."""
+        self.attrs.update(attrs)
+
+    def add(self, **counts) -> None:
+        """Add to numeric attributes (token counts of several calls add up)."""
+        for key, value in counts.items():
+            self.attrs[key] = self.attrs.get(key, 0) + (value or 0)
+
+    def stage_timings(self) -> Optional[Dict[str, float]]:
+        """
+        Seconds per stage name over the finished spans nested in this one, plus
+        this span's own "total" once it has finished. A nested stage's time is
+        also part of its parent's.
+        """
+        timings: Dict[str, float] = {}
+        for span in self.root.spans:
+            if self is self.root or self._contains(span):
+                timings[span.name] = timings.get(span.name, 0.0) + span.seconds
+        if self.seconds is not None:
+            timings["total"] = self.seconds
+        return {name: round(seconds, 6) for name, seconds in timings.items()}
+
+    def _contains(self, span: "Span") -> bool:
+        parent = span.parent
+        while parent is not None:
+            if parent is self:
+                return True
+            parent = parent.parent
+        return False
+
+    def to_record(self, origin: float) -> Dict:
+        return {
+            "id": self.id,
+            "parent": self.parent.id if self.parent is not None else None,
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "ms": round(self.seconds * 1000, 3),
+            "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    """
+    Span factory and trace sink.
+
+    Args:
+        enabled: Record spans (False: span() is a shared no-op)
+        log_path: JSONL file finished traces are appended to (None: not written)
+        metrics: Registry span latencies are observed in
+    """
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, log_path: Optional[Path] = DEFAULT_TRACE_LOG,
+                 metrics=METRICS):
+        self.enabled = enabled
+        self.log_path = Path(log_path) if log_path else None
+        self.metrics = metrics
+
+    def configure(self, enabled: Optional[bool] = None, log_path: Optional[Path] = None) -> "Tracer":
+        """Switch tracing on or off and/or redirect the trace log."""
+        if enabled is not None:
+            self.enabled = enabled
+        if log_path is not None:
+            self.log_path = Path(log_path)
+        return self
+
+    def span(self, name: str, **attrs):
+        """A context manager timing one stage (a new trace if no span is open)."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attrs, _current.get())
+
+    def annotate(self, **counts) -> None:
+        """Add numeric attributes (e.g. token counts) to the innermost open span."""
+        if self.enabled:
+            span = _current.get()
+            if span is not None:
+                span.add(**counts)
+
+    def current(self):
+        """The innermost open span (the no-op span when there is none)."""
+        return (_current.get() if self.enabled else None) or _NOOP_SPAN
+
+    def finish(self, root: Span) -> None:
+        """Write a finished trace to the log."""
+        if self.log_path is None:
+            return
+        spans = sorted(root.spans, key=lambda span: span.start)
+        append_record(self.log_path, {
+            "ts": datetime.utcnow().isoformat() + "Z",
+            "trace_id": uuid.uuid4().hex[:16],
+            "name": root.name,
+            "ms": round(root.seconds * 1000, 3),
+            "attrs": root.attrs,
+            "timings": root.stage_timings(),
+            "spans": [span.to_record(root.start) for span in spans],
+        })
+
+
+# Shared tracer for app.py, the controllers and the tool registry
+TRACER = Tracer()
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1", metrics=METRICS) -> ThreadingHTTPServer:
+    """
+    Serve `metrics` in the Prometheus text format at http://host:port/metrics
+    from a daemon thread.
+
+    Returns:
+        The running server (call shutdown() to stop it)
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    return server
@@ -0,0 +1,18 @@
+"""
+Percentiles of turns, tool calls and response length in the experiment results,
+streamed in one pass (or from the NumPy column cache with --cache).
+
+Usage:
+    python analyze_results.py [--persona P] [--scenario S] [--since D] [--until D] [--by persona,scenario] [--cache]
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.analytics import main
+
+if __name__ == "__main__":
+    sys.exit(main())
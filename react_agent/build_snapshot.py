@@ -0,0 +1,18 @@
+"""
+Rebuild the business context snapshot ahead of a deploy
+so freshly started workers load it with a single read.
+
+Usage:
+    python react_agent/build_snapshot.py [--rebuild] [--docs-dir me] [--output .cache/business_snapshot.json]
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.snapshot import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""
+Import the JSONL logs into the SQLite record store (one-shot; safe to re-run,
+records already imported are skipped).
+
+Usage:
+    python react_agent/import_logs.py [--logs-dir logs] [--db logs/records.db]
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.store import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,60 +1,209 @@
 """
 Run experiments and save DETAILED results including actual responses
 This allows comparison of agent outputs across different configurations
+
+The EXPERIMENTS x TEST_SCENARIOS grid runs on a thread pool (--concurrency, or
+FLEUR_EXPERIMENT_CONCURRENCY) with one shared OpenAI client and one pooled agent
+(its compiled graph shared too); each cell passes its persona and llm_call at run time. Rate-limited and transient API errors are retried with
+exponential backoff (honouring Retry-After). Finished cells are streamed to
+detailed_results.jsonl by a single writer as they complete, and --resume skips
+cells already recorded there, so an interrupted grid can be continued. Every
+model call is counted and checked against the token budgets before it is sent
+(agent/tokens.py); its prompt and completion tokens are kept with the cell's
+record, summed in runs.csv and listed one row per call in llm_calls.csv.
+With --cassette record, every completion is stored in a cassette
+(agent/cassette.py) and replayed from it on later runs; --cassette replay runs
+the grid from the cassette alone, without the API.
+
+Usage:
+    python run_detailed_experiments.py [--concurrency 4] [--resume] [--cassette record]
 """
 
 import os
 import sys
 import json
+import time
+import random
+import argparse
+import threading
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from openai import OpenAI
-from PyPDF2 import PdfReader
+from openai import OpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import agent modules
-from react_agent.agent import create_langgraph_agent
+from react_agent.agent import AGENT_POOL
+from react_agent.agent.snapshot import load_snapshot
+from react_agent.agent.metrics import METRICS
+from react_agent.agent.tracing import TRACER
+from react_agent.agent.profiling import PROFILER, PROFILE_MODES
+from react_agent.agent.cassette import CASSETTE, CASSETTE_MODES
+from react_agent.agent.logwriter import get_writer
+from react_agent.agent.prompt_layout import cached_token_ratio
+from react_agent.agent.tokens import TOKEN_ACCOUNTANT, call_totals, max_tokens_kwargs, tracked_calls, tokenizer_name
+from react_agent.agent.streaming_react import STOP_SEQUENCES
 
 # Load environment
 load_dotenv(Path(__file__).parent.parent / '.env')
 
 def load_business_context():
-    """Load business documents."""
+    """Load business documents (from the cached snapshot; parses only if they changed)."""
+    snapshot = load_snapshot()
     context = ""
-    pdf_path = Path(__file__).parent.parent / "me" / "about_business.pdf"
-    if pdf_path.exists():
-        reader = PdfReader(str(pdf_path))
-        for page in reader.pages:
-            context += page.extract_text() + "\n"
-        context = "=== Business Profile ===\n" + context + "\n\n"
-
-    txt_path = Path(__file__).parent.parent / "me" / "business_summary.txt"
-    if txt_path.exists():
-        with open(txt_path, 'r', encoding='utf-8') as f:
-            context += "=== Business Summary ===\n" + f.read()
+    if "about_business.pdf" in snapshot.documents:
+        context = "=== Business Profile ===\n" + snapshot.document("about_business.pdf") + "\n\n"
+
+    if "business_summary.txt" in snapshot.documents:
+        context += "=== Business Summary ===\n" + snapshot.document("business_summary.txt")
 
     return context
 
-def create_llm_call(model="gpt-4o", temperature=0.7, top_p=1.0):
-    """Create LLM call function."""
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Concurrent grid cells (each cell runs its ReAct loop in one worker thread)
+DEFAULT_CONCURRENCY = int(os.getenv("FLEUR_EXPERIMENT_CONCURRENCY", "4"))
+# Retries for rate-limited / transient API errors, with exponential backoff
+MAX_RETRIES = int(os.getenv("FLEUR_EXPERIMENT_MAX_RETRIES", "6"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The OpenAI client shared by every configuration (connection-pooled, thread-safe)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Retries are handled by call_with_backoff so they respect our limits
+                _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _client
+
+
+def _retry_after(error) -> float:
+    """Seconds the server asked us to wait (Retry-After header), or 0."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0)) if response is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+def call_with_backoff(fn, max_retries=MAX_RETRIES, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """
+    Call fn(), retrying rate-limit and transient API errors.
+
+    Waits the server's Retry-After when given, otherwise full-jitter exponential
+    backoff (random up to base * 2**attempt, capped).
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = _retry_after(e) or random.uniform(0, min(cap, base * 2 ** attempt))
+            METRICS.increment("experiments.retries")
+            time.sleep(delay)
+
+
+def create_llm_call(model="gpt-4o", temperature=0.7, top_p=1.0, client=None):
+    """Create LLM call function (on the shared client unless one is given)."""
+    client = CASSETTE.wrap(client or get_client())
 
     def llm_call(messages):
-        response = client.chat.completions.create(
+        prompt_tokens, max_tokens = TOKEN_ACCOUNTANT.prepare(messages)
+        response = call_with_backoff(lambda: client.chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
             top_p=top_p,
-            max_tokens=1500
-        )
+            **max_tokens_kwargs(max_tokens)
+        ))
+        TOKEN_ACCOUNTANT.record(response.usage, prompt_tokens)
         return response.choices[0].message.content
 
     return llm_call
 
+
+def create_tool_llm_call(model="gpt-4o", temperature=0.7, top_p=1.0, client=None):
+    """Create the LLM call for the function-calling backend: (messages, tools) -> assistant message dict."""
+    client = CASSETTE.wrap(client or get_client())
+
+    def llm_call(messages, tools):
+        prompt_tokens, max_tokens = TOKEN_ACCOUNTANT.prepare(messages, tools)
+        response = call_with_backoff(lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+            temperature=temperature,
+            top_p=top_p,
+            **max_tokens_kwargs(max_tokens)
+        ))
+        TOKEN_ACCOUNTANT.record(response.usage, prompt_tokens)
+        message = response.choices[0].message
+        reply = {"role": "assistant", "content": message.content}
+        if message.tool_calls:
+            reply["tool_calls"] = [
+                {"id": call.id, "type": "function",
+                 "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                for call in message.tool_calls
+            ]
+        return reply
+
+    return llm_call
+
+
+def create_stream_llm_call(model="gpt-4o", temperature=0.7, top_p=1.0, client=None):
+    """Create the LLM call for the streaming ReAct backend: messages -> iterator of text deltas.
+
+    Closing the iterator closes the HTTP stream, which cancels the generation.
+    """
+    client = CASSETTE.wrap(client or get_client())
+
+    def llm_call(messages):
+        prompt_tokens, max_tokens = TOKEN_ACCOUNTANT.prepare(messages)
+        stream = call_with_backoff(lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            top_p=top_p,
+            **max_tokens_kwargs(max_tokens),
+            stop=STOP_SEQUENCES,
+            stream=True,
+            stream_options={"include_usage": True}
+        ))
+        usage, received = None, []
+        try:
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    received.append(chunk.choices[0].delta.content)
+                    yield received[-1]
+        finally:
+            stream.close()
+            # A stream cancelled at the decision point reports no usage: count what was read
+            TOKEN_ACCOUNTANT.record(usage, prompt_tokens, completion_text="".join(received))
+
+    return llm_call
+
+
+# LLM call factory per controller backend
+LLM_FACTORIES = {
+    "react": create_llm_call,
+    "react_stream": create_stream_llm_call,
+    "function_calling": create_tool_llm_call,
+}
+
 # Test scenarios
 TEST_SCENARIOS = {
     "freshness": "What breads are fresh now? When is the next batch?",
@@ -73,93 +222,251 @@ EXPERIMENTS = [
     {"persona": "friendly_advisor", "temp": 0.7, "top_p": 0.9, "model": "gpt-4o"},
 ]
 
+def cell_key(exp, scenario_key, mode="react"):
+    """Identity of one grid cell, as recorded in detailed_results.jsonl."""
+    return (exp["persona"], float(exp["temp"]), float(exp["top_p"]), exp["model"], mode, scenario_key)
+
+
+def _record_key(record):
+    e = record["experiment"]
+    return cell_key({"persona": e["persona"], "temp": e["temperature"], "top_p": e["top_p"],
+                     "model": e["model"]}, record["scenario"]["key"], e.get("mode", "react"))
+
+
+def _trim_partial_line(path):
+    """Drop a trailing line cut off by an interrupted run, so appends start on a fresh line."""
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def load_completed(detailed_jsonl):
+    """Most recent record for every cell already in detailed_results.jsonl."""
+    completed = {}
+    if not detailed_jsonl.exists():
+        return completed
+    _trim_partial_line(detailed_jsonl)
+    with open(detailed_jsonl, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                completed[_record_key(record)] = record
+    return completed
+
+
+def summary_row(record):
+    """runs.csv row for one detailed result."""
+    response = record["response"]
+    # Records written before token accounting / tracing have no "tokens" / "timings"
+    tokens = record.get("tokens", {})
+    timings = record.get("timings", {})
+    return {
+        "timestamp": record["timestamp"],
+        "persona": record["experiment"]["persona"],
+        "temperature": record["experiment"]["temperature"],
+        "top_p": record["experiment"]["top_p"],
+        "model": record["experiment"]["model"],
+        "mode": record["experiment"].get("mode", "react"),
+        "scenario": record["scenario"]["key"],
+        "success": response.get("stopped_reason") == "answer_found",
+        "turns": response.get("turns", 0),
+        "tool_calls": len(response.get("actions_taken", [])),
+        "llm_calls": tokens.get("llm_calls", 0),
+        "prompt_tokens": tokens.get("prompt_tokens", 0),
+        "completion_tokens": tokens.get("completion_tokens", 0),
+        "cached_tokens": tokens.get("cached_tokens", 0),
+        "seconds": timings.get("total", 0.0),
+        "llm_seconds": timings.get("llm_call", 0.0),
+        "tool_seconds": timings.get("tool", 0.0)
+    }
+
+
+def call_rows(record):
+    """llm_calls.csv rows for one detailed result: one per model call, in order."""
+    experiment = record["experiment"]
+    return [
+        {
+            "persona": experiment["persona"],
+            "temperature": experiment["temperature"],
+            "top_p": experiment["top_p"],
+            "model": experiment["model"],
+            "mode": experiment.get("mode", "react"),
+            "scenario": record["scenario"]["key"],
+            "call": i + 1,
+            **call
+        }
+        for i, call in enumerate(record.get("tokens", {}).get("calls", []))
+    ]
+
+
+def run_cell(agent, exp, scenario_key, user_message, business_context, llm_call=None):
+    """Run one configuration on one scenario and build its detailed record."""
+    # The cell runs on this thread, so every call it makes is collected here
+    with tracked_calls() as calls:
+        result = agent.run(user_message, business_context, persona=exp["persona"], llm_call=llm_call)
+    experiment = {
+        "persona": exp["persona"],
+        "temperature": exp["temp"],
+        "top_p": exp["top_p"],
+        "model": exp["model"]
+    }
+    if agent.mode != "react":
+        experiment["mode"] = agent.mode
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "experiment": experiment,
+        "scenario": {
+            "key": scenario_key,
+            "user_message": user_message
+        },
+        "response": {
+            "final_answer": result["final_answer"],
+            "turns": result["metadata"].get("turns", 0),
+            "stopped_reason": result["metadata"].get("stopped_reason"),
+            "actions_taken": result["metadata"].get("actions_taken", [])
+        },
+        "tokens": dict(call_totals(calls), calls=calls),
+        # Seconds per stage (llm_call, tool, compaction, total) when tracing is on
+        "timings": result["metadata"].get("timings", {})
+    }
+
+
+def run_grid(business_context, detailed_jsonl, summary_csv, experiments=EXPERIMENTS,
+             scenarios=TEST_SCENARIOS, concurrency=DEFAULT_CONCURRENCY, resume=False,
+             llm_factory=None, mode="react", calls_csv=None):
+    """
+    Run every (experiment, scenario) cell and save the results.
+
+    Args:
+        business_context: Grounding text passed to every agent
+        detailed_jsonl: JSONL file the detailed records are appended to
+        summary_csv: CSV rewritten with one row per grid cell at the end
+        experiments: Configurations (persona/temp/top_p/model)
+        scenarios: scenario key -> user message
+        concurrency: Cells run at once
+        resume: Skip cells already recorded in detailed_jsonl
+        llm_factory: Factory (model, temperature, top_p) -> llm_call; defaults to the
+            one for `mode` in LLM_FACTORIES
+        mode: Controller backend, "react" or "function_calling"
+        calls_csv: CSV rewritten with one row per model call (prompt/completion
+            tokens, billed and counted locally), if given
+
+    A cell that raises is reported and left out (a --resume run retries it);
+    the other cells are still written.
+
+    Returns:
+        List of runs.csv rows in grid order
+    """
+    detailed_jsonl.parent.mkdir(parents=True, exist_ok=True)
+    completed = load_completed(detailed_jsonl) if resume else {}
+    llm_factory = llm_factory or LLM_FACTORIES[mode]
+
+    # One pooled agent for the grid; each configuration only differs in
+    # persona and llm_call, which are passed per run
+    agent = AGENT_POOL.get(mode=mode, max_turns=10)
+    llm_calls = [
+        llm_factory(model=exp["model"], temperature=exp["temp"], top_p=exp["top_p"])
+        for exp in experiments
+    ]
+
+    cells = [(i, exp, key, message) for i, exp in enumerate(experiments) for key, message in scenarios.items()]
+    pending = [cell for cell in cells if cell_key(cell[1], cell[2], mode) not in completed]
+    total = len(cells)
+    print(f"Total tests: {total} ({total - len(pending)} already done, {len(pending)} to run, "
+          f"concurrency {concurrency})\n")
+
+    # Single writer: only this thread appends, one flushed line per finished cell
+    writer = get_writer(detailed_jsonl, durability="record")
+    done = total - len(pending)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(run_cell, agent, exp, key, message, business_context, llm_calls[i]): (exp, key)
+            for i, exp, key, message in pending
+        }
+        failed = 0
+        for future in as_completed(futures):
+            exp, key = futures[future]
+            done += 1
+            try:
+                record = future.result()
+            except Exception as e:
+                failed += 1
+                METRICS.increment("experiments.failed_cells")
+                print(f"[{done}/{total}] {exp['persona']}, temp={exp['temp']}, scenario={key}"
+                      f"  -> FAILED: {type(e).__name__}: {e}")
+                continue
+            writer.write(record)
+            completed[cell_key(exp, key, mode)] = record
+            print(f"[{done}/{total}] {exp['persona']}, temp={exp['temp']}, scenario={key}"
+                  f"  -> Response length: {len(record['response']['final_answer'])} chars, "
+                  f"Tools: {len(record['response']['actions_taken'])}")
+    writer.flush()
+    if failed:
+        print(f"\n{failed} cell(s) failed; run again with --resume to retry only those")
+
+    records = [completed[cell_key(exp, key, mode)] for _, exp, key, _ in cells
+               if cell_key(exp, key, mode) in completed]
+    rows = [summary_row(record) for record in records]
+    pd.DataFrame(rows).to_csv(summary_csv, index=False)
+    if calls_csv is not None:
+        pd.DataFrame([row for record in records for row in call_rows(record)]).to_csv(calls_csv, index=False)
+    return rows
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the experiment grid and save detailed results.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Grid cells run at once (default: %(default)s)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip cells already in experiments/detailed_results.jsonl")
+    parser.add_argument("--mode", choices=sorted(LLM_FACTORIES), default="react",
+                        help="Agent backend: text ReAct parsing or native function calling")
+    parser.add_argument("--profile", type=int, metavar="N", default=None,
+                        help="Profile the agent runs, writing a report every N runs to experiments/profiles")
+    parser.add_argument("--profile-mode", choices=PROFILE_MODES, default=None,
+                        help="Stack sampling or cProfile (default: FLEUR_PROFILE_MODE)")
+    parser.add_argument("--cassette", choices=CASSETTE_MODES, default=None,
+                        help="Record completions to / replay them from the cassette (default: FLEUR_CASSETTE)")
+    parser.add_argument("--cassette-path", type=Path, default=None,
+                        help="Cassette database (default: FLEUR_CASSETTE_PATH)")
+    args = parser.parse_args()
+    CASSETTE.configure(mode=args.cassette, path=args.cassette_path)
+    if args.profile:
+        PROFILER.configure(window=args.profile, mode=args.profile_mode, output_dir=Path("experiments/profiles"))
+
     print("="*70)
     print("DETAILED EXPERIMENT RUNNER")
     print("Saves both metadata AND actual responses for comparison")
     print("="*70)
 
     business_context = load_business_context()
+    # Stage timings go into every record; the full spans to experiments/traces.jsonl
+    TRACER.configure(enabled=True, log_path=Path("experiments/traces.jsonl"))
 
     # Files to save results
     summary_csv = Path("experiments/runs.csv")
+    calls_csv = Path("experiments/llm_calls.csv")
     detailed_jsonl = Path("experiments/detailed_results.jsonl")
 
-    # Load existing data
-    summary_data = []
-
     print(f"\nRunning {len(EXPERIMENTS)} experiments on {len(TEST_SCENARIOS)} scenarios...")
-    print(f"Total tests: {len(EXPERIMENTS) * len(TEST_SCENARIOS)}\n")
-
-    experiment_num = 0
-
-    for exp in EXPERIMENTS:
-        for scenario_key, user_message in TEST_SCENARIOS.items():
-            experiment_num += 1
-
-            print(f"[{experiment_num}/{len(EXPERIMENTS)*len(TEST_SCENARIOS)}] "
-                  f"{exp['persona']}, temp={exp['temp']}, scenario={scenario_key}")
-
-            # Create agent
-            llm_call = create_llm_call(
-                model=exp["model"],
-                temperature=exp["temp"],
-                top_p=exp["top_p"]
-            )
-            agent = create_langgraph_agent(llm_call, persona=exp["persona"], max_turns=10)
-
-            # Run agent
-            result = agent.run(user_message, business_context)
-
-            # Save to summary CSV
-            summary_data.append({
-                "timestamp": datetime.now().isoformat(),
-                "persona": exp["persona"],
-                "temperature": exp["temp"],
-                "top_p": exp["top_p"],
-                "model": exp["model"],
-                "scenario": scenario_key,
-                "success": result["metadata"].get("stopped_reason") == "answer_found",
-                "turns": result["metadata"].get("turns", 0),
-                "tool_calls": len(result["metadata"].get("actions_taken", []))
-            })
-
-            # Save DETAILED results to JSONL
-            detailed_result = {
-                "timestamp": datetime.now().isoformat(),
-                "experiment": {
-                    "persona": exp["persona"],
-                    "temperature": exp["temp"],
-                    "top_p": exp["top_p"],
-                    "model": exp["model"]
-                },
-                "scenario": {
-                    "key": scenario_key,
-                    "user_message": user_message
-                },
-                "response": {
-                    "final_answer": result["final_answer"],
-                    "turns": result["metadata"].get("turns", 0),
-                    "stopped_reason": result["metadata"].get("stopped_reason"),
-                    "actions_taken": result["metadata"].get("actions_taken", [])
-                }
-            }
-
-            # Append to JSONL
-            with open(detailed_jsonl, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(detailed_result) + "\n")
-
-            print(f"  -> Response length: {len(result['final_answer'])} chars, "
-                  f"Tools: {len(result['metadata'].get('actions_taken', []))}")
-
-    # Save summary CSV
-    df = pd.DataFrame(summary_data)
-    df.to_csv(summary_csv, index=False)
+    started = time.perf_counter()
+    run_grid(business_context, detailed_jsonl, summary_csv,
+             concurrency=args.concurrency, resume=args.resume, mode=args.mode, calls_csv=calls_csv)
+    elapsed = time.perf_counter() - started
 
     print("\n" + "="*70)
     print("RESULTS SAVED:")
     print("="*70)
     print(f"1. Summary: experiments/runs.csv")
     print(f"2. Detailed: experiments/detailed_results.jsonl (with full responses)")
+    print(f"3. Per call: experiments/llm_calls.csv (prompt/completion tokens, counted with {tokenizer_name()})")
+    print(f"\nWall time: {elapsed:.1f}s ({METRICS.counter('experiments.retries'):.0f} API retries)")
+    if CASSETTE.active:
+        print(f"Cassette ({CASSETTE.mode}, {CASSETTE.path}): {METRICS.counter('cassette.hits'):.0f} calls replayed, "
+              f"{METRICS.counter('cassette.recorded'):.0f} recorded")
+    print(f"Prompt tokens: {METRICS.counter('llm.prompt_tokens'):.0f} "
+          f"({METRICS.counter('llm.cached_tokens'):.0f} served from the provider's prefix cache, "
+          f"{cached_token_ratio():.0%})")
     print("\nTo view detailed results:")
     print("  python view_detailed_results.py")
@@ -1,38 +1,49 @@
 """
 View detailed experiment results with actual responses
 Allows easy comparison between configurations
+
+One streaming pass over the results: the responses shown are kept (at most
+--limit per scenario), everything else only updates the per-persona statistics.
+
+Usage:
+    python view_detailed_results.py [--persona P] [--scenario S] [--since D] [--until D] [--limit N]
 """
 
-import json
+import sys
+import argparse
 from pathlib import Path
-from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from react_agent.agent.analytics import DEFAULT_RESULTS, GroupStats, format_summary, iter_records, to_row
 
-def view_results():
-    """Display detailed results grouped by scenario."""
 
-    detailed_file = Path("experiments/detailed_results.jsonl")
+def view_results(path: Path = DEFAULT_RESULTS, persona: Optional[str] = None, scenario: Optional[str] = None,
+                 since: Optional[str] = None, until: Optional[str] = None, limit: Optional[int] = None):
+    """Display detailed results grouped by scenario."""
 
-    if not detailed_file.exists():
+    if not path.exists():
         print("No detailed results found. Run: python run_detailed_experiments.py")
         return
 
-    # Load all results
-    results = []
-    with open(detailed_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                results.append(json.loads(line))
+    # Single pass: keep what is displayed, aggregate the rest
+    total = 0
+    by_scenario: Dict[str, List[Dict]] = {}
+    persona_stats: Dict[tuple, GroupStats] = {}
+    for r in iter_records(path, persona=persona, scenario=scenario, since=since, until=until):
+        total += 1
+        shown = by_scenario.setdefault(r['scenario']['key'], [])
+        if limit is None or len(shown) < limit:
+            shown.append(r)
+        row = to_row(r)
+        persona_stats.setdefault((row.persona,), GroupStats()).add(row)
 
     print("="*80)
-    print(f"DETAILED EXPERIMENT RESULTS ({len(results)} total)")
+    print(f"DETAILED EXPERIMENT RESULTS ({total} total)")
     print("="*80)
 
-    # Group by scenario
-    by_scenario = defaultdict(list)
-    for r in results:
-        scenario_key = r['scenario']['key']
-        by_scenario[scenario_key].append(r)
-
     # Display by scenario
     for scenario_key, scenario_results in by_scenario.items():
         print(f"\n\n{'='*80}")
@@ -54,7 +65,7 @@ def view_results():
                 for action in resp['actions_taken']:
                     print(f"  - {action['tool']}()")
 
-            print(f"\nAgent Response:")
+            print("\nAgent Response:")
             print("-" * 80)
             print(resp['final_answer'])
             print("-" * 80)
@@ -63,28 +74,24 @@ def view_results():
     print("COMPARISON SUMMARY")
     print("="*80)
 
-    # Show average response lengths by persona
-    persona_stats = defaultdict(list)
-    for r in results:
-        persona = r['experiment']['persona']
-        response_len = len(r['response']['final_answer'])
-        persona_stats[persona].append(response_len)
-
-    print("\nAverage Response Length by Persona:")
-    for persona, lengths in persona_stats.items():
-        avg_len = sum(lengths) / len(lengths)
-        print(f"  {persona}: {avg_len:.0f} characters")
-
-    # Show tool usage by persona
-    print("\nTool Usage by Persona:")
-    persona_tools = defaultdict(int)
-    for r in results:
-        persona = r['experiment']['persona']
-        tools = len(r['response']['actions_taken'])
-        persona_tools[persona] += tools
-
-    for persona, total_tools in persona_tools.items():
-        print(f"  {persona}: {total_tools} total tool calls")
+    summary = {key: persona_stats[key].summary() for key in sorted(persona_stats)}
+    print()
+    print(format_summary(summary, by=("persona",)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Detailed experiment results, grouped by scenario.")
+    parser.add_argument("--file", type=Path, default=DEFAULT_RESULTS, help="Results file (default: %(default)s)")
+    parser.add_argument("--persona", default=None)
+    parser.add_argument("--scenario", default=None)
+    parser.add_argument("--since", default=None, help="First timestamp or date (inclusive)")
+    parser.add_argument("--until", default=None, help="Last timestamp or date (inclusive)")
+    parser.add_argument("--limit", type=int, default=None, help="Responses shown per scenario (default: all)")
+    args = parser.parse_args(argv)
+    view_results(args.file, persona=args.persona, scenario=args.scenario,
+                 since=args.since, until=args.until, limit=args.limit)
+    return 0
+
 
 if __name__ == "__main__":
-    view_results()
+    sys.exit(main())